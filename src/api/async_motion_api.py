@@ -0,0 +1,485 @@
+import asyncio
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+
+from .models import build_scheduled_entities
+from .motion_api import API_BASE_URL, INTERNAL_BASE_URL, MotionAPI
+from .rate_limiter import RateLimiter
+from .telemetry import Telemetry, endpoint_template
+from .resilience import (
+    AmbiguousRequestError,
+    CircuitBreaker,
+    MotionAPIError,
+    RetryPolicy,
+    created_task_query,
+    match_created_task,
+)
+
+
+class AsyncMotionAPI:
+    """asyncio variant of MotionAPI.
+
+    Requests share a RateLimiter (which may also be shared with a synchronous
+    MotionAPI) and a semaphore bounding how many are in flight, so large
+    batches of updates overlap their round trips while staying within the
+    rate budget.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        max_calls_per_minute=12,
+        period_in_seconds=60,
+        internal_calls_per_minute=None,
+        burst=None,
+        rate_limiter=None,
+        max_concurrency=8,
+        token=None,
+        token_provider=None,
+        token_manager=None,
+        timeout=30.0,
+        retry_policy=None,
+        circuit_breakers=None,
+        base_url=API_BASE_URL,
+        internal_base_url=INTERNAL_BASE_URL,
+        telemetry=None,
+    ):
+        """
+        Parameters:
+            api_key (str): Key for the public v1 API
+            rate_limiter (RateLimiter): Limiter with "public" and "internal" buckets,
+                created from the per-minute settings if not given
+            max_concurrency (int): Maximum number of requests in flight
+            token (str): Bearer token for the internal API
+            token_provider (callable): Synchronous callable returning a valid
+                token, used instead of `token` when given
+            token_manager (TokenManager): Provides the token and replaces one
+                the server rejects, may be shared with a synchronous MotionAPI
+            timeout (float): Request timeout in seconds
+            retry_policy (RetryPolicy): Backoff and retry budget, may be shared
+                with a synchronous MotionAPI
+            circuit_breakers (dict): CircuitBreaker per bucket, may be shared too
+            base_url (str): Public API URL, e.g. of a local stub server
+            internal_base_url (str): Internal API URL
+            telemetry (Telemetry): Collects request metrics, may be shared too
+        """
+        self.api_key = api_key
+        self.period = period_in_seconds
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+            rate_limiter.add_bucket(
+                "public", max_calls_per_minute, period_in_seconds, burst
+            )
+            rate_limiter.add_bucket(
+                "internal",
+                internal_calls_per_minute or max_calls_per_minute,
+                period_in_seconds,
+                burst,
+            )
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breakers = circuit_breakers or {
+            "public": CircuitBreaker(),
+            "internal": CircuitBreaker(),
+        }
+        self.base_url = base_url
+        self.internal_base_url = internal_base_url
+        self.telemetry = telemetry or Telemetry()
+        self.max_concurrency = max_concurrency
+        self.token = token
+        self.token_manager = token_manager
+        if token_provider is None and token_manager is not None:
+            token_provider = token_manager.get_token
+        self.token_provider = token_provider
+        self.timeout = timeout
+        self._clients = {}
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the underlying HTTP clients"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+    def _client(self, name):
+        client = self._clients.get(name)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            )
+            if name == "public":
+                client = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    headers={
+                        "X-API-Key": self.api_key,
+                        "Content-Type": "application/json",
+                        "Accept": "application/json",
+                    },
+                    limits=limits,
+                    timeout=self.timeout,
+                )
+            else:
+                client = httpx.AsyncClient(
+                    base_url=self.internal_base_url,
+                    headers={"Accept": "application/json"},
+                    limits=limits,
+                    timeout=self.timeout,
+                )
+            self._clients[name] = client
+        return client
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _rate_limit(self, bucket="public"):
+        delay = self.rate_limiter.reserve(bucket)
+        if delay > 0:
+            self.telemetry.record_wait("throttle", delay)
+            await asyncio.sleep(delay)
+        return delay
+
+    async def _get_token(self):
+        if self.token_provider is not None:
+            self.token = await asyncio.to_thread(self.token_provider)
+        return self.token
+
+    async def _send(
+        self, bucket, method, endpoint, max_retries=None, idempotent=None, **kwargs
+    ):
+        """Send one request with retries, like MotionAPI._send_with_retries
+
+        The semaphore bounds the requests in flight, not those waiting.
+        """
+        if idempotent is None:
+            idempotent = method != "POST"
+        client = self._client(bucket)
+        breaker = self.circuit_breakers[bucket]
+        attempt = 0
+        while True:
+            delay = breaker.reserve()
+            if delay > 0:
+                self.telemetry.record_wait("circuit", delay)
+                await asyncio.sleep(delay)
+            await self._rate_limit(bucket)
+            try:
+                # Only the HTTP call holds a slot, a request waiting for the
+                # rate limit or a retry doesn't keep others from being sent
+                async with self._get_semaphore():
+                    with self.telemetry.request(bucket, method, endpoint) as span:
+                        response = await client.request(method, endpoint, **kwargs)
+                        span.set_attribute("status_code", response.status_code)
+                        span.set_attribute("bytes_sent", len(response.request.content))
+                        span.set_attribute("bytes_received", len(response.content))
+            except httpx.TransportError as error:
+                response = None
+                status_code = None
+                sent = not isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+                message = str(error) or type(error).__name__
+            else:
+                self.rate_limiter.update_from_headers(bucket, response.headers)
+                status_code = response.status_code
+                if status_code < 400:
+                    breaker.record_success()
+                    return response
+                sent = True
+                message = response.reason_phrase or "request failed"
+
+            delay = self.retry_policy.after_failure(
+                attempt,
+                method,
+                f"{client.base_url}{endpoint}",
+                status_code,
+                headers=response.headers if response is not None else None,
+                sent=sent,
+                message=message,
+                body=response.text[:500] if response is not None else None,
+                idempotent=idempotent,
+                max_retries=max_retries,
+                breaker=breaker,
+                pause=lambda: self.rate_limiter.bucket(bucket).pause(self.period),
+            )
+            attempt += 1
+            self.telemetry.increment("retries", f"{bucket} {method}")
+            if delay > 0:
+                self.telemetry.record_wait("retry", delay)
+                await asyncio.sleep(delay)
+
+    async def _request(
+        self,
+        method,
+        endpoint,
+        params=None,
+        data=None,
+        limit=None,
+        max_retries=3,
+        direct_list=False,
+        idempotency_key=None,
+    ):
+        """Async counterpart of MotionAPI._request"""
+        params = dict(params) if params else {}
+        if method == "POST":
+            headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+            response = await self._send(
+                "public",
+                method,
+                endpoint,
+                max_retries=max_retries,
+                params=params or None,
+                json=data,
+                headers=headers,
+            )
+            with self.telemetry.span("decode", endpoint=endpoint):
+                return response.json()
+
+        all_results = []
+        page_count = 0
+        while True:
+            items, next_cursor = await self.fetch_page(
+                method, endpoint, params, data, max_retries, direct_list
+            )
+            page_count += 1
+            all_results.extend(items)
+            if not next_cursor or (limit and page_count >= limit):
+                break
+            params["cursor"] = next_cursor
+
+        return all_results
+
+    async def fetch_page(
+        self, method, endpoint, params, data=None, max_retries=3, direct_list=False
+    ):
+        """Fetch one page and return (items, next cursor), like MotionAPI._fetch_page"""
+        response = await self._send(
+            "public",
+            method,
+            endpoint,
+            max_retries=max_retries,
+            params=params or None,
+            json=data,
+        )
+        self.telemetry.increment("pages", f"public {endpoint_template(endpoint)}")
+        with self.telemetry.span("decode", endpoint=endpoint):
+            response_data = response.json()
+        if direct_list:
+            return response_data, None
+        items = response_data.get(endpoint.replace("/", ""), [])
+        return items, response_data.get("meta", {}).get("nextCursor")
+
+    async def _request_internal(
+        self, method, endpoint, params=None, data=None, idempotent=None
+    ):
+        """Async counterpart of MotionAPI._request_internal"""
+        token = await self._get_token()
+        if not token:
+            raise ValueError(
+                "The internal API needs a token, pass token, token_provider "
+                "or token_manager"
+            )
+        headers = {}
+        if data:
+            headers["Content-Type"] = "application/json"
+            data = {"data": data}
+        for attempt in range(2):
+            headers["Authorization"] = f"Bearer {token}"
+            try:
+                response = await self._send(
+                    "internal",
+                    method,
+                    endpoint,
+                    idempotent=idempotent,
+                    headers=headers,
+                    params=params,
+                    json=data,
+                )
+                break
+            except MotionAPIError as e:
+                if e.status_code != 401 or attempt or self.token_manager is None:
+                    raise
+                # Refresh the rejected token once, shared with concurrent requests
+                token = await asyncio.to_thread(self.token_manager.invalidate, token)
+                self.token = token
+        with self.telemetry.span("decode", endpoint=endpoint):
+            return response.json()
+
+    async def get_workspaces(self):
+        return await self._request("GET", "/workspaces")
+
+    async def get_workspace_id(self, workspace_name):
+        for workspace in await self.get_workspaces():
+            if workspace["name"].lower() == workspace_name.lower():
+                return workspace["id"]
+        return None
+
+    async def get_projects(self, workspace_id):
+        return await self._request("GET", "/projects", {"workspaceId": workspace_id})
+
+    async def get_project_id(self, workspace_id, project_name):
+        for project in await self.get_projects(workspace_id):
+            if project["name"].lower() == project_name.lower():
+                return project["id"]
+        return None
+
+    async def get_schedules(self, params=None):
+        return await self._request("GET", "/schedules", params, direct_list=True)
+
+    async def get_tasks(self, params=None, limit=None):
+        return await self._request("GET", "/tasks", params, limit=limit)
+
+    async def get_tasks_in_project(self, project_id):
+        return await self.get_tasks({"projectId": project_id})
+
+    async def fetch_scheduled_entities(self, start_date, end_date):
+        """Return the raw /v2/scheduled-entities response for a date range"""
+        data = MotionAPI.scheduled_entities_payload(start_date, end_date)
+        return await self._request_internal(
+            "POST", "/v2/scheduled-entities", data=data, idempotent=True
+        )
+
+    async def get_tasks_by_date_range(self, start_date, end_date):
+        """Async counterpart of MotionAPI.get_tasks_by_date_range"""
+        response = await self.fetch_scheduled_entities(start_date, end_date)
+        return MotionAPI.organize_scheduled_entities(response)
+
+    async def get_scheduled_entities(self, start_date, end_date):
+        """Async counterpart of MotionAPI.get_scheduled_entities"""
+        response = await self.fetch_scheduled_entities(start_date, end_date)
+        return build_scheduled_entities(response)
+
+    async def create_task(self, task, workspace_id=None):
+        if workspace_id is None:
+            if "workspaceId" in task:
+                workspace_id = task["workspaceId"]
+            else:
+                raise ValueError("workspace_id is required but was not provided")
+        task_data = {"workspaceId": workspace_id, **task}
+
+        # See MotionAPI.create_task
+        idempotency_key = str(uuid.uuid4())
+        started = datetime.now(timezone.utc)
+        attempt = 0
+        while True:
+            try:
+                return await self._request(
+                    "POST", "/tasks", data=task_data, idempotency_key=idempotency_key
+                )
+            except AmbiguousRequestError as error:
+                created = match_created_task(
+                    await self.get_tasks(created_task_query(task_data)),
+                    task_data,
+                    started,
+                )
+                if created is not None:
+                    return created
+                delay = self.retry_policy.retry_ambiguous(attempt, error)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def update_task(self, task, internal=False):
+        task_id = task["id"]
+        if internal:
+            return await self._request_internal(
+                "PATCH", f"/v2/tasks/{task_id}", data=task
+            )
+        return await self._request("PATCH", f"/tasks/{task_id}", data=task)
+
+    async def update_tasks(self, tasks, internal=False):
+        """Update several tasks concurrently
+
+        Returns:
+            list: The response for each task, or the raised exception if the update failed
+        """
+        return await asyncio.gather(
+            *(self.update_task(task, internal) for task in tasks),
+            return_exceptions=True,
+        )
+
+
+class ConcurrentMotionAPI(MotionAPI):
+    """Drop-in MotionAPI whose requests run on an AsyncMotionAPI.
+
+    The async client runs on a private event loop in a background thread, so
+    existing synchronous flows keep working unchanged while bulk operations
+    like update_tasks fan out concurrently. Paginated reads (get_tasks,
+    iter_tasks, fetch_many) send their pages through the async client too.
+    Workspaces, projects and schedules are still served from MotionAPI's cache.
+    """
+
+    def __init__(self, api_key, max_concurrency=8, **kwargs):
+        super().__init__(api_key, **kwargs)
+        self.async_api = AsyncMotionAPI(
+            api_key,
+            period_in_seconds=self.period,
+            rate_limiter=self.rate_limiter,
+            max_concurrency=max_concurrency,
+            token_manager=self.token_manager,
+            timeout=self.timeout,
+            retry_policy=self.retry_policy,
+            circuit_breakers=self.circuit_breakers,
+            base_url=self.base_url,
+            internal_base_url=self.internal_base_url,
+            telemetry=self.telemetry,
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self):
+        if self._loop.is_running():
+            self._run(self.async_api.aclose())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+        super().close()
+
+    def _fetch_tasks(self, params=None, limit=None):
+        return self._run(self.async_api.get_tasks(params, limit))
+
+    def _fetch_page(
+        self, method, endpoint, params, data=None, max_retries=3, direct_list=False
+    ):
+        # iter_pages, and with it iter_tasks and fetch_many, send every page
+        # through the async client; the prefetch threads only wait for them
+        return self._run(
+            self.async_api.fetch_page(
+                method, endpoint, params, data, max_retries, direct_list
+            )
+        )
+
+    def _fetch_scheduled_entities(self, start_date, end_date):
+        return self._run(self.async_api.fetch_scheduled_entities(start_date, end_date))
+
+    def create_task(self, task, workspace_id=None):
+        try:
+            return self._run(self.async_api.create_task(task, workspace_id))
+        finally:
+            # A failed or ambiguous create may still have added the task
+            self._tasks_written()
+
+    def update_task(self, task, internal=False):
+        try:
+            return self._run(self.async_api.update_task(task, internal))
+        finally:
+            self._tasks_written([task["id"]])
+
+    def update_tasks(self, tasks, internal=False, max_workers=None):
+        # Concurrency is bounded by the async client's semaphore instead
+        try:
+            return self._run(self.async_api.update_tasks(tasks, internal))
+        finally:
+            self._tasks_written([task["id"] for task in tasks])
@@ -0,0 +1,107 @@
+from datetime import datetime
+
+
+class BulkUpdateResult:
+    """Outcome of MotionAPI.update_tasks_bulk
+
+    Attributes:
+        succeeded (dict): task id -> API response
+        failed (dict): task id -> exception raised by the update
+        skipped (list): task ids whose patch would not change anything
+        coalesced (int): number of patches merged into another patch for the same task
+    """
+
+    def __init__(self):
+        self.succeeded = {}
+        self.failed = {}
+        self.skipped = []
+        self.coalesced = 0
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def summary(self):
+        return (
+            f"{len(self.succeeded)} updated, {len(self.failed)} failed, "
+            f"{len(self.skipped)} unchanged, {self.coalesced} merged"
+        )
+
+    def __repr__(self):
+        return f"<BulkUpdateResult {self.summary()}>"
+
+
+def coalesce_updates(updates):
+    """Merge patches that target the same task id, later values winning
+
+    Parameters:
+        updates (iterable): Task update dicts, each containing an "id"
+
+    Returns:
+        tuple: (list of merged patches in first-seen order, number of merged patches)
+    """
+    merged = {}
+    coalesced = 0
+    for update in updates:
+        task_id = update["id"]
+        if task_id in merged:
+            merged[task_id].update(update)
+            coalesced += 1
+        else:
+            merged[task_id] = dict(update)
+    return list(merged.values()), coalesced
+
+
+# Internal (/v2) patch keys the public v1 task holds under another name; all
+# other keys are named the same in both APIs
+V1_FIELDS = {
+    "startDate": "startOn",
+    "priorityLevel": "priority",
+}
+# Only set through the internal API, a v1 task never shows them
+INTERNAL_ONLY_FIELDS = frozenset(
+    ("type", "minimumDuration", "blockedByTaskIds", "blockingTaskIds")
+)
+# v1 fields holding a plain "YYYY-MM-DD" date
+DATE_FIELDS = frozenset(("startOn",))
+
+
+def _normalize(value):
+    # Motion returns "2025-07-12T00:00:00.000Z" while callers usually send
+    # datetime.isoformat(), so compare date strings as points in time
+    if isinstance(value, str) and "T" in value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    if isinstance(value, list):
+        return sorted(value, key=str)
+    return value
+
+
+def is_noop(update, current, internal=False):
+    """Return True if applying `update` to the `current` task would change nothing
+
+    Parameters:
+        update (dict): The patch, with internal API keys if `internal`
+        current (dict): The task as returned by the public v1 API
+        internal (bool): Whether the patch is sent to the internal API
+
+    Fields missing from `current`, and internal fields the v1 API does not
+    return, count as changes.
+    """
+    for key, value in update.items():
+        if key == "id":
+            continue
+        if internal:
+            if key in INTERNAL_ONLY_FIELDS:
+                return False
+            key = V1_FIELDS.get(key, key)
+        if key not in current:
+            return False
+        if key in DATE_FIELDS:
+            if str(current[key])[:10] != str(value)[:10]:
+                return False
+        elif _normalize(current[key]) != _normalize(value):
+            return False
+    return True
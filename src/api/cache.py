@@ -0,0 +1,107 @@
+import threading
+import time
+
+from .jsonfile import load_json, save_json
+
+
+class EntityCache:
+    """In-memory cache for slow-changing Motion entities, mirrored to a JSON file.
+
+    Entries are grouped by kind ("workspaces", "projects", "schedules") and a
+    key within the kind (e.g. the workspace id for projects). Each kind has
+    its own time to live. Lists of entities with "id" and "name" get a
+    lower-cased name -> id index so lookups by name don't scan the list.
+    """
+
+    DEFAULT_TTLS = {
+        "workspaces": 24 * 3600,
+        "projects": 3600,
+        "schedules": 24 * 3600,
+    }
+
+    def __init__(self, path=None, ttls=None, clock=time.time):
+        """
+        Parameters:
+            path (str): JSON file to persist the cache to, None to keep it in memory only
+            ttls (dict): Seconds each kind stays fresh, merged over DEFAULT_TTLS
+            clock (callable): Returns the current unix time
+        """
+        self.path = path
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        stored = load_json(self.path) or {}
+        for kind, entries in stored.items():
+            for key, entry in entries.items():
+                self._entries[(kind, key)] = entry
+                self._build_index(kind, key, entry["value"])
+
+    def _save(self):
+        if not self.path:
+            return
+        stored = {}
+        for (kind, key), entry in self._entries.items():
+            stored.setdefault(kind, {})[key] = entry
+        save_json(self.path, stored)
+
+    def _build_index(self, kind, key, value):
+        if isinstance(value, list) and all(
+            isinstance(item, dict) and "id" in item and "name" in item
+            for item in value
+        ):
+            index = {}
+            for item in value:
+                # Keep the first match, like the linear scans this replaces
+                index.setdefault(item["name"].lower(), item["id"])
+            self._indexes[(kind, key)] = index
+        else:
+            self._indexes.pop((kind, key), None)
+
+    def _is_fresh(self, kind, entry):
+        ttl = self.ttls.get(kind, 0)
+        return self.clock() - entry["fetched_at"] < ttl
+
+    def get(self, kind, key=""):
+        """Return the cached value, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is None or not self._is_fresh(kind, entry):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry["value"]
+
+    def set(self, kind, key, value):
+        with self._lock:
+            self._entries[(kind, key)] = {"fetched_at": self.clock(), "value": value}
+            self._build_index(kind, key, value)
+            self._save()
+
+    def lookup_id(self, kind, key, name):
+        """Return the id of the entity called `name` (case-insensitive)
+
+        Returns:
+            str: The id, or None if not cached, expired or not found
+        """
+        if self.get(kind, key) is None:
+            return None
+        return self._indexes.get((kind, key), {}).get(name.lower())
+
+    def invalidate(self, kind=None, key=None):
+        """Drop cached entries; everything if no kind is given, the whole kind if no key"""
+        with self._lock:
+            for entry_kind, entry_key in list(self._entries):
+                if kind is not None and entry_kind != kind:
+                    continue
+                if key is not None and entry_key != key:
+                    continue
+                del self._entries[(entry_kind, entry_key)]
+                self._indexes.pop((entry_kind, entry_key), None)
+            self._save()
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from .jsonfile import load_json, save_json
+
+COLOR_NAMES = {
+    "11": "Tomato",
+    "4": "Flamingo",
+    "6": "Tangerine",
+    "5": "Banana",
+    "2": "Sage",
+    "10": "Basil",
+    "7": "Peacock",
+    "9": "Blueberry",
+    "1": "Lavender",
+    "3": "Grape",
+    "8": "Graphite",
+    "0": "Calendar Color",
+}
+# Events without a colorId use the calendar's color
+DEFAULT_COLOR = {
+    "name": "Calendar Color",
+    "background": "#4285f4",
+    "foreground": "#1d1d1d",
+}
+
+
+class ColorPalette(dict):
+    """Google Calendar event colors by id, with constant time lookups.
+
+    Behaves like the dict get_colors always returned (id -> {"name",
+    "background", "foreground"}) and adds indexes by name and hex code.
+    """
+
+    def __init__(self, colors=None):
+        super().__init__(colors or {})
+        self._ids_by_name = {}
+        self._ids_by_hex = {}
+        for color_id, color in self.items():
+            # Keep the first match, like the linear scans this replaces
+            self._ids_by_name.setdefault(color["name"].lower(), color_id)
+            self._ids_by_hex.setdefault(color["background"].lower(), color_id)
+
+    @classmethod
+    def from_api(cls, event_colors):
+        """Build the palette from the "event" section of a colors.get response"""
+        colors = {}
+        for color_id, color in event_colors.items():
+            color = dict(color)
+            if color["background"] == "#e1e1e1":
+                color["background"] = "#616161"
+            color["name"] = COLOR_NAMES[color_id]
+            colors[color_id] = color
+        colors["0"] = dict(DEFAULT_COLOR)
+        return cls(colors)
+
+    def hex(self, color_id, default=None):
+        color = self.get(color_id)
+        return color["background"] if color else default
+
+    def name(self, color_id, default=None):
+        color = self.get(color_id)
+        return color["name"] if color else default
+
+    def id_for_name(self, name):
+        return self._ids_by_name.get(name.lower()) if name else None
+
+    def id_for_hex(self, hex_code):
+        return self._ids_by_hex.get(hex_code.lower()) if hex_code else None
+
+    def hex_for_name(self, name, default=None):
+        return self.hex(self.id_for_name(name), default)
+
+
+class PaletteCache:
+    """The raw colors.get response and its ETag, persisted to a JSON file.
+
+    The palette practically never changes: within `ttl` it is used without
+    asking Google, afterwards it is revalidated with If-None-Match.
+    """
+
+    def __init__(self, path="google_colors.json", ttl=7 * 24 * 3600, clock=time.time):
+        """
+        Parameters:
+            path (str): JSON file to persist the palette to, None for memory only
+            ttl (float): Seconds the palette is used without revalidation
+            clock (callable): Returns the current unix time
+        """
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.entry = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        self.entry = load_json(self.path)
+
+    def _save(self):
+        save_json(self.path, self.entry)
+
+    @property
+    def etag(self):
+        return self.entry.get("etag") if self.entry else None
+
+    @property
+    def colors(self):
+        return self.entry["colors"] if self.entry else None
+
+    def is_fresh(self):
+        with self._lock:
+            fresh = (
+                self.entry is not None
+                and self.clock() - self.entry["fetched_at"] < self.ttl
+            )
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def set(self, colors, etag=None):
+        with self._lock:
+            self.entry = {"fetched_at": self.clock(), "etag": etag, "colors": colors}
+            self._save()
+
+    def touch(self):
+        """The server confirmed the cached palette is still current"""
+        with self._lock:
+            self.entry["fetched_at"] = self.clock()
+            self._save()
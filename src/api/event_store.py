@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+def event_time(event, key="start"):
+    """Return the start (or end) of a Google Calendar event as an aware datetime
+
+    All-day events start and end at local midnight.
+    """
+    value = event.get(key, {})
+    if value.get("dateTime"):
+        return datetime.fromisoformat(value["dateTime"].replace("Z", "+00:00"))
+    return datetime.fromisoformat(value["date"]).astimezone()
+
+
+class EventStore:
+    """SQLite mirror of Google Calendar events, kept current with sync tokens.
+
+    Each calendar is fully downloaded once; afterwards a sync only applies
+    the events changed or cancelled since the stored sync token. Range
+    queries use an index on the start time.
+    """
+
+    def __init__(self, path="google_events.db", clock=time.time):
+        """
+        Parameters:
+            path (str): SQLite database file, None for an in-memory store
+            clock (callable): Returns the current unix time
+        """
+        self.path = path or ":memory:"
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                calendar_id TEXT NOT NULL,
+                id TEXT NOT NULL,
+                start_ts REAL NOT NULL,
+                end_ts REAL NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (calendar_id, id)
+            );
+            CREATE INDEX IF NOT EXISTS events_by_start ON events (start_ts);
+            CREATE TABLE IF NOT EXISTS calendar_sync (
+                calendar_id TEXT PRIMARY KEY,
+                sync_token TEXT,
+                last_sync REAL NOT NULL,
+                max_span REAL NOT NULL DEFAULT 0
+            );
+            """
+        )
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def sync_token(self, calendar_id):
+        """Return the token the next sync continues from, None if never synced"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sync_token FROM calendar_sync WHERE calendar_id = ?",
+                (calendar_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, calendar_id, max_age):
+        """Return True if the calendar was synced less than `max_age` seconds ago"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_sync FROM calendar_sync WHERE calendar_id = ?",
+                (calendar_id,),
+            ).fetchone()
+        fresh = row is not None and self.clock() - row[0] < max_age
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def apply_sync(self, calendar_id, events, sync_token, full=False):
+        """Store the result of a sync in one transaction
+
+        Parameters:
+            calendar_id (str): The synced calendar
+            events (list): Changed events; cancelled ones are removed
+            sync_token (str): The nextSyncToken of the last page
+            full (bool): The events are the whole calendar, replacing what is stored
+
+        Returns:
+            tuple: (changed, deleted) event counts
+        """
+        rows = []
+        deleted = []
+        max_span = 0.0
+        for event in events:
+            if event.get("status") == "cancelled":
+                deleted.append((calendar_id, event["id"]))
+                continue
+            event["calendarId"] = calendar_id
+            start = event_time(event, "start").timestamp()
+            end = event_time(event, "end").timestamp()
+            max_span = max(max_span, end - start)
+            rows.append((calendar_id, event["id"], start, end, json.dumps(event)))
+
+        with self._lock:
+            if full:
+                self._db.execute(
+                    "DELETE FROM events WHERE calendar_id = ?", (calendar_id,)
+                )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._db.executemany(
+                "DELETE FROM events WHERE calendar_id = ? AND id = ?", deleted
+            )
+            self._db.execute(
+                """
+                INSERT INTO calendar_sync VALUES (?, ?, ?, ?)
+                ON CONFLICT(calendar_id) DO UPDATE SET
+                    sync_token = excluded.sync_token,
+                    last_sync = excluded.last_sync,
+                    max_span = CASE WHEN ? THEN excluded.max_span
+                        ELSE MAX(max_span, excluded.max_span) END
+                """,
+                (calendar_id, sync_token, self.clock(), max_span, full),
+            )
+            self._db.commit()
+        return len(rows), len(deleted)
+
+    def clear(self, calendar_id):
+        """Forget a calendar, e.g. after its sync token expired"""
+        with self._lock:
+            self._db.execute("DELETE FROM events WHERE calendar_id = ?", (calendar_id,))
+            self._db.execute(
+                "DELETE FROM calendar_sync WHERE calendar_id = ?", (calendar_id,)
+            )
+            self._db.commit()
+
+    def get_events(self, calendar_ids, start, end):
+        """Return the events of the calendars overlapping [start, end)
+
+        Parameters:
+            calendar_ids (list): The calendars to read
+            start (float): Unix time the events must end after
+            end (float): Unix time the events must start before
+
+        Returns:
+            list: The events ordered by start time
+        """
+        calendar_ids = list(calendar_ids)
+        if not calendar_ids:
+            return []
+        placeholders = ",".join("?" * len(calendar_ids))
+        with self._lock:
+            # Bounding the start by the longest event keeps the index scan short
+            (max_span,) = self._db.execute(
+                f"""
+                SELECT COALESCE(MAX(max_span), 0) FROM calendar_sync
+                WHERE calendar_id IN ({placeholders})
+                """,
+                calendar_ids,
+            ).fetchone()
+            rows = self._db.execute(
+                f"""
+                SELECT data FROM events
+                WHERE start_ts >= ? AND start_ts < ? AND end_ts > ?
+                    AND calendar_id IN ({placeholders})
+                ORDER BY start_ts
+                """,
+                (start - max_span, end, start, *calendar_ids),
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
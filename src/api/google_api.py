@@ -1,129 +1,450 @@
-import pickle
 import os
-import google.auth
-from datetime import datetime
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from googleapiclient.errors import HttpError
+
+from .color_palette import ColorPalette, PaletteCache
+from .event_store import EventStore, event_time
+from .telemetry import Telemetry
+
+# The largest page events.list allows
+EVENTS_PAGE_SIZE = 2500
+# Only what the overview and the event listing use
+EVENT_FIELDS = (
+    "nextPageToken,"
+    "items(id,summary,start,end,colorId,transparency,status,recurringEventId)"
+)
+SYNC_FIELDS = "nextSyncToken," + EVENT_FIELDS
+CALENDAR_LIST_FIELDS = "nextPageToken,items(id,summary,primary,selected)"
+
+
+def _utc_timestamp(date):
+    # Naive datetimes are UTC, as they always were for the Calendar API queries
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp()
+
+
+def _rfc3339(date):
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date.isoformat() + "Z"  # 'Z' indicates UTC time
 
 
 class GoogleCalendarAPI:
-    def __init__(self, client_secrets_file, token_file=None):
+    def __init__(
+        self,
+        client_secrets_file,
+        token_file="google_token.json",
+        telemetry=None,
+        max_workers=4,
+        event_store_path="google_events.db",
+        sync_max_age=60,
+        palette_cache_path="google_colors.json",
+        palette_ttl=7 * 24 * 3600,
+    ):
         self.client_secrets_file = client_secrets_file
         self.token_file = token_file
         self.scopes = ["https://www.googleapis.com/auth/calendar.readonly"]
-        self.service = self.get_calendar_service()
+        self.telemetry = telemetry or Telemetry()
+        # Local copy of all events, kept current with incremental syncs;
+        # calendars synced less than sync_max_age seconds ago are not asked
+        self.event_store = EventStore(event_store_path)
+        self.sync_max_age = sync_max_age
+        self.telemetry.register_cache("google_events", self.event_store)
+        # The color palette practically never changes, keep it across runs
+        self.palette_cache = PaletteCache(palette_cache_path, palette_ttl)
+        self.telemetry.register_cache("google_colors", self.palette_cache)
+        self._palette = None
+        self._palette_lock = threading.Lock()
+        # Calendars fetched in parallel; httplib2 is not thread-safe, so every
+        # worker thread gets its own authorized connection
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self._calendar_ids = None
+        # Credentials and the client are only loaded once Google is used, so
+        # Motion-only runs don't pay for them
+        self._credentials = None
+        self._service = None
+        self._service_lock = threading.RLock()
+
+    @property
+    def credentials(self):
+        with self._service_lock:
+            if self._credentials is None:
+                self._credentials = self.load_credentials()
+            return self._credentials
+
+    @property
+    def service(self):
+        """The Google Calendar API client, built on first use"""
+        with self._service_lock:
+            if self._service is None:
+                self._service = self.get_calendar_service()
+            return self._service
+
+    def load_credentials(self):
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
 
-    def get_calendar_service(self):
         creds = None
         # Check if the token file exists and load credentials from it.
         if os.path.exists(self.token_file):
-            with open(self.token_file, "rb") as token:
-                creds = pickle.load(token)
+            creds = Credentials.from_authorized_user_file(self.token_file, self.scopes)
+        else:
+            creds = self._load_pickled_credentials()
         # If there are no (valid) credentials available, prompt the user to log in.
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
                 flow = InstalledAppFlow.from_client_secrets_file(
                     self.client_secrets_file, self.scopes
                 )
                 creds = flow.run_local_server(port=0)
             # Save the credentials for the next run
-            with open(self.token_file, "wb") as token:
-                pickle.dump(creds, token)
-        # Build the Google Calendar API client
-        calendar = build("calendar", "v3", credentials=creds)
-        return calendar
+            self._save_credentials(creds)
+        return creds
+
+    def _load_pickled_credentials(self):
+        # Token files used to be pickles, convert an existing one to JSON
+        pickle_file = os.path.splitext(self.token_file)[0] + ".pickle"
+        if pickle_file == self.token_file or not os.path.exists(pickle_file):
+            return None
+        import pickle
+
+        with open(pickle_file, "rb") as token:
+            creds = pickle.load(token)
+        self._save_credentials(creds)
+        return creds
+
+    def _save_credentials(self, creds):
+        # JSON loads faster than a pickle and runs no code
+        with open(self.token_file, "w") as token:
+            token.write(creds.to_json())
+
+    def get_calendar_service(self):
+        from googleapiclient.discovery import build
+
+        # Build the Google Calendar API client from the discovery document
+        # bundled with the library, without fetching it
+        return build(
+            "calendar",
+            "v3",
+            credentials=self.credentials,
+            static_discovery=True,
+            cache_discovery=False,
+        )
+
+    def close(self):
+        """Close the event store"""
+        self.event_store.close()
+
+    def _thread_http(self):
+        """Return an authorized HTTP connection owned by the current thread"""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import google_auth_httplib2
+            import httplib2
+
+            http = self._local.http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http()
+            )
+        return http
+
+    def _execute(self, request, endpoint):
+        """Execute a Google API request, recording it in the telemetry
+
+        Runs on the calling thread's own connection, so requests may be
+        made from several threads at once.
+
+        Parameters:
+            request: The googleapiclient HttpRequest
+            endpoint (str): Name the request is grouped under, e.g. "events.list"
+        """
+        with self.telemetry.request("google", request.method, endpoint) as span:
+            try:
+                result = request.execute(http=self._thread_http())
+            except HttpError as error:
+                span.set_attribute("status_code", error.resp.status)
+                raise
+            span.set_attribute("status_code", 200)
+        self.telemetry.increment("pages", f"google {endpoint}")
+        return result
 
     def list_upcoming_events(self, calendar_id="primary"):
         # Call the Calendar API
         now = datetime.utcnow().isoformat() + "Z"  # 'Z' indicates UTC time
-        events_result = (
-            self.service.events()
-            .list(
+        events_result = self._execute(
+            self.service.events().list(
                 calendarId=calendar_id,
                 timeMin=now,
                 maxResults=10,
                 singleEvents=True,
                 orderBy="startTime",
-            )
-            .execute()
+            ),
+            "events.list",
         )
         events = events_result.get("items", [])
         return events
 
-    def get_colors(self):
-        """Get the color palette for the calendar
+    def get_calendar_ids(self, refresh=False):
+        """Get the ids of the calendars shown in Google Calendar
 
         Returns:
-            dict: A dictionary of color ids to color names and hex codes"""
-        id_to_color_name = {
-            "11": "Tomato",
-            "4": "Flamingo",
-            "6": "Tangerine",
-            "5": "Banana",
-            "2": "Sage",
-            "10": "Basil",
-            "7": "Peacock",
-            "9": "Blueberry",
-            "1": "Lavender",
-            "3": "Grape",
-            "8": "Graphite",
-            "0": "Calendar Color",
-        }
-        colors = self.service.colors().get().execute()
-        for colorId in colors["event"].keys():
-            if colors["event"][colorId]["background"] == "#e1e1e1":
-                colors["event"][colorId]["background"] = "#616161"
-            colors["event"][colorId]["name"] = id_to_color_name[colorId]
-        colors["event"]["0"] = {
-            "name": "Calendar Color",
-            "background": "#4285f4",
-            "foreground": "#1d1d1d",
+            list: The primary calendar first, then the other selected calendars
+        """
+        if self._calendar_ids is not None and not refresh:
+            return self._calendar_ids
+        calendars = []
+        request = self.service.calendarList().list(
+            maxResults=250, fields=CALENDAR_LIST_FIELDS
+        )
+        while request is not None:
+            response = self._execute(request, "calendarList.list")
+            calendars.extend(response.get("items", []))
+            request = self.service.calendarList().list_next(request, response)
+        self._calendar_ids = [
+            calendar["id"]
+            for calendar in sorted(calendars, key=lambda c: not c.get("primary"))
+            if calendar.get("primary") or calendar.get("selected")
+        ]
+        return self._calendar_ids
+
+    def iter_events(self, calendar_id, time_min, time_max):
+        """Yield the events of one calendar ordered by start time, page by page
+
+        Parameters:
+            calendar_id (str): The calendar id
+            time_min (str): RFC 3339 lower bound of the event end
+            time_max (str): RFC 3339 upper bound of the event start
+
+        Yields:
+            dict: The events, with only the fields in EVENT_FIELDS
+        """
+        events = self.service.events()
+        request = events.list(
+            calendarId=calendar_id,
+            timeMin=time_min,
+            timeMax=time_max,
+            singleEvents=True,
+            orderBy="startTime",
+            maxResults=EVENTS_PAGE_SIZE,
+            fields=EVENT_FIELDS,
+        )
+        while request is not None:
+            response = self._execute(request, "events.list")
+            yield from response.get("items", [])
+            request = events.list_next(request, response)
+
+    def _fetch_calendar(self, calendar_id, time_min, time_max):
+        events = list(self.iter_events(calendar_id, time_min, time_max))
+        for event in events:
+            event["calendarId"] = calendar_id
+        return events
+
+    def _map_calendars(self, function, calendar_ids, errors=None):
+        """Call function(calendar_id) for each calendar on the thread pool
+
+        Parameters:
+            errors (dict): If given, a calendar whose call raised is skipped and
+                its exception stored here by calendar id instead of raised
+
+        Returns:
+            list: The results of the calendars that succeeded, in order
+        """
+        workers = max(1, min(self.max_workers, len(calendar_ids)))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="google-calendar"
+        ) as executor:
+            futures = [executor.submit(function, c) for c in calendar_ids]
+        results = []
+        for calendar_id, future in zip(calendar_ids, futures):
+            error = future.exception()
+            if error is None:
+                results.append(future.result())
+            elif errors is None:
+                raise error
+            else:
+                errors[calendar_id] = error
+        return results
+
+    def sync_calendar(self, calendar_id):
+        """Bring the event store up to date with one calendar
+
+        With a stored sync token only the events changed or cancelled since
+        the last sync are transferred. Without one, or once Google expired
+        it (410 Gone), the whole calendar is downloaded again.
+
+        Returns:
+            tuple: (changed, deleted) event counts
+        """
+        sync_token = self.event_store.sync_token(calendar_id)
+        try:
+            events, next_token = self._list_changes(calendar_id, sync_token)
+        except HttpError as error:
+            if sync_token is None or error.resp.status != 410:
+                raise
+            self.telemetry.increment("google_sync", "expired")
+            # Drop the calendar with its expired token, so a failing full
+            # resync starts over next time instead of serving stale events
+            self.event_store.clear(calendar_id)
+            sync_token = None
+            events, next_token = self._list_changes(calendar_id, None)
+        kind = "incremental" if sync_token else "full"
+        self.telemetry.increment("google_sync", kind)
+        return self.event_store.apply_sync(
+            calendar_id, events, next_token, full=sync_token is None
+        )
+
+    def sync_calendars(self, calendar_ids, max_age=None, errors=None):
+        """Sync the calendars not synced within max_age seconds, concurrently
+
+        With an `errors` dict, calendars that fail to sync are recorded in it
+        by calendar id instead of failing the others.
+        """
+        max_age = self.sync_max_age if max_age is None else max_age
+        stale = [
+            calendar_id
+            for calendar_id in calendar_ids
+            if not self.event_store.is_fresh(calendar_id, max_age)
+        ]
+        if stale:
+            self._map_calendars(self.sync_calendar, stale, errors)
+
+    def _list_changes(self, calendar_id, sync_token):
+        """Return the events changed since sync_token (None: all), and the next token"""
+        params = {
+            "calendarId": calendar_id,
+            "singleEvents": True,
+            "maxResults": EVENTS_PAGE_SIZE,
+            "fields": SYNC_FIELDS,
         }
-        return colors["event"]
+        if sync_token is not None:
+            params["syncToken"] = sync_token
+        events = self.service.events()
+        request = events.list(**params)
+        changed = []
+        response = {}
+        while request is not None:
+            response = self._execute(request, "events.list")
+            changed.extend(response.get("items", []))
+            request = events.list_next(request, response)
+        return changed, response.get("nextSyncToken")
+
+    def get_colors(self, refresh=False):
+        """Get the color palette for the calendar
+
+        Served from memory or the palette cache file. Once palette_ttl has
+        passed it is revalidated with its ETag, an unchanged palette costs a
+        304 without a body.
+
+        Returns:
+            ColorPalette: A dictionary of color ids to color names and hex codes,
+                with lookups by id, name and hex code"""
+        with self._palette_lock:
+            if refresh or not self.palette_cache.is_fresh():
+                self._revalidate_colors()
+                self._palette = None
+            if self._palette is None:
+                self._palette = ColorPalette.from_api(self.palette_cache.colors)
+            return self._palette
+
+    def _revalidate_colors(self):
+        request = self.service.colors().get()
+        if self.palette_cache.etag:
+            request.headers["If-None-Match"] = self.palette_cache.etag
+
+        # execute() only returns the body, keep the headers for the ETag
+        response_headers = {}
+        parse = request.postproc
+
+        def postproc(response, content):
+            response_headers.update(response)
+            return parse(response, content)
+
+        request.postproc = postproc
+        try:
+            colors = self._execute(request, "colors.get")
+        except HttpError as error:
+            if error.resp.status != 304:
+                raise
+            self.palette_cache.touch()
+            return
+        self.palette_cache.set(colors["event"], response_headers.get("etag"))
 
     def get_events_by_date_range(
-        self, start_date, end_date, calendar_id="primary", get_transparent=False
+        self,
+        start_date,
+        end_date,
+        calendar_id="primary",
+        get_transparent=False,
+        use_cache=True,
+        errors=None,
     ):
         """Get all events between start_date and end_date
         add colorHex and duration to each event
 
         Args:
-            start_date (datetime): The start date
+            start_date (datetime): The start date, naive dates are UTC
             end_date (datetime): The end date
-            calendar_id (str, optional): The calendar id. Defaults to 'primary'.
+            calendar_id (str or list, optional): The calendar id(s), fetched
+                concurrently. None for all calendars shown in Google Calendar.
+                Defaults to 'primary'.
+            use_cache (bool, optional): Sync the local event store and read the
+                range from it. Defaults to True.
+            errors (dict, optional): Collects the exception of each calendar
+                that could not be fetched by calendar id, leaving out its events.
+                Without it the first failure is raised.
 
         Returns:
-            list: A list of events
+            list: A list of events of all calendars, ordered by start time
         """
-        # Call the Calendar API
-        start_date = start_date.isoformat() + "Z"  # 'Z' indicates UTC time
-        end_date = end_date.isoformat() + "Z"
-        events_result = (
-            self.service.events()
-            .list(
-                calendarId=calendar_id,
-                timeMin=start_date,
-                timeMax=end_date,
-                singleEvents=True,
-                orderBy="startTime",
+        if calendar_id is None:
+            calendar_ids = self.get_calendar_ids()
+        elif isinstance(calendar_id, str):
+            calendar_ids = [calendar_id]
+        else:
+            calendar_ids = list(calendar_id)
+
+        if use_cache:
+            self.sync_calendars(calendar_ids, errors=errors)
+            if errors:
+                # Stored events of a calendar that failed to sync may be stale
+                calendar_ids = [c for c in calendar_ids if c not in errors]
+            events = self.event_store.get_events(
+                calendar_ids, _utc_timestamp(start_date), _utc_timestamp(end_date)
             )
-            .execute()
-        )
-        events = events_result.get("items", [])
+        else:
+            # Call the Calendar API
+            time_min, time_max = _rfc3339(start_date), _rfc3339(end_date)
+            per_calendar = self._map_calendars(
+                lambda calendar: self._fetch_calendar(calendar, time_min, time_max),
+                calendar_ids,
+                errors,
+            )
+            # Every calendar is already ordered by start time
+            events = heapq.merge(*per_calendar, key=event_time)
 
         colors = self.get_colors()
         return_events = []
+        seen_ids = set()
         for event in events:
+            # An invitation shows up in the calendar of every attendee
+            if event["id"] in seen_ids:
+                continue
+            seen_ids.add(event["id"])
             if not get_transparent and event.get("transparency", "") == "transparent":
                 continue
             if not event.get("colorId"):
                 # return id of 0 if no color is set
                 event["colorId"] = "0"
 
-            event["colorHex"] = colors[event["colorId"]]["background"]
+            event["colorHex"] = colors.hex(event["colorId"], colors.hex("0"))
 
             # calculate duration
             if event.get("start").get("dateTime"):
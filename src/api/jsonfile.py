@@ -0,0 +1,35 @@
+import json
+import os
+
+
+def load_json(path):
+    """Read a JSON file written by save_json
+
+    Returns:
+        The decoded value, or None if there is no path, no file or it is unreadable
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable cache file {path}: {e}")
+        return None
+
+
+def save_json(path, value):
+    """Write `value` to a JSON file atomically, doing nothing without a path
+
+    The value is written to a temporary file first, so readers never see a
+    half written file.
+    """
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w") as file:
+            json.dump(value, file)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Failed to write cache file {path}: {e}")
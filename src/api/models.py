@@ -0,0 +1,252 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+
+def parse_timestamp(value):
+    """Parse a Motion date or timestamp
+
+    Returns:
+        tuple: (datetime or None, whether the value had a time component)
+    """
+    if not value:
+        return None, False
+    try:
+        if "T" in value:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")), True
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc), False
+    except (TypeError, ValueError):
+        return None, False
+
+
+@dataclass(slots=True)
+class ProjectRef:
+    id: str
+    name: str
+    description: str = ""
+    workspace_id: str = None
+    raw: dict = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            id=data["id"],
+            name=data.get("name", ""),
+            description=data.get("description") or "",
+            workspace_id=data.get("workspaceId"),
+            raw=data,
+        )
+
+
+@dataclass(slots=True)
+class Task:
+    """A Motion task. `chunks` only holds the chunks inside the fetched range."""
+
+    id: str
+    name: str
+    workspace_id: str = None
+    project: ProjectRef = None
+    duration: float = 0
+    chunk_ids: tuple = ()
+    chunks: list = field(default_factory=list, repr=False)
+    raw: dict = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_json(cls, data, project=None):
+        return cls(
+            id=data["id"],
+            name=data.get("name", ""),
+            workspace_id=data.get("workspaceId"),
+            project=project,
+            duration=data.get("duration") or 0,
+            chunk_ids=tuple(data.get("chunkIds") or ()),
+            raw=data,
+        )
+
+    @property
+    def is_chunked(self):
+        return bool(self.chunks)
+
+    @property
+    def scheduled_duration(self):
+        """Minutes scheduled for the task, summed over its chunks if it has any"""
+        if self.chunks:
+            return sum(chunk.scheduled_duration for chunk in self.chunks)
+        return self.duration
+
+    @property
+    def scheduled_start(self):
+        return parse_timestamp(self.raw.get("scheduledStart"))[0]
+
+    @property
+    def all_day(self):
+        return False
+
+
+@dataclass(slots=True)
+class ScheduledEntity:
+    """A block of time on the Motion schedule"""
+
+    id: str
+    type: str
+    start: datetime = None
+    end: datetime = None
+    all_day: bool = False
+    timeless: bool = False
+    raw: dict = field(default=None, repr=False, compare=False)
+    task: Task = None
+
+    @classmethod
+    def from_json(cls, data, **kwargs):
+        schedule = data.get("schedule") or {}
+        start, start_has_time = parse_timestamp(schedule.get("start"))
+        end, end_has_time = parse_timestamp(schedule.get("end"))
+        return cls(
+            id=data["id"],
+            type=data.get("type"),
+            start=start,
+            end=end,
+            all_day=start is not None and not start_has_time,
+            timeless=bool(data.get("timeless")),
+            raw=data,
+            **kwargs,
+        )
+
+    @property
+    def scheduled_duration(self):
+        """Scheduled minutes, or the model's own duration for untimed entities"""
+        if self.start and self.end and not self.all_day and not self.timeless:
+            return (self.end - self.start).total_seconds() / 60
+        return self._untimed_duration()
+
+    def _untimed_duration(self):
+        return self.task.duration if self.task is not None else 0
+
+    @property
+    def scheduled_start(self):
+        if self.task is not None and self.task.raw.get("scheduledStart"):
+            return self.task.scheduled_start
+        return self.start
+
+    @property
+    def name(self):
+        return self.task.name if self.task is not None else ""
+
+    @property
+    def project(self):
+        return self.task.project if self.task is not None else None
+
+    @property
+    def workspace_id(self):
+        return self.task.workspace_id if self.task is not None else None
+
+
+@dataclass(slots=True)
+class Chunk(ScheduledEntity):
+    parent: Task = None
+    chunk_raw: dict = field(default=None, repr=False, compare=False)
+
+    def _untimed_duration(self):
+        return (self.chunk_raw or {}).get("duration") or 0
+
+    @property
+    def name(self):
+        return (self.chunk_raw or {}).get("name") or ""
+
+    @property
+    def project(self):
+        return self.parent.project if self.parent is not None else None
+
+    @property
+    def workspace_id(self):
+        return self.parent.workspace_id if self.parent is not None else None
+
+
+@dataclass(slots=True)
+class CalendarEvent(ScheduledEntity):
+    title: str = ""
+    event_raw: dict = field(default=None, repr=False, compare=False)
+
+    @property
+    def name(self):
+        return self.title
+
+
+@dataclass(slots=True)
+class ScheduledEntities:
+    """Scheduled entities of a date range, linked by reference instead of copies"""
+
+    regular_tasks: list = field(default_factory=list)  # TASK entities without chunks
+    chunked_tasks: list = field(default_factory=list)  # Tasks with chunks in the range
+    chunks: list = field(default_factory=list)
+    calendar_events: list = field(default_factory=list)
+    all_scheduled_entities: list = field(default_factory=list)
+
+
+def build_scheduled_entities(response):
+    """Turn a /v2/scheduled-entities response into linked models
+
+    Parameters:
+        response (dict): The decoded response of the internal API
+
+    Returns:
+        ScheduledEntities: The models, sharing Task and ProjectRef instances
+    """
+    models = response.get("models", {})
+    task_models = models.get("tasks", {})
+    chunk_models = models.get("chunks", {})
+    event_models = models.get("calendarEvents", {})
+    project_models = models.get("projects", {})
+
+    projects = {}
+    tasks = {}
+
+    def get_project(project_id):
+        project = projects.get(project_id)
+        if project is None and project_id in project_models:
+            project = projects[project_id] = ProjectRef.from_json(
+                project_models[project_id]
+            )
+        return project
+
+    def get_task(task_id):
+        task = tasks.get(task_id)
+        if task is None and task_id in task_models:
+            data = task_models[task_id]
+            task = tasks[task_id] = Task.from_json(
+                data, get_project(data.get("projectId"))
+            )
+        return task
+
+    result = ScheduledEntities()
+    scheduled_tasks = []
+    for entity_id, entity in models.get("scheduledEntities", {}).items():
+        entity_type = entity.get("type")
+        if entity_type == "TASK":
+            item = ScheduledEntity.from_json(entity, task=get_task(entity_id))
+            if item.task is not None:
+                scheduled_tasks.append(item)
+        elif entity_type == "CHUNK" and entity_id in chunk_models:
+            chunk_data = chunk_models[entity_id]
+            parent = get_task(chunk_data.get("parentTaskId"))
+            item = Chunk.from_json(entity, parent=parent, chunk_raw=chunk_data)
+            if parent is not None:
+                parent.chunks.append(item)
+            result.chunks.append(item)
+        elif entity_type == "EVENT" and entity_id in event_models:
+            event_data = event_models[entity_id]
+            item = CalendarEvent.from_json(
+                entity, title=event_data.get("title", ""), event_raw=event_data
+            )
+            result.calendar_events.append(item)
+        else:
+            item = ScheduledEntity.from_json(entity)
+        result.all_scheduled_entities.append(item)
+
+    # Keep the order of the task models, like organize_scheduled_entities
+    result.chunked_tasks = [
+        tasks[task_id]
+        for task_id in task_models
+        if task_id in tasks and tasks[task_id].chunks
+    ]
+    result.regular_tasks = [item for item in scheduled_tasks if not item.task.chunks]
+    return result
@@ -1,13 +1,55 @@
-import os
-import jwt
 import constants
-import sys
-import time
 import requests
 from datetime import datetime, timedelta, timezone
+import os
 import re
 from collections import defaultdict
 import pytz
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.exceptions import NewConnectionError
+
+from .bulk import BulkUpdateResult, coalesce_updates, is_noop
+from .cache import EntityCache
+from .models import build_scheduled_entities
+from .pagination import fetch_all_concurrently, iter_cursor_pages
+from .rate_limiter import RateLimiter
+from .resilience import (
+    AmbiguousRequestError,
+    CircuitBreaker,
+    MotionAPIError,
+    RetryPolicy,
+    created_task_query,
+    match_created_task,
+)
+from .schedule_cache import ScheduledEntityCache
+from .session import SessionPool
+from .streaming import decode_json, read_response, require_ijson
+from .task_store import TaskStore, task_scope
+from .telemetry import Telemetry, endpoint_template
+from .token_manager import TokenManager
+
+API_BASE_URL = "https://api.usemotion.com/v1"
+INTERNAL_BASE_URL = "https://internal.usemotion.com"
+
+
+def _may_have_reached_server(error):
+    """Whether a request that raised `error` may have been processed"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return False
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return not isinstance(reason, NewConnectionError)
+
+
+def _transfer_sizes(response, streamed=False):
+    """Return the (sent, received) body sizes of a requests response in bytes"""
+    sent = len(getattr(response.request, "body", None) or b"")
+    if streamed:
+        # Reading the content here would defeat streaming
+        return sent, int(response.headers.get("Content-Length") or 0)
+    return sent, len(response.content)
 
 
 class MotionAPI:
@@ -17,94 +59,175 @@ class MotionAPI:
         max_calls_per_minute=12,
         period_in_seconds=60,
         token_file_path="token.txt",
+        pool_size=10,
+        max_connection_retries=0,
+        internal_calls_per_minute=None,
+        burst=None,
+        rate_limiter=None,
+        cache_path="motion_cache.json",
+        cache_ttls=None,
+        task_store_path=None,
+        task_max_age=300,
+        schedule_past_ttl=6 * 3600,
+        schedule_future_ttl=300,
+        stream_responses=False,
+        prefetch_workers=4,
+        retry_policy=None,
+        circuit_breakers=None,
+        base_url=API_BASE_URL,
+        internal_base_url=INTERNAL_BASE_URL,
+        telemetry=None,
+        token_manager=None,
+        timeout=30.0,
+        prefetch_token=False,
     ):
         self.api_key = api_key
         self.max_calls = max_calls_per_minute
         self.period = period_in_seconds
+        # Seconds to connect and between received bytes, so a stalled server
+        # fails the attempt instead of hanging it
+        self.timeout = timeout
         self.request_count = 0
-        self.last_request_time = time.time()
+        # The public v1 API and the internal API are throttled independently
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+            rate_limiter.add_bucket(
+                "public", max_calls_per_minute, period_in_seconds, burst
+            )
+            rate_limiter.add_bucket(
+                "internal",
+                internal_calls_per_minute or max_calls_per_minute,
+                period_in_seconds,
+                burst,
+            )
+        self.rate_limiter = rate_limiter
+        # Retries with backoff share one budget per run; each API gets a
+        # circuit breaker that holds every caller back while it keeps failing
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breakers = circuit_breakers or {
+            "public": CircuitBreaker(),
+            "internal": CircuitBreaker(),
+        }
+        # Overridable to run against a local stub server
+        self.base_url = base_url
+        self.internal_base_url = internal_base_url
+        # Workspaces, projects and schedules rarely change, keep them across runs
+        self.cache = EntityCache(cache_path, cache_ttls)
+        # Local mirror of /tasks results, reused while younger than task_max_age.
+        # In memory unless a path is given, so the next run sees changes made
+        # in the Motion app; a bare file name is put next to the entity cache
+        if task_store_path and cache_path and not os.path.dirname(task_store_path):
+            task_store_path = os.path.join(
+                os.path.dirname(cache_path), task_store_path
+            )
+        self.task_store = TaskStore(task_store_path)
+        self.task_max_age = task_max_age
+        # Scheduled entities cached per day, so overlapping ranges are fetched once
+        self.schedule_cache = ScheduledEntityCache(
+            self._fetch_scheduled_entities,
+            past_ttl=schedule_past_ttl,
+            future_ttl=schedule_future_ttl,
+        )
+        # Parse large internal responses incrementally (requires ijson)
+        if stream_responses:
+            require_ijson()
+        self.stream_responses = stream_responses
+        # Latencies, transfer sizes, waits and cache hit rates of this client
+        self.telemetry = telemetry or Telemetry()
+        self.telemetry.register_cache("entities", self.cache)
+        self.telemetry.register_cache("tasks", self.task_store)
+        self.telemetry.register_cache("scheduled_entities", self.schedule_cache)
+        # Background threads requesting the next page while the current one is processed
+        self.prefetch_workers = prefetch_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
         self.token_file_path = token_file_path
-        self.token = None
         self.token_url = constants.NEW_MOTION_TOKEN_URL
-        self.load_token()
+        # Internal API token, refreshed ahead of expiry and shared between
+        # processes through the token file
+        self.token_manager = token_manager or TokenManager(
+            self.token_url, constants.NEW_MOTION_TOKEN_KEY, token_file_path
+        )
+        # Connection errors are retried by the retry policy alone, so they
+        # count against its budget and reach the circuit breaker
+        self.sessions = SessionPool(
+            pool_size=pool_size, max_connection_retries=max_connection_retries
+        )
+        # Prebuild the per-host sessions so the default headers are set once
+        self.sessions.get(
+            self.base_url,
+            headers={
+                "X-API-Key": self.api_key,
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+        )
+        self.sessions.get(
+            self.internal_base_url, headers={"Accept": "application/json"}
+        )
+        # The token is fetched by the first internal request; prefetching it
+        # overlaps that fetch with the first public requests instead
+        if prefetch_token:
+            self.token_manager.prefetch()
 
-    def load_token(self):
-        if not self.token:
-            return False
-        try:
-            # Read the token from disk if it exists
-            if not self.token and os.path.exists(self.token_file_path):
-                with open(self.token_file_path, "r") as file:
-                    self.token = file.read()
-
-            # If the file does not exist or the token is still empty, request a new one
-            if not self.token:
-                response = requests.get(
-                    self.token_url, params={"key": constants.NEW_MOTION_TOKEN_KEY}
-                )
-                response.raise_for_status()
-                self.token = response.json().get("access_token", "")
+    def __enter__(self):
+        return self
 
-                # Persist the freshly retrieved token
-                with open(self.token_file_path, "w") as file:
-                    file.write(self.token)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-            # Validate the token we now have; refresh if needed
-            if self.is_token_valid():
-                return
+    def close(self):
+        """Close all pooled connections, prefetch threads and the task store"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.sessions.close()
+        self.task_store.close()
+
+    def connection_stats(self):
+        """Return per-host request and connection-reuse counters"""
+        return self.sessions.connection_stats()
+
+    @property
+    def token(self):
+        return self.token_manager.token
+
+    @token.setter
+    def token(self, token):
+        self.token_manager.set_token(token)
+
+    def load_token(self):
+        """Make sure a valid token is available, from the token file or the token URL
+
+        Returns:
+            bool: True if there is a valid token
+        """
+        try:
+            self.token_manager.get_token()
+            return True
         except requests.exceptions.HTTPError as http_err:
             print(f"HTTP error occurred: {http_err}")
         except Exception as e:
             print(f"An error occurred: {e}")
+        return False
 
     def is_token_valid(self):
-        try:
-            # Decode the token without verification - we're not checking the signature here
-            payload = jwt.decode(self.token, options={"verify_signature": False})
-            # Get the current time
-            now = datetime.utcnow()
-            # Get the expiration time from the token
-            exp = datetime.utcfromtimestamp(payload["exp"])
-
-            # Check if the current time is before the expiration time
-            return now < exp
-        except jwt.ExpiredSignatureError:
-            # Token is expired
-            return False
-        except jwt.InvalidTokenError:
-            # Token is invalid for some other reason
-            return False
-        except Exception as e:
-            print(f"An error occurred during token validation: {e}")
-            return False
+        # The expiry is decoded once per token, not on every check
+        return self.token_manager.is_valid()
 
     def refresh_token_if_invalid(self):
         if not self.is_token_valid():
             self.load_token()
 
-    def _rate_limit(self):
-        # Reset request count every period
-        current_time = time.time()
-        if current_time - self.last_request_time >= self.period:
-            self.request_count = 0
-            self.last_request_time = current_time
-
-        # If request count is at limit, sleep until a period has passed since the last request
-        while self.request_count >= self.max_calls:
-            wait_time = self.period - (current_time - self.last_request_time)
-            sys.stdout.write(
-                f"\rRate limit reached, waiting for {wait_time:.2f} seconds..."
-            )
-            sys.stdout.flush()
-            time.sleep(1)
-            current_time = time.time()
-            if current_time - self.last_request_time >= self.period:
-                self.request_count = 0
-                self.last_request_time = current_time
+    def _rate_limit(self, bucket="public"):
+        """Wait until the given rate limit bucket allows another request
 
-        # Clear the timer line
-        sys.stdout.write("\r")
-        sys.stdout.flush()
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = self.rate_limiter.acquire(bucket)
+        self.telemetry.record_wait("throttle", waited)
+        return waited
 
     def _request(
         self,
@@ -115,6 +238,7 @@ class MotionAPI:
         limit=None,
         max_retries=3,
         direct_list=False,
+        idempotency_key=None,
     ):
         """Make a request to the Motion API and return the response data
         Parameters:
@@ -123,137 +247,355 @@ class MotionAPI:
             params (dict): Query parameters to include in the request
             data (dict): Data to include in the request body
             limit (int): The maximum number of pages to fetch (default: None)
-            max_retries (int): Maximum number of retries for 429 responses
+            max_retries (int): Maximum number of retries per request
+            idempotency_key (str): Sent as Idempotency-Key with a POST
         Returns:
             list: A list of results from the API
+        Raises:
+            MotionAPIError: If a request failed for good
         """
-        self._rate_limit()  # Ensure compliance with rate limit before making a request
+        # Writes to cached entities make the cached copies stale
+        if method != "GET":
+            cached_kind = endpoint.strip("/").split("/")[0]
+            if cached_kind in self.cache.ttls:
+                self.cache.invalidate(cached_kind)
 
-        url = f"https://api.usemotion.com/v1{endpoint}"
-        headers = {
-            "X-API-Key": self.api_key,
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        }
+        if method == "POST":
+            response = self._send(
+                method, endpoint, params, data, max_retries, idempotency_key
+            )
+            with self.telemetry.span("decode", endpoint=endpoint):
+                return decode_json(response.content)
 
         all_results = []
-        page_count = 0
+        for page in self.iter_pages(
+            endpoint, params, limit, method, data, max_retries, direct_list
+        ):
+            all_results.extend(page)
+        return all_results
+
+    def _send(
+        self,
+        method,
+        endpoint,
+        params=None,
+        data=None,
+        max_retries=3,
+        idempotency_key=None,
+    ):
+        """Send one request to the public API"""
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        return self._send_with_retries(
+            "public",
+            method,
+            f"{self.base_url}{endpoint}",
+            max_retries=max_retries,
+            params=params,
+            json=data,
+            headers=headers,
+        )
+
+    def _send_with_retries(
+        self, bucket, method, url, max_retries=None, idempotent=None, **kwargs
+    ):
+        """Send a request, retrying temporary failures with backoff and jitter
 
+        429s and 5xx responses as well as connection errors are retried while
+        the retry policy allows it. A POST is only repeated if it cannot have
+        been processed yet (429 or no connection), otherwise it fails with an
+        AmbiguousRequestError.
+
+        Parameters:
+            bucket (str): Rate limit bucket and circuit breaker, "public" or "internal"
+            method (str): The HTTP method to use
+            url (str): The full URL
+            max_retries (int): Retries for this request, defaults to the policy's
+            idempotent (bool): Whether repeating the request is harmless,
+                defaults to True for every method but POST
+            **kwargs: Passed on to requests
+
+        Returns:
+            requests.Response: The successful response
+
+        Raises:
+            MotionAPIError: If the request failed for good
+        """
+        if idempotent is None:
+            idempotent = method != "POST"
+        breaker = self.circuit_breakers[bucket]
+        attempt = 0
         while True:
-            retries = 0
-            while retries <= max_retries:
-                try:
-                    response = requests.request(
-                        method, url, headers=headers, params=params, json=data
+            self.telemetry.record_wait("circuit", breaker.acquire())
+            # Every page and every retry counts against the rate limit
+            self._rate_limit(bucket)
+            try:
+                with self.telemetry.request(bucket, method, url) as span:
+                    response = self.sessions.request(
+                        method, url, timeout=self.timeout, **kwargs
                     )
-
-                    # Handle rate limiting (HTTP 429)
-                    if response.status_code == 429:
-                        retry_after = int(response.headers.get("Retry-After", 60))
-                        sys.stdout.write(
-                            f"\rRate limited by server. Retrying after {retry_after} seconds... (Retry {retries+1}/{max_retries})"
-                        )
-                        sys.stdout.flush()
-                        time.sleep(retry_after)
-                        retries += 1
-                        continue
-
-                    response.raise_for_status()  # Raise HTTPError for other bad responses
-                    break  # Break the retry loop if request succeeds
-
-                except requests.exceptions.HTTPError as e:
-                    if response.status_code == 429 and retries < max_retries:
-                        retries += 1
-                        continue
-                    raise  # Re-raise the exception if it's not a 429 or max retries exceeded
-
-            # Clear retry message if shown
-            if retries > 0:
-                sys.stdout.write("\r" + " " * 80 + "\r")
-                sys.stdout.flush()
-
-            self.request_count += 1
-            page_count += 1
-
-            response_data = response.json()
-            if method == "POST":
-                all_results.append(response_data)
+                    sent_bytes, received_bytes = _transfer_sizes(
+                        response, kwargs.get("stream", False)
+                    )
+                    span.set_attribute("status_code", response.status_code)
+                    span.set_attribute("bytes_sent", sent_bytes)
+                    span.set_attribute("bytes_received", received_bytes)
+            except requests.exceptions.RequestException as error:
+                response = None
+                status_code = None
+                sent = _may_have_reached_server(error)
+                message = str(error)
+                body = None
             else:
-                if direct_list:
-                    all_results.extend(response_data)
-                else:
-                    all_results.extend(response_data.get(endpoint.replace("/", ""), []))
+                self.rate_limiter.update_from_headers(bucket, response.headers)
+                status_code = response.status_code
+                if status_code < 400:
+                    breaker.record_success()
+                    self.request_count += 1
+                    return response
+                sent = True
+                message = response.reason or "request failed"
+                body = response.text[:500]
+                # Hand a streamed connection back to the pool before retrying
+                response.close()
+
+            delay = self.retry_policy.after_failure(
+                attempt,
+                method,
+                url,
+                status_code,
+                headers=response.headers if response is not None else None,
+                sent=sent,
+                message=message,
+                body=body,
+                idempotent=idempotent,
+                max_retries=max_retries,
+                breaker=breaker,
+                pause=lambda: self.rate_limiter.bucket(bucket).pause(self.period),
+            )
+            attempt += 1
+            self.telemetry.increment("retries", f"{bucket} {method}")
+            if delay > 0:
+                self.telemetry.record_wait("retry", delay)
+                time.sleep(delay)
+
+    def _fetch_page(
+        self, method, endpoint, params, data=None, max_retries=3, direct_list=False
+    ):
+        """Fetch one page and return (items, next cursor)"""
+        response = self._send(method, endpoint, params or None, data, max_retries)
+        self.telemetry.increment("pages", f"public {endpoint_template(endpoint)}")
+        with self.telemetry.span("decode", endpoint=endpoint):
+            response_data = decode_json(response.content)
+        if direct_list:
+            return response_data, None
+        items = response_data.get(endpoint.replace("/", ""), [])
+        return items, response_data.get("meta", {}).get("nextCursor")
+
+    def iter_pages(
+        self,
+        endpoint,
+        params=None,
+        limit=None,
+        method="GET",
+        data=None,
+        max_retries=3,
+        direct_list=False,
+    ):
+        """Yield the results of a paginated endpoint page by page
 
-            # Check for stopping conditions: no more results, or page limit reached (if specified)
-            if not direct_list:
-                next_cursor = response_data.get("meta", {}).get("nextCursor")
-                if not next_cursor or (limit and page_count >= limit):
-                    break
+        The next page is requested in the background as soon as its cursor is
+        known, so callers can process a page while the next one is in flight.
 
-                # Update cursor parameter for the next request
-                if params:
-                    params["cursor"] = next_cursor
-                else:
-                    params = {"cursor": next_cursor}
-            else:
-                break
+        Parameters:
+            endpoint (str): The API endpoint (e.g., "/tasks")
+            params (dict): Query parameters, not modified
+            limit (int): The maximum number of pages to fetch (default: None)
 
-        if method == "POST":
-            return all_results[0]
-        else:
-            return all_results
+        Yields:
+            list: The results of each page
+        """
+
+        def fetch_page(page_params):
+            return self._fetch_page(
+                method, endpoint, page_params, data, max_retries, direct_list
+            )
+
+        executor = self._prefetch_executor() if method == "GET" else None
+        return iter_cursor_pages(fetch_page, params, limit, executor)
 
-    def _request_internal(self, method, endpoint, params=None, data=None):
-        self._rate_limit()  # Ensure compliance with rate limit before making a request
+    def fetch_many(self, endpoint, params_list, max_workers=None):
+        """Fetch several paginated queries concurrently under the shared rate limit
 
-        url = f"https://internal.usemotion.com{endpoint}"
-        headers = {"Authorization": "Bearer " + self.token}
+        Parameters:
+            endpoint (str): The API endpoint (e.g., "/tasks")
+            params_list (list): Query parameters of each query
+            max_workers (int): Queries paginated in parallel, defaults to prefetch_workers
+
+        Returns:
+            list: All results of each query, in the order of `params_list`
+        """
+        return fetch_all_concurrently(
+            lambda params: self.iter_pages(endpoint, params),
+            list(params_list),
+            max_workers or self.prefetch_workers,
+        )
+
+    def _prefetch_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.prefetch_workers,
+                    thread_name_prefix="motion-prefetch",
+                )
+            return self._executor
+
+    def _request_internal(
+        self,
+        method,
+        endpoint,
+        params=None,
+        data=None,
+        stream_models=False,
+        idempotent=None,
+    ):
+        """Make a request to the internal Motion API and return the decoded response
+
+        Parameters:
+            method (str): The HTTP method to use
+            endpoint (str): The API endpoint (e.g., "/v2/scheduled-entities")
+            params (dict): Query parameters to include in the request
+            data (dict): Data to send, wrapped in {"data": ...}
+            stream_models (bool): Parse only the "models" sections, incrementally
+            idempotent (bool): Whether the request may be repeated, e.g. for a
+                POST that only queries data
+        Returns:
+            dict: The decoded response
+        Raises:
+            MotionAPIError: If the request failed for good
+        """
+        url = f"{self.internal_base_url}{endpoint}"
+        token = self.token_manager.get_token()
+        headers = {}
 
         if data:
             headers["Content-Type"] = "application/json"
-            headers["Accept"] = "application/json"
 
             data = {"data": data}
 
-        response = requests.request(
-            method, url, headers=headers, params=params, json=data
-        )
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx and 5xx)
+        for attempt in range(2):
+            headers["Authorization"] = "Bearer " + token
+            try:
+                response = self._send_with_retries(
+                    "internal",
+                    method,
+                    url,
+                    idempotent=idempotent,
+                    headers=headers,
+                    params=params,
+                    json=data,
+                    stream=stream_models,
+                )
+                break
+            except MotionAPIError as e:
+                if e.status_code != 401 or attempt:
+                    raise
+                # The token was revoked or expired early: refresh it once and
+                # retry, the rejected request was not processed
+                token = self.token_manager.invalidate(token)
+        with self.telemetry.span("decode", endpoint=endpoint, streamed=stream_models):
+            return read_response(response, stream_models)
 
-        self.request_count += 1
-        return response.json()
+    def get_projects(self, workspace_id, refresh=False):
+        """Get the projects of a workspace, served from the cache while fresh"""
+        return list(self.iter_projects(workspace_id, refresh))
 
-    def get_projects(self, workspace_id):
-        endpoint = "/projects"
-        params = {"workspaceId": workspace_id}
-        return self._request("GET", endpoint, params)
+    def iter_projects(self, workspace_id, refresh=False):
+        """Yield the projects of a workspace page by page
+
+        A listing that is iterated to the end is cached, so the caller can
+        stop early without the remaining pages being fetched.
+
+        Parameters:
+            workspace_id (str): The workspace to list
+            refresh (bool): Ignore the cached projects
+
+        Yields:
+            dict: The projects
+        """
+        if not refresh:
+            projects = self.cache.get("projects", workspace_id)
+            if projects is not None:
+                yield from projects
+                return
+        projects = []
+        for page in self.iter_pages("/projects", {"workspaceId": workspace_id}):
+            projects.extend(page)
+            yield from page
+        self.cache.set("projects", workspace_id, projects)
 
     def get_project_id(self, workspace_id, project_name):
-        projects = self.get_projects(workspace_id)
-        for project in projects:
+        project_id = self.cache.lookup_id("projects", workspace_id, project_name)
+        if project_id is not None:
+            return project_id
+        if self.cache.get("projects", workspace_id) is not None:
+            # The cached listing may predate the project: fetch it once more,
+            # which also rebuilds the name index
+            self.get_projects(workspace_id, refresh=True)
+            return self.cache.lookup_id("projects", workspace_id, project_name)
+        # Stop paging as soon as the project shows up
+        for project in self.iter_projects(workspace_id, refresh=True):
             if project["name"].lower() == project_name.lower():
                 return project["id"]
         return None  # Return None if no matching project is found
 
-    def get_workspaces(self):
+    def get_workspaces(self, refresh=False):
+        """Get all workspaces, served from the cache while fresh"""
+        if not refresh:
+            workspaces = self.cache.get("workspaces")
+            if workspaces is not None:
+                return workspaces
         endpoint = "/workspaces"
-        return self._request("GET", endpoint)
+        workspaces = self._request("GET", endpoint)
+        self.cache.set("workspaces", "", workspaces)
+        return workspaces
 
     def get_workspace_id(self, workspace_name):
-        workspaces = self.get_workspaces()
+        cached = self.cache.get("workspaces") is not None
+        workspace_id = self._find_workspace_id(self.get_workspaces(), workspace_name)
+        if workspace_id is None and cached:
+            # The cached listing may predate the workspace, look it up once more
+            workspaces = self.get_workspaces(refresh=True)
+            workspace_id = self._find_workspace_id(workspaces, workspace_name)
+        return workspace_id
+
+    def _find_workspace_id(self, workspaces, workspace_name):
+        workspace_id = self.cache.lookup_id("workspaces", "", workspace_name)
+        if workspace_id is not None:
+            return workspace_id
         for workspace in workspaces:
             if workspace["name"].lower() == workspace_name.lower():
                 return workspace["id"]
         return None  # Return None if no matching workspace is found
 
+    def invalidate_cache(self, kind=None, key=None):
+        """Forget cached workspaces, projects or schedules"""
+        self.cache.invalidate(kind, key)
+
     def get_tasks_in_project(self, project_id):
         params = {"projectId": project_id}
         response = self.get_tasks(params)
         return response
 
-    def get_schedules(self, params=None):
+    def get_schedules(self, params=None, refresh=False):
+        """Get the schedules, served from the cache while fresh (unfiltered only)"""
+        if not refresh and not params:
+            schedules = self.cache.get("schedules")
+            if schedules is not None:
+                return schedules
         endpoint = "/schedules"
         response = self._request("GET", endpoint, params, direct_list=True)
+        if not params:
+            self.cache.set("schedules", "", response)
         return response
 
     def get_scheduled_tasks(self, return_keys=["tasks"], params=None):
@@ -281,25 +623,147 @@ class MotionAPI:
         )
         return response
 
-    def get_tasks(self, params=None, limit=None):
+    def get_tasks(self, params=None, limit=None, max_age=None):
+        """Get tasks, served from the local task store while it is fresh
+
+        Parameters:
+            params (dict): Query parameters, e.g. {"projectId": ...}
+            limit (int): Maximum number of pages; limited fetches bypass the store
+            max_age (int): Seconds a stored result may be reused, defaults to task_max_age
+
+        Returns:
+            list: The tasks
+        """
+        if limit is not None:
+            return self._fetch_tasks(params, limit)
+        max_age = self.task_max_age if max_age is None else max_age
+        scope = task_scope(params)
+        if self.task_store.is_fresh(scope, max_age):
+            return self.task_store.get_tasks(scope)
+        tasks, _ = self._sync_tasks(params)
+        return tasks
+
+    def iter_tasks(self, params=None, limit=None, max_age=None):
+        """Yield tasks one page at a time instead of collecting every page first
+
+        Server-side filters in `params` (e.g. workspaceId, projectId, status,
+        assigneeId, label, name) are sent to the API unchanged. A fresh task
+        store scope is read back in batches; otherwise the pages are streamed
+        from the API without updating the store, use sync() for that.
+
+        Parameters:
+            params (dict): Query parameters, e.g. {"projectId": ...}
+            limit (int): Maximum number of pages, bypasses the store
+            max_age (int): Seconds a stored result may be reused, defaults to task_max_age
+
+        Yields:
+            dict: The tasks
+        """
+        if limit is None:
+            max_age = self.task_max_age if max_age is None else max_age
+            scope = task_scope(params)
+            if self.task_store.is_fresh(scope, max_age):
+                yield from self.task_store.iter_tasks(scope)
+                return
+        for page in self.iter_pages("/tasks", params, limit):
+            yield from page
+
+    def sync(self, params=None):
+        """Refresh the local task store for a /tasks query
+
+        Returns:
+            SyncStats: Number of fetched, added, changed and deleted tasks
+        """
+        _, stats = self._sync_tasks(params)
+        return stats
+
+    def task_store_metrics(self):
+        """Return staleness and change counters for every synced task query"""
+        return self.task_store.metrics()
+
+    def _sync_tasks(self, params=None):
+        started = self.task_store.clock()
+        tasks = self._fetch_tasks(params)
+        stats = self.task_store.replace_scope(task_scope(params), tasks, started)
+        return tasks, stats
+
+    def _fetch_tasks(self, params=None, limit=None):
         endpoint = "/tasks"
-        response = self._request("GET", endpoint, params, limit=limit)
-        return response
+        # _request adds the cursor to params, don't leak it into the caller's dict
+        params = dict(params) if params else None
+        return self._request("GET", endpoint, params, limit=limit)
+
+    def _tasks_written(self, task_ids=None):
+        """Mark stored tasks and upcoming schedule days stale after tasks were created or updated"""
+        self.task_store.mark_stale(task_ids)
+        # Motion reschedules after every change, past days are unaffected
+        self.schedule_cache.invalidate(datetime.now(timezone.utc) - timedelta(days=1))
 
-    def get_tasks_by_date_range(self, start_date, end_date):
+    def get_tasks_by_date_range(self, start_date, end_date, use_cache=True):
         """
         Gets scheduled entities between two dates using the internal API
 
         Parameters:
             start_date (datetime): The start date
             end_date (datetime): The end date
+            use_cache (bool): Answer from the per-day schedule cache where possible
 
         Returns:
             dict: Organized scheduled entities with tasks, chunks, and their relationships
         """
-        self.refresh_token_if_invalid()
+        response = self._scheduled_entities_response(start_date, end_date, use_cache)
+        return self.organize_scheduled_entities(response)
+
+    def get_scheduled_entities(self, start_date, end_date, use_cache=True):
+        """
+        Gets scheduled entities between two dates as linked models
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            use_cache (bool): Answer from the per-day schedule cache where possible
+
+        Returns:
+            ScheduledEntities: Tasks, chunks and events referencing each other
+        """
+        response = self._scheduled_entities_response(start_date, end_date, use_cache)
+        return build_scheduled_entities(response)
+
+    def get_scheduled_entities_for_ranges(self, ranges):
+        """
+        Gets scheduled entities for several date ranges, fetching each day only once
+
+        Parameters:
+            ranges (list): (start_date, end_date) tuples
+
+        Returns:
+            list: ScheduledEntities per range
+        """
+        return [
+            build_scheduled_entities(response)
+            for response in self.schedule_cache.get_many(ranges)
+        ]
+
+    def _scheduled_entities_response(self, start_date, end_date, use_cache=True):
+        if use_cache:
+            return self.schedule_cache.get(start_date, end_date)
+        return self._fetch_scheduled_entities(start_date, end_date)
+
+    def _fetch_scheduled_entities(self, start_date, end_date):
         endpoint = "/v2/scheduled-entities"
+        data = self.scheduled_entities_payload(start_date, end_date)
+        # The POST only queries the schedule, so it is safe to repeat
+        return self._request_internal(
+            "POST",
+            endpoint,
+            data=data,
+            stream_models=self.stream_responses,
+            idempotent=True,
+        )
 
+    @staticmethod
+    def scheduled_entities_payload(start_date, end_date):
+        """Build the request body for /v2/scheduled-entities"""
         # Ensure dates are properly formatted with timezone info
         if not start_date.tzinfo:
             start_date = start_date.replace(tzinfo=timezone.utc)
@@ -320,10 +784,28 @@ class MotionAPI:
                 "calendarsOptions": {"alwaysIncludeCalendarIds": []},
             },
         }
+        return data
+
+    @staticmethod
+    def organize_scheduled_entities(response):
+        """Link the raw /v2/scheduled-entities response into tasks, chunks and events
 
-        response = self._request_internal("POST", endpoint, data=data)
+        Runs in linear time: related models are looked up by id instead of
+        scanning the result lists.
+
+        Parameters:
+            response (dict): The decoded response of the internal API
+
+        Returns:
+            dict: Organized scheduled entities with tasks, chunks, and their relationships
+        """
+        models = response.get("models", {})
+        scheduled_entities = models.get("scheduledEntities", {})
+        tasks = models.get("tasks", {})
+        chunks = models.get("chunks", {})
+        calendar_events = models.get("calendarEvents", {})
+        projects = models.get("projects", {})
 
-        # Extract and organize the data
         result = {
             "regular_tasks": [],  # Tasks without chunks
             "chunked_tasks": [],  # Parent tasks with chunks
@@ -332,129 +814,84 @@ class MotionAPI:
             "all_scheduled_entities": [],  # All scheduled items with timing information
         }
 
-        # Process scheduled entities
-        scheduled_entities = {}
-        if "models" in response and "scheduledEntities" in response["models"]:
-            scheduled_entities = response["models"]["scheduledEntities"]
-
-        # Process tasks
-        tasks = {}
-        if "models" in response and "tasks" in response["models"]:
-            tasks = response["models"]["tasks"]
-
-        # Process chunks
-        chunks = {}
-        if "models" in response and "chunks" in response["models"]:
-            chunks = response["models"]["chunks"]
-
-        # Process calendar events
-        calendar_events = {}
-        if "models" in response and "calendarEvents" in response["models"]:
-            calendar_events = response["models"]["calendarEvents"]
-
-        # Process projects
-        projects = {}
-        if "models" in response and "projects" in response["models"]:
-            projects = response["models"]["projects"]
-
-        # First, determine which chunks are scheduled within our date range
+        # Single pass over the scheduled entities: merge each one with its model
         chunks_in_timeframe = set()
-        for entity_id, entity in scheduled_entities.items():
-            if entity.get("type") == "CHUNK":
-                chunks_in_timeframe.add(entity_id)
-
-        # Then only include tasks that have at least one chunk in the timeframe
-        tasks_with_chunks = {}
-        for task_id, task in tasks.items():
-            if "chunkIds" in task and task["chunkIds"]:
-                # Check if any of this task's chunks are in our timeframe
-                task_chunks_in_timeframe = [
-                    chunk_id
-                    for chunk_id in task["chunkIds"]
-                    if chunk_id in chunks_in_timeframe
-                ]
-
-                if (
-                    task_chunks_in_timeframe
-                ):  # Only include if it has chunks in our timeframe
-                    tasks_with_chunks[task_id] = task
-                    task_with_chunks = task.copy()
-                    task_with_chunks["chunks"] = []
-                    task_with_chunks["chunkIds"] = (
-                        task_chunks_in_timeframe  # Only keep relevant chunks
-                    )
-
-                    # Add project info if available
-                    if task.get("projectId") and task["projectId"] in projects:
-                        task_with_chunks["project"] = projects[task["projectId"]]
-                    else:
-                        task_with_chunks["project"] = None
-
-                    result["chunked_tasks"].append(task_with_chunks)
-
-        # Process all scheduled entities
+        scheduled_tasks = []  # (task id, merged entity), sorted out once chunks are known
+        scheduled_chunks = []  # (parent task id, merged entity)
         for entity_id, entity in scheduled_entities.items():
             entity_type = entity.get("type")
-            scheduled_entity = entity.copy()
+            scheduled_entity = dict(entity)
 
             # Add duration based on schedule
-            if "schedule" in entity and not entity.get("timeless"):
-                start = entity["schedule"].get("start")
-                end = entity["schedule"].get("end")
-                if start and end:
-                    # If they are timestamps, calculate duration
-                    if "T" in start and "T" in end:
-                        start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
-                        end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
-                        duration_minutes = (end_dt - start_dt).total_seconds() / 60
-                        scheduled_entity["scheduled_duration"] = duration_minutes
-
-            # Handle based on entity type
+            schedule = entity.get("schedule")
+            if schedule and not entity.get("timeless"):
+                start = schedule.get("start")
+                end = schedule.get("end")
+                # Only timestamps (not plain dates) have a duration
+                if start and end and "T" in start and "T" in end:
+                    start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+                    end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
+                    scheduled_entity["scheduled_duration"] = (
+                        end_dt - start_dt
+                    ).total_seconds() / 60
+
             if entity_type == "TASK":
-                if entity_id in tasks:
-                    task_data = tasks[entity_id]
+                task_data = tasks.get(entity_id)
+                if task_data is not None:
                     scheduled_entity.update(task_data)
-
-                    # Add project info if available
-                    if (
+                    scheduled_entity["project"] = projects.get(
                         task_data.get("projectId")
-                        and task_data["projectId"] in projects
-                    ):
-                        scheduled_entity["project"] = projects[task_data["projectId"]]
-                    else:
-                        scheduled_entity["project"] = None
-
-                    # If not a chunked task, add to regular tasks
-                    if entity_id not in tasks_with_chunks:
-                        result["regular_tasks"].append(scheduled_entity)
+                    )
+                    scheduled_tasks.append((entity_id, scheduled_entity))
 
             elif entity_type == "CHUNK":
-                if entity_id in chunks:
-                    chunk_data = chunks[entity_id]
+                chunks_in_timeframe.add(entity_id)
+                chunk_data = chunks.get(entity_id)
+                if chunk_data is not None:
                     scheduled_entity.update(chunk_data)
-
-                    # Link to parent task
                     parent_task_id = chunk_data.get("parentTaskId")
                     if parent_task_id:
                         scheduled_entity["parent_task"] = tasks.get(parent_task_id)
-
-                        # Add to parent task's chunks list
-                        for task in result["chunked_tasks"]:
-                            if task["id"] == parent_task_id:
-                                task["chunks"].append(scheduled_entity)
-                                break
-
+                    scheduled_chunks.append((parent_task_id, scheduled_entity))
                     result["chunks"].append(scheduled_entity)
 
             elif entity_type == "EVENT":
-                if entity_id in calendar_events:
-                    event_data = calendar_events[entity_id]
+                event_data = calendar_events.get(entity_id)
+                if event_data is not None:
                     scheduled_entity.update(event_data)
                     result["calendar_events"].append(scheduled_entity)
 
-            # Add to all scheduled entities
             result["all_scheduled_entities"].append(scheduled_entity)
 
+        # Only include tasks that have at least one chunk in the timeframe
+        chunked_by_id = {}
+        for task_id, task in tasks.items():
+            chunk_ids = task.get("chunkIds")
+            if not chunk_ids:
+                continue
+            task_chunks_in_timeframe = [
+                chunk_id for chunk_id in chunk_ids if chunk_id in chunks_in_timeframe
+            ]
+            if task_chunks_in_timeframe:
+                task_with_chunks = dict(task)
+                task_with_chunks["chunks"] = []
+                task_with_chunks["chunkIds"] = task_chunks_in_timeframe
+                task_with_chunks["project"] = projects.get(task.get("projectId"))
+                chunked_by_id[task_id] = task_with_chunks
+                result["chunked_tasks"].append(task_with_chunks)
+
+        for parent_task_id, scheduled_entity in scheduled_chunks:
+            parent = chunked_by_id.get(parent_task_id)
+            if parent is not None:
+                parent["chunks"].append(scheduled_entity)
+
+        # If not a chunked task, add to regular tasks
+        result["regular_tasks"] = [
+            scheduled_entity
+            for task_id, scheduled_entity in scheduled_tasks
+            if task_id not in chunked_by_id
+        ]
+
         return result
 
     def parse_date(self, date_string):
@@ -481,15 +918,109 @@ class MotionAPI:
         # If projectId is provided in task data, it will be included as well
         task_data = {"workspaceId": workspace_id, **task}  # Merge with other task data
 
-        return self._request("POST", endpoint, data=task_data)
+        # Every attempt carries the same key, and after a failure that may
+        # have created the task it is looked up before posting it again
+        idempotency_key = str(uuid.uuid4())
+        started = datetime.now(timezone.utc)
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return self._request(
+                        "POST",
+                        endpoint,
+                        data=task_data,
+                        idempotency_key=idempotency_key,
+                    )
+                except AmbiguousRequestError as error:
+                    created = self._find_created_task(task_data, started)
+                    if created is not None:
+                        return created
+                    delay = self.retry_policy.retry_ambiguous(attempt, error)
+                    attempt += 1
+                    time.sleep(delay)
+        finally:
+            self._tasks_written()
+
+    def _find_created_task(self, task_data, since):
+        """Return the task an earlier attempt of create_task created, if any"""
+        params = created_task_query(task_data)
+        return match_created_task(self.iter_tasks(params, max_age=0), task_data, since)
 
     def update_task(self, task, internal=False):
         task_id = task["id"]
         endpoint = f"/tasks/{task_id}"
-        if internal:
-            endpoint = f"/v2/tasks/{task_id}"
-            return self._request_internal("PATCH", endpoint, data=task)
-        return self._request("PATCH", endpoint, data=task)
+        try:
+            if internal:
+                endpoint = f"/v2/tasks/{task_id}"
+                return self._request_internal("PATCH", endpoint, data=task)
+            return self._request("PATCH", endpoint, data=task)
+        finally:
+            self._tasks_written([task_id])
+
+    def update_tasks(self, tasks, internal=False, max_workers=1):
+        """Update several tasks, one request per task
+
+        Parameters:
+            tasks (list): Task update dicts, each containing an "id"
+            internal (bool): Whether to use the internal API
+            max_workers (int): Number of updates sent concurrently; the rate
+                limiter is shared, so this only overlaps network latency
+
+        Returns:
+            list: The response for each task, or the raised exception if the update failed
+        """
+
+        def update(task):
+            try:
+                return self.update_task(task, internal)
+            except Exception as e:
+                return e
+
+        if max_workers <= 1 or len(tasks) <= 1:
+            return [update(task) for task in tasks]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(update, tasks))
+
+    def update_tasks_bulk(
+        self, updates, internal=False, current_tasks=None, max_workers=4
+    ):
+        """Apply many task updates with as few requests as possible
+
+        Patches for the same task id are merged into one request, and patches
+        that would not change the task (compared to `current_tasks`) are skipped.
+
+        Parameters:
+            updates (iterable): Task update dicts, each containing an "id"
+            internal (bool): Whether to use the internal API
+            current_tasks (iterable): Public v1 tasks used to detect no-op patches;
+                fetch them fresh (max_age=0), a stored copy may hide a change
+            max_workers (int): Number of updates sent concurrently
+
+        Returns:
+            BulkUpdateResult: Succeeded, failed and skipped task ids
+        """
+        result = BulkUpdateResult()
+        patches, result.coalesced = coalesce_updates(updates)
+
+        if current_tasks is not None:
+            current_by_id = {task["id"]: task for task in current_tasks}
+            pending = []
+            for patch in patches:
+                current = current_by_id.get(patch["id"])
+                if current is not None and is_noop(patch, current, internal):
+                    result.skipped.append(patch["id"])
+                else:
+                    pending.append(patch)
+            patches = pending
+
+        responses = self.update_tasks(patches, internal, max_workers=max_workers)
+        for patch, response in zip(patches, responses):
+            if isinstance(response, Exception):
+                result.failed[patch["id"]] = response
+            else:
+                result.succeeded[patch["id"]] = response
+        return result
 
     def update_tasks_if_duration_exceeds(
         self, workspace_name, project_name, duration_limit
@@ -506,26 +1037,29 @@ class MotionAPI:
             print(f"Project with name {project_name} not found.")
             return
 
-        # Step 3: Get all tasks for the project ID
-        tasks = self.get_tasks_in_project(project_id)
-
-        # Step 4: Iterate over tasks to find ones with duration over 90 minutes
-        for task in tasks:
+        # Step 3 and 4: Stream the project's tasks to find ones over the duration limit
+        task_updates = []
+        for task in self.iter_tasks({"projectId": project_id}):
             duration = task.get(
                 "duration"
             )  # Assuming the duration is in minutes and available as 'duration'
             if duration and duration > duration_limit:
                 # Step 5: Update the task if duration is higher than 90 minutes
-                task_update = {
-                    "id": task["id"],
-                    "type": "NORMAL",
-                    "minimumDuration": 45,
-                }
-                try:
-                    self.update_task(task_update, True)
-                    print(f"Task {task['id']} updated to allow chunking.")
-                except Exception as e:
-                    print(f"Failed to update task {task['id']}: {e}")
+                task_updates.append(
+                    {
+                        "id": task["id"],
+                        "type": "NORMAL",
+                        "minimumDuration": 45,
+                    }
+                )
+
+        # The v1 tasks don't show type and minimumDuration, so there is
+        # nothing to compare these patches with
+        result = self.update_tasks_bulk(task_updates, True)
+        for task_id in result.succeeded:
+            print(f"Task {task_id} updated to allow chunking.")
+        for task_id, error in result.failed.items():
+            print(f"Failed to update task {task_id}: {error}")
 
     def reschedule_tasks_by_week(
         self,
@@ -535,11 +1069,12 @@ class MotionAPI:
         schedule=None,
         no_reschedule_patterns=None,
     ):
-        tasks = self.get_tasks_in_project(project_id)
         week_tasks = defaultdict(list)
         week_pattern = re.compile(r"^[A-Z]{3,4}-W(\d+):")
 
-        for task in tasks:
+        # Only the tasks matching the week pattern are kept in memory; they are
+        # read fresh since they decide which updates are skipped
+        for task in self.iter_tasks({"projectId": project_id}, max_age=0):
             if not task.get("completed", False):
                 # Check if any no_reschedule_pattern is in the task's name or description
                 if any(
@@ -575,6 +1110,7 @@ class MotionAPI:
         timezone = pytz.timezone(timezone_str)
 
         # Assign new scheduled dates to tasks
+        task_updates = []
         for i, week in enumerate(sorted_weeks):
             deadline_day = self.calculate_week_deadline(
                 start_date, days_per_week * (i + 1), schedule
@@ -594,7 +1130,13 @@ class MotionAPI:
                     "startDate": start_date.isoformat(),
                     "dueDate": deadline_day_with_tz.isoformat(),
                 }
-                self.update_task(data, True)
+                task_updates.append(data)
+
+        current_tasks = [task for tasks in week_tasks.values() for task in tasks]
+        result = self.update_tasks_bulk(task_updates, True, current_tasks=current_tasks)
+        for task_id, error in result.failed.items():
+            print(f"Failed to reschedule task {task_id}: {error}")
+        print(f"Rescheduled tasks: {result.summary()}")
 
     def generate_schedule_days(self, start_date, end_date, schedule=None):
         current_date = start_date
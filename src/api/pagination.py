@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def iter_cursor_pages(fetch_page, params=None, limit=None, executor=None):
+    """Yield the pages of a cursor-paginated endpoint
+
+    As soon as a page's cursor is known the next page is requested on
+    `executor`, so the network round trip overlaps with the caller processing
+    the current page.
+
+    Parameters:
+        fetch_page (callable): fetch_page(params) returning (items, next_cursor)
+        params (dict): Query parameters of the first page, not modified
+        limit (int): Maximum number of pages to fetch (default: None)
+        executor (Executor): Runs the prefetches, pages are fetched inline if None
+
+    Yields:
+        list: The items of each page
+    """
+    params = dict(params or {})
+
+    def submit(page_params):
+        if executor is None:
+            return None
+        return executor.submit(fetch_page, page_params)
+
+    future = submit(dict(params))
+    page_count = 0
+    try:
+        while True:
+            if future is not None:
+                items, next_cursor = future.result()
+            else:
+                items, next_cursor = fetch_page(dict(params))
+            future = None
+            page_count += 1
+
+            has_next = next_cursor and not (limit and page_count >= limit)
+            if has_next:
+                params["cursor"] = next_cursor
+                future = submit(dict(params))
+
+            yield items
+
+            if not has_next:
+                return
+    finally:
+        # The caller stopped early, don't fetch a page nobody will read
+        if future is not None:
+            future.cancel()
+
+
+def fetch_all_concurrently(fetch_pages, queries, max_workers=4):
+    """Run several paginated queries at the same time
+
+    Parameters:
+        fetch_pages (callable): fetch_pages(query) returning an iterable of pages
+        queries (list): The queries, e.g. one params dict per project
+        max_workers (int): Number of queries paginated in parallel
+
+    Returns:
+        list: All items of each query, in the order of `queries`
+    """
+
+    def collect(query):
+        items = []
+        for page in fetch_pages(query):
+            items.extend(page)
+        return items
+
+    if max_workers <= 1 or len(queries) <= 1:
+        return [collect(query) for query in queries]
+
+    results = [None] * len(queries)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(collect, query): index for index, query in enumerate(queries)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
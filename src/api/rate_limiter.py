@@ -0,0 +1,201 @@
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value, now=None):
+    """Parse a Retry-After header value into seconds to wait
+
+    Parameters:
+        value (str): Either a number of seconds or an HTTP date
+        now (float): Current unix time, defaults to time.time()
+    Returns:
+        float: Seconds to wait, or None if the value could not be parsed
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return max(retry_at.timestamp() - now, 0.0)
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting calls to `rate` per `period` seconds.
+
+    Callers reserve a token and sleep exactly until it becomes available, so
+    there is no polling. Reservations may push the bucket below zero, which
+    queues later callers behind earlier ones in arrival order.
+    """
+
+    def __init__(
+        self, rate, period=60.0, burst=None, clock=time.monotonic, sleep=time.sleep
+    ):
+        """
+        Parameters:
+            rate (int): Number of calls allowed per period
+            period (float): Length of the period in seconds
+            burst (int): Maximum number of calls that may be made back to back,
+                defaults to `rate`
+            clock (callable): Monotonic clock returning seconds
+            sleep (callable): Function used to wait, receives seconds
+        """
+        if rate <= 0 or period <= 0:
+            raise ValueError("rate and period must be positive")
+        self.rate = rate
+        self.period = period
+        self.capacity = burst if burst is not None else rate
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(self.capacity)
+        self._last_refill = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+
+    @property
+    def fill_rate(self):
+        """Tokens added per second"""
+        return self.rate / self.period
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.fill_rate)
+            self._last_refill = now
+
+    def reserve(self, tokens=1):
+        """Take `tokens` from the bucket and return how long to wait before using them
+
+        Returns:
+            float: Seconds the caller has to wait (0 if the call can go ahead now)
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self._tokens -= tokens
+            delay = 0.0
+            if self._tokens < 0:
+                # Tokens start refilling again once a server-imposed pause is over
+                refill_start = max(now, self._last_refill)
+                delay = refill_start - now + (-self._tokens / self.fill_rate)
+            delay = max(delay, self._blocked_until - now)
+            self.total_wait += delay
+            return delay
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` calls are allowed
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        delay = self.reserve(tokens)
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+    def available(self):
+        """Return the number of calls that can be made right now without waiting"""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            if now < self._blocked_until:
+                return 0
+            return max(int(self._tokens), 0)
+
+    def pause(self, seconds):
+        """Block every caller for at least `seconds` from now"""
+        with self._lock:
+            now = self.clock()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            # Don't let the pause be followed by a burst of saved-up tokens
+            self._refill(now)
+            self._tokens = min(self._tokens, 1.0)
+            self._last_refill = max(self._last_refill, now + seconds)
+
+    def update_from_headers(self, headers):
+        """Adapt the bucket to rate limit information sent by the server
+
+        Understands `Retry-After` as well as the common
+        `X-RateLimit-Limit`/`X-RateLimit-Remaining`/`X-RateLimit-Reset` headers.
+        """
+        if not headers:
+            return
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None:
+            self.pause(retry_after)
+
+        limit = _header_number(headers, "X-RateLimit-Limit")
+        remaining = _header_number(headers, "X-RateLimit-Remaining")
+        reset = _header_number(headers, "X-RateLimit-Reset")
+
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            if limit and limit > 0 and limit < self.rate:
+                self.rate = int(limit)
+                self.capacity = min(self.capacity, self.rate)
+            if remaining is not None:
+                self._tokens = min(self._tokens, remaining)
+
+        if remaining is not None and remaining <= 0 and reset is not None:
+            # The reset header is either seconds from now or a unix timestamp
+            if reset > 10**9:
+                reset = reset - time.time()
+            if reset > 0:
+                self.pause(reset)
+
+
+def _header_number(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Named token buckets sharing one configuration point.
+
+    The Motion public API and the internal API are limited separately, so
+    each gets its own bucket.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def add_bucket(self, name, rate, period=60.0, burst=None):
+        bucket = TokenBucket(rate, period, burst, clock=self.clock, sleep=self.sleep)
+        with self._lock:
+            self._buckets[name] = bucket
+        return bucket
+
+    def bucket(self, name):
+        return self._buckets[name]
+
+    def acquire(self, name, tokens=1):
+        return self._buckets[name].acquire(tokens)
+
+    def reserve(self, name, tokens=1):
+        return self._buckets[name].reserve(tokens)
+
+    def update_from_headers(self, name, headers):
+        self._buckets[name].update_from_headers(headers)
+
+    def total_wait(self):
+        """Return seconds spent waiting per bucket"""
+        return {name: bucket.total_wait for name, bucket in self._buckets.items()}
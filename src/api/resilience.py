@@ -0,0 +1,368 @@
+import random
+import threading
+import time
+from datetime import timedelta
+
+from .models import parse_timestamp
+
+# Statuses worth another attempt: rate limited or a temporary server problem
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class MotionAPIError(Exception):
+    """A request that failed for good, with what is known about the failure"""
+
+    def __init__(
+        self,
+        message,
+        method=None,
+        url=None,
+        status_code=None,
+        attempts=1,
+        retryable=False,
+        body=None,
+    ):
+        """
+        Parameters:
+            message (str): What went wrong
+            method (str): The HTTP method of the request
+            url (str): The requested URL
+            status_code (int): The last HTTP status, None if no response arrived
+            attempts (int): Number of attempts made
+            retryable (bool): Whether the failure was temporary, i.e. a later
+                run may succeed
+            body (str): The start of the last response body
+        """
+        super().__init__(message)
+        self.message = message
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.attempts = attempts
+        self.retryable = retryable
+        self.body = body
+
+    def __str__(self):
+        if self.method is None:
+            return self.message
+        status = f" (HTTP {self.status_code})" if self.status_code else ""
+        return (
+            f"{self.method} {self.url} failed after {self.attempts} attempt(s)"
+            f"{status}: {self.message}"
+        )
+
+    def to_dict(self):
+        return {
+            "error": type(self).__name__,
+            "message": self.message,
+            "method": self.method,
+            "url": self.url,
+            "status_code": self.status_code,
+            "attempts": self.attempts,
+            "retryable": self.retryable,
+        }
+
+
+class AmbiguousRequestError(MotionAPIError):
+    """A non-idempotent request failed after it may have reached the server"""
+
+
+class CircuitOpenError(MotionAPIError):
+    """The API failed repeatedly and requests are held back for too long"""
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter and a retry budget shared by a run.
+
+    The budget caps the retries of all requests together, so an API outage
+    fails a run of several hundred tasks quickly instead of retrying every
+    single request.
+    """
+
+    def __init__(
+        self,
+        max_retries=3,
+        backoff_factor=0.5,
+        max_backoff=30.0,
+        retry_budget=100,
+        random=random.random,
+    ):
+        """
+        Parameters:
+            max_retries (int): Retries per request
+            backoff_factor (float): Base delay in seconds, doubled per retry
+            max_backoff (float): Upper bound of a single delay
+            retry_budget (int): Retries allowed in total, None for no limit
+            random (callable): Returns a float in [0, 1), for the jitter
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_budget = retry_budget
+        self.random = random
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    @property
+    def budget_remaining(self):
+        if self.retry_budget is None:
+            return None
+        return max(self.retry_budget - self.retries, 0)
+
+    def reset_budget(self):
+        """Start a new run with the full retry budget"""
+        with self._lock:
+            self.retries = 0
+
+    def backoff(self, attempt):
+        """Delay before retry number `attempt` (1-based), with full jitter"""
+        ceiling = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        return self.random() * ceiling
+
+    def decide(
+        self,
+        attempt,
+        status_code=None,
+        sent=True,
+        idempotent=True,
+        max_retries=None,
+        server_delay=False,
+    ):
+        """Decide whether a failed attempt is retried
+
+        Parameters:
+            attempt (int): Number of retries already made for the request
+            status_code (int): The HTTP status, None for a connection error
+            sent (bool): Whether the request may have reached the server
+            idempotent (bool): Whether repeating the request is harmless
+            max_retries (int): Overrides the policy's retries per request
+            server_delay (bool): The server said when to retry (Retry-After),
+                the rate limiter already waits for that
+
+        Returns:
+            float: Seconds to wait before retrying, or None to give up
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        if attempt >= max_retries:
+            return None
+        if status_code is not None and status_code not in RETRY_STATUSES:
+            return None
+        # A 429 was not processed, a request that never left is safe to repeat
+        if sent and status_code != 429 and not idempotent:
+            return None
+        with self._lock:
+            if self.retry_budget is not None and self.retries >= self.retry_budget:
+                return None
+            self.retries += 1
+        if status_code == 429 or server_delay:
+            return 0.0
+        return self.backoff(attempt + 1)
+
+    def after_failure(
+        self,
+        attempt,
+        method,
+        url,
+        status_code=None,
+        headers=None,
+        sent=True,
+        message="request failed",
+        body=None,
+        idempotent=True,
+        max_retries=None,
+        breaker=None,
+        pause=None,
+    ):
+        """Handle a failed attempt, for the synchronous and the async client alike
+
+        Server failures are recorded with the circuit breaker, and a 429
+        without Retry-After pauses the rate limit bucket. Then the request is
+        either retried or failed with the matching error.
+
+        Parameters:
+            attempt (int): Number of retries already made for the request
+            method (str): The HTTP method of the request
+            url (str): The requested URL
+            status_code (int): The HTTP status, None for a connection error
+            headers (dict): The response headers, None without a response
+            sent (bool): Whether the request may have reached the server
+            message (str): What went wrong
+            body (str): The start of the response body
+            idempotent (bool): Whether repeating the request is harmless
+            max_retries (int): Overrides the policy's retries per request
+            breaker (CircuitBreaker): The circuit breaker of the API
+            pause (callable): Holds back the request's rate limit bucket
+
+        Returns:
+            float: Seconds to wait before the next attempt
+
+        Raises:
+            AmbiguousRequestError: If a non-idempotent request may have been
+                processed by a failing server
+            MotionAPIError: If the request is not retried for another reason
+        """
+        if breaker is not None and is_server_failure(status_code):
+            breaker.record_failure()
+        server_delay = headers is not None and "Retry-After" in headers
+        if status_code == 429 and not server_delay and pause is not None:
+            # The limiter holds every caller back until the window has passed
+            pause()
+
+        delay = self.decide(
+            attempt, status_code, sent, idempotent, max_retries, server_delay
+        )
+        if delay is None:
+            ambiguous = not idempotent and sent and is_server_failure(status_code)
+            error_class = AmbiguousRequestError if ambiguous else MotionAPIError
+            raise error_class(
+                message,
+                method=method,
+                url=url,
+                status_code=status_code,
+                attempts=attempt + 1,
+                retryable=status_code is None or status_code in RETRY_STATUSES,
+                body=body,
+            )
+        return delay
+
+    def retry_ambiguous(self, attempt, error):
+        """Seconds to wait before posting again after an AmbiguousRequestError
+
+        Only called once the lookup found no task created by the failed
+        attempt. Raises `error` again if the request is not retried.
+        """
+        delay = self.decide(attempt, error.status_code)
+        if delay is None:
+            raise error
+        return delay
+
+
+class CircuitBreaker:
+    """Stops all callers from hammering an API that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    every request waits until `recovery_time` has passed. Then requests are
+    let through again; the first success closes the circuit, the next
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold=5,
+        recovery_time=30.0,
+        max_wait=60.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """
+        Parameters:
+            failure_threshold (int): Consecutive failures that open the circuit
+            recovery_time (float): Seconds the circuit stays open
+            max_wait (float): Callers that would wait longer fail with
+                CircuitOpenError instead
+            clock (callable): Monotonic clock in seconds
+            sleep (callable): Sleeps for the given number of seconds
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self.clock() - self._opened_at < self.recovery_time:
+                return "open"
+            return "half-open"
+
+    def reserve(self):
+        """Return the seconds to wait before the next request may be sent
+
+        Raises:
+            CircuitOpenError: If the wait would exceed max_wait
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            delay = self._opened_at + self.recovery_time - self.clock()
+        if delay <= 0:
+            return 0.0
+        if delay > self.max_wait:
+            raise CircuitOpenError(
+                f"circuit open after {self.failures} consecutive failures, "
+                f"retrying in {delay:.0f}s",
+                retryable=True,
+            )
+        return delay
+
+    def acquire(self):
+        """Block while the circuit is open
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        delay = self.reserve()
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            now = self.clock()
+            half_open = (
+                self._opened_at is not None
+                and now - self._opened_at >= self.recovery_time
+            )
+            if half_open or (
+                self._opened_at is None and self.failures >= self.failure_threshold
+            ):
+                self._opened_at = now
+                self.trips += 1
+
+
+def is_server_failure(status_code):
+    """Whether a response (None: no response at all) means the API is unhealthy"""
+    return status_code is None or status_code >= 500
+
+
+def created_task_query(task_data):
+    """The /tasks filter for finding a task create_task may have created"""
+    params = {"workspaceId": task_data["workspaceId"], "name": task_data.get("name")}
+    if task_data.get("projectId"):
+        params["projectId"] = task_data["projectId"]
+    return params
+
+
+def match_created_task(tasks, task_data, since):
+    """Find the task an earlier attempt of create_task may have created
+
+    Parameters:
+        tasks (iterable): Candidate tasks, e.g. the workspace's tasks with that name
+        task_data (dict): The data that was posted
+        since (datetime): When the first attempt was sent
+
+    Returns:
+        dict: The created task, or None
+    """
+    # Allow for the server's clock being a little behind ours
+    since = since - timedelta(seconds=30)
+    for task in tasks:
+        if task.get("name") != task_data.get("name"):
+            continue
+        created, _ = parse_timestamp(task.get("createdTime"))
+        if created is not None and created >= since:
+            return task
+    return None
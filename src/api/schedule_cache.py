@@ -0,0 +1,242 @@
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+
+from .models import parse_timestamp
+
+MODEL_KINDS = ("scheduledEntities", "tasks", "chunks", "calendarEvents", "projects")
+
+
+def _as_utc(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _entity_start(entity):
+    """Return the start of a scheduled entity in UTC, or None"""
+    start, _ = parse_timestamp((entity.get("schedule") or {}).get("start"))
+    return _as_utc(start) if start is not None else None
+
+
+def _related_models(entity_id, entity, models):
+    """Return {kind: {id: model}} of the models a scheduled entity refers to"""
+    tasks = models.get("tasks", {})
+    chunks = models.get("chunks", {})
+    events = models.get("calendarEvents", {})
+    projects = models.get("projects", {})
+
+    related = {}
+    entity_type = entity.get("type")
+    task_ids = []
+    if entity_type == "TASK":
+        task_ids.append(entity_id)
+    elif entity_type == "CHUNK" and entity_id in chunks:
+        related["chunks"] = {entity_id: chunks[entity_id]}
+        task_ids.append(chunks[entity_id].get("parentTaskId"))
+    elif entity_type == "EVENT" and entity_id in events:
+        related["calendarEvents"] = {entity_id: events[entity_id]}
+    related_tasks = {
+        task_id: tasks[task_id] for task_id in task_ids if task_id in tasks
+    }
+    if related_tasks:
+        related["tasks"] = related_tasks
+        related["projects"] = {
+            task["projectId"]: projects[task["projectId"]]
+            for task in related_tasks.values()
+            if task.get("projectId") in projects
+        }
+    return related
+
+
+def _day_range(first_day, last_day):
+    day = first_day
+    while day <= last_day:
+        yield day
+        day += timedelta(days=1)
+
+
+class ScheduledEntityCache:
+    """Caches /v2/scheduled-entities responses in UTC day buckets.
+
+    A request for a date range only fetches the days that are missing or
+    expired, in as few contiguous sub-ranges as possible, and answers from
+    the merged buckets. Like the API, a range holds the entities starting
+    in it; each one is filed under the day it starts on. Days in the past
+    change rarely and are kept longer than today and future days. Long runs
+    of missing days are fetched in requests of at most `max_fetch_days` days
+    each.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        past_ttl=6 * 3600,
+        future_ttl=300,
+        max_fetch_days=31,
+        clock=time.time,
+    ):
+        """
+        Parameters:
+            fetch (callable): fetch(start, end) returning the raw API response
+            past_ttl (float): Seconds a day that is over stays valid
+            future_ttl (float): Seconds today and future days stay valid
+            max_fetch_days (int): Most days per request, None for no limit
+            clock (callable): Returns the current unix time
+        """
+        self.fetch = fetch
+        self.past_ttl = past_ttl
+        self.future_ttl = future_ttl
+        self.max_fetch_days = max_fetch_days
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, day, bucket, now):
+        day_end = datetime.combine(day + timedelta(days=1), dt_time(), timezone.utc)
+        ttl = self.past_ttl if day_end.timestamp() <= now else self.future_ttl
+        return now - bucket["fetched_at"] < ttl
+
+    def _missing_ranges(self, days):
+        """Group the days that need fetching into contiguous (first, last) runs"""
+        now = self.clock()
+        runs = []
+        with self._lock:
+            for day in days:
+                bucket = self._buckets.get(day)
+                if bucket is not None and self._is_fresh(day, bucket, now):
+                    self.hits += 1
+                    continue
+                self.misses += 1
+                if (
+                    runs
+                    and runs[-1][1] == day - timedelta(days=1)
+                    and not self._is_full(runs[-1])
+                ):
+                    runs[-1][1] = day
+                else:
+                    runs.append([day, day])
+        return runs
+
+    def _is_full(self, run):
+        if not self.max_fetch_days:
+            return False
+        return (run[1] - run[0]).days + 1 >= self.max_fetch_days
+
+    def _store(self, response, first_day, last_day, fetched_at):
+        models = response.get("models", {})
+        buckets = {
+            day: {
+                "fetched_at": fetched_at,
+                "models": {kind: {} for kind in MODEL_KINDS},
+            }
+            for day in _day_range(first_day, last_day)
+        }
+
+        for entity_id, entity in models.get("scheduledEntities", {}).items():
+            start = _entity_start(entity)
+            if start is None:
+                # Entities without a start belong to every fetched day, so
+                # any later range overlapping the fetch still returns them
+                entity_days = list(buckets)
+            elif first_day <= start.date() <= last_day:
+                entity_days = [start.date()]
+            else:
+                continue
+
+            related = _related_models(entity_id, entity, models)
+            for day in entity_days:
+                bucket_models = buckets[day]["models"]
+                bucket_models["scheduledEntities"][entity_id] = entity
+                for kind, items in related.items():
+                    bucket_models[kind].update(items)
+
+        with self._lock:
+            self._buckets.update(buckets)
+
+    def get(self, start_date, end_date):
+        """Return a response-shaped dict with the entities scheduled between the dates
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+
+        Returns:
+            dict: {"models": {...}} like the /v2/scheduled-entities response
+        """
+        return self.get_many([(start_date, end_date)])[0]
+
+    def get_many(self, ranges):
+        """Answer several date ranges, fetching each missing day only once
+
+        Parameters:
+            ranges (list): (start_date, end_date) tuples
+
+        Returns:
+            list: A response-shaped dict per range
+        """
+        ranges = [(_as_utc(start), _as_utc(end)) for start, end in ranges]
+        days = sorted(
+            {
+                day
+                for start, end in ranges
+                for day in _day_range(start.date(), end.date())
+            }
+        )
+        for first_day, last_day in self._missing_ranges(days):
+            fetched_at = self.clock()
+            response = self.fetch(
+                datetime.combine(first_day, dt_time(), timezone.utc),
+                datetime.combine(last_day, dt_time.max, timezone.utc),
+            )
+            self.fetches += 1
+            self._store(response, first_day, last_day, fetched_at)
+
+        return [self._assemble(start, end) for start, end in ranges]
+
+    def _assemble(self, start, end):
+        merged = {kind: {} for kind in MODEL_KINDS}
+        available = {kind: {} for kind in MODEL_KINDS[1:]}
+        with self._lock:
+            buckets = [
+                self._buckets[day]
+                for day in _day_range(start.date(), end.date())
+                if day in self._buckets
+            ]
+        entities = merged["scheduledEntities"]
+        for bucket in buckets:
+            for entity_id, entity in bucket["models"]["scheduledEntities"].items():
+                if entity_id in entities:
+                    continue
+                # The same predicate as the API: the entity starts in the range
+                entity_start = _entity_start(entity)
+                if entity_start is not None and not start <= entity_start <= end:
+                    continue
+                entities[entity_id] = entity
+            for kind in MODEL_KINDS[1:]:
+                available[kind].update(bucket["models"][kind])
+
+        # Only the models of the returned entities, like the API's response
+        for entity_id, entity in entities.items():
+            for kind, items in _related_models(entity_id, entity, available).items():
+                merged[kind].update(items)
+        return {"models": merged}
+
+    def invalidate(self, start_date=None, end_date=None):
+        """Drop cached days between the dates
+
+        Without a start date everything is dropped, without an end date every
+        day from the start date on.
+        """
+        with self._lock:
+            if start_date is None:
+                self._buckets.clear()
+                return
+            first_day = _as_utc(start_date).date()
+            last_day = _as_utc(end_date).date() if end_date else date.max
+            for day in list(self._buckets):
+                if first_day <= day <= last_day:
+                    del self._buckets[day]
@@ -0,0 +1,133 @@
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class SessionPool:
+    """Keeps one pooled keep-alive requests.Session per host.
+
+    Every request to the same scheme+host goes through the same session, so
+    paginated fetches and bulk updates reuse open TCP/TLS connections instead
+    of doing a fresh handshake per call.
+    """
+
+    def __init__(
+        self,
+        pool_size=10,
+        max_connection_retries=0,
+        backoff_factor=0.5,
+        default_headers=None,
+    ):
+        """
+        Parameters:
+            pool_size (int): Maximum number of kept-alive connections per host
+            max_connection_retries (int): Retries for failed connection attempts,
+                0 when the caller retries them itself
+            backoff_factor (float): urllib3 backoff factor between those retries
+            default_headers (dict): Headers attached to every session
+        """
+        self.pool_size = pool_size
+        self.max_connection_retries = max_connection_retries
+        self.backoff_factor = backoff_factor
+        self.default_headers = default_headers or {}
+        # Per-host headers, kept across close() so a rebuilt session has them
+        self._host_headers = {}
+        self._sessions = {}
+        self._request_counts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host_key(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _build_session(self, key):
+        # Only connection errors are retried here: the request never reached the
+        # server, so it is safe for every method. Read errors and status codes
+        # are left to the caller.
+        retry = Retry(
+            total=self.max_connection_retries,
+            connect=self.max_connection_retries,
+            read=0,
+            redirect=0,
+            status=0,
+            backoff_factor=self.backoff_factor,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+            pool_block=False,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.default_headers)
+        session.headers.update(self._host_headers.get(key, {}))
+        return session
+
+    def get(self, url, headers=None):
+        """Return the session for the host of `url`, creating it on first use.
+
+        `headers` become defaults of the host's session, also when it is
+        rebuilt after close(); per-request headers should be passed to
+        `request` instead.
+        """
+        key = self._host_key(url)
+        with self._lock:
+            if headers:
+                self._host_headers.setdefault(key, {}).update(headers)
+            session = self._sessions.get(key)
+            if session is not None and headers:
+                session.headers.update(headers)
+            if session is None:
+                session = self._build_session(key)
+                self._sessions[key] = session
+                self._request_counts[key] = 0
+            return session
+
+    def request(self, method, url, **kwargs):
+        session = self.get(url)
+        key = self._host_key(url)
+        with self._lock:
+            self._request_counts[key] += 1
+        return session.request(method, url, **kwargs)
+
+    def connection_stats(self):
+        """Return per-host counters showing how many connections were reused
+
+        Returns:
+            dict: host -> {"requests", "new_connections", "reused_connections"}
+        """
+        stats = {}
+        with self._lock:
+            items = list(self._sessions.items())
+            request_counts = dict(self._request_counts)
+        for key, session in items:
+            new_connections = 0
+            for adapter in set(session.adapters.values()):
+                pools = getattr(adapter, "poolmanager", None)
+                if pools is None:
+                    continue
+                for pool_key in list(pools.pools.keys()):
+                    pool = pools.pools.get(pool_key)
+                    if pool is not None:
+                        new_connections += pool.num_connections
+            requests_made = request_counts.get(key, 0)
+            stats[key] = {
+                "requests": requests_made,
+                "new_connections": new_connections,
+                "reused_connections": max(requests_made - new_connections, 0),
+            }
+        return stats
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._request_counts.clear()
@@ -0,0 +1,85 @@
+import json
+
+from .schedule_cache import MODEL_KINDS
+
+try:
+    import ijson
+except ImportError:  # Streaming is optional
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library
+    orjson = None
+
+
+def decode_json(content):
+    """Decode a JSON document, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def require_ijson():
+    """Raise an ImportError unless ijson, needed for streaming, is installed"""
+    if ijson is None:
+        raise ImportError("Streaming responses requires the ijson package")
+
+
+def load_models(stream, kinds=MODEL_KINDS):
+    """Incrementally parse the "models" sections of an internal API response
+
+    Only one model at a time is materialized from the byte stream, and
+    sections not listed in `kinds` (e.g. recurringTasks, uploadedFiles) are
+    skipped without being built.
+
+    Parameters:
+        stream: A binary file-like object, e.g. response.raw
+        kinds (iterable): Model sections to keep
+
+    Returns:
+        dict: {"models": {kind: {id: model}}} shaped like the full response
+    """
+    require_ijson()
+
+    models = {kind: {} for kind in kinds}
+    kind_prefixes = {f"models.{kind}": kind for kind in kinds}
+    current_kind = None
+    current_key = None
+    item_prefix = None
+    builder = None
+
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == item_prefix and event in ("end_map", "end_array"):
+                models[current_kind][current_key] = builder.value
+                builder = None
+            continue
+
+        if event == "map_key" and prefix in kind_prefixes:
+            current_kind = kind_prefixes[prefix]
+            current_key = value
+            item_prefix = f"{prefix}.{value}"
+        elif current_key is not None and prefix == item_prefix:
+            if event in ("start_map", "start_array"):
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            else:
+                models[current_kind][current_key] = value
+
+    return {"models": models}
+
+
+def read_response(response, stream_models=False):
+    """Decode a requests response, optionally streaming its "models" sections
+
+    A streamed response must have been requested with stream=True.
+    """
+    if stream_models:
+        response.raw.decode_content = True
+        try:
+            return load_models(response.raw)
+        finally:
+            response.close()
+    return decode_json(response.content)
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def task_scope(params=None):
+    """Return a stable key for a /tasks query, e.g. "projectId=abc" """
+    params = {k: v for k, v in (params or {}).items() if k != "cursor"}
+    return "&".join(f"{key}={params[key]}" for key in sorted(params)) or "all"
+
+
+def task_hash(task):
+    return hashlib.sha1(
+        json.dumps(task, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+class SyncStats:
+    """Counters describing one sync of a task scope"""
+
+    def __init__(self, scope, fetched=0, added=0, changed=0, deleted=0, duration=0.0):
+        self.scope = scope
+        self.fetched = fetched
+        self.added = added
+        self.changed = changed
+        self.deleted = deleted
+        self.duration = duration
+
+    def __repr__(self):
+        return (
+            f"<SyncStats {self.scope}: {self.fetched} fetched, {self.added} added, "
+            f"{self.changed} changed, {self.deleted} deleted in {self.duration:.2f}s>"
+        )
+
+
+class TaskStore:
+    """SQLite mirror of Motion tasks, grouped by the query (scope) that fetched them.
+
+    The public API has no "updated since" filter, so a sync sweeps all pages
+    of the scope and uses content hashes to find added, changed and deleted
+    tasks. Reads are served from the store while the scope is fresh, in the
+    order the API returned them.
+    """
+
+    def __init__(self, path=None, clock=time.time):
+        """
+        Parameters:
+            path (str): SQLite database file, None for an in-memory store
+            clock (callable): Returns the current unix time
+        """
+        self.path = path or ":memory:"
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(tasks)")]
+        if columns and "position" not in columns:
+            # Written before the API order was stored; it is only a cache
+            self._db.executescript("DROP TABLE tasks; DROP TABLE sync_state;")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                scope TEXT NOT NULL,
+                id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                project_id TEXT,
+                updated_time TEXT,
+                hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (scope, id)
+            );
+            CREATE INDEX IF NOT EXISTS tasks_by_id ON tasks (id);
+            CREATE INDEX IF NOT EXISTS tasks_by_position ON tasks (scope, position);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                scope TEXT PRIMARY KEY,
+                last_sync REAL NOT NULL,
+                stale INTEGER NOT NULL DEFAULT 0,
+                syncs INTEGER NOT NULL DEFAULT 0,
+                fetched INTEGER NOT NULL DEFAULT 0,
+                added INTEGER NOT NULL DEFAULT 0,
+                changed INTEGER NOT NULL DEFAULT 0,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            """
+        )
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def is_fresh(self, scope, max_age):
+        """Return True if the scope was synced less than `max_age` seconds ago"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_sync, stale FROM sync_state WHERE scope = ?", (scope,)
+            ).fetchone()
+        fresh = row is not None and not row[1] and self.clock() - row[0] < max_age
+        if fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return fresh
+
+    def get_tasks(self, scope):
+        return list(self.iter_tasks(scope))
+
+    def iter_tasks(self, scope, batch_size=500):
+        """Yield the stored tasks of a scope in API order, `batch_size` rows at a time"""
+        last_position = -1
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    """
+                    SELECT position, data FROM tasks
+                    WHERE scope = ? AND position > ? ORDER BY position LIMIT ?
+                    """,
+                    (scope, last_position, batch_size),
+                ).fetchall()
+            for last_position, data in rows:
+                yield json.loads(data)
+            if len(rows) < batch_size:
+                return
+
+    def replace_scope(self, scope, tasks, started=None):
+        """Store the result of a full sweep of `scope`
+
+        Returns:
+            SyncStats: What changed compared to the previous sweep
+        """
+        started = self.clock() if started is None else started
+        stats = SyncStats(scope, fetched=len(tasks))
+        with self._lock:
+            known = {
+                task_id: (digest, position)
+                for task_id, digest, position in self._db.execute(
+                    "SELECT id, hash, position FROM tasks WHERE scope = ?", (scope,)
+                )
+            }
+            seen = set()
+            rows = []
+            moved = []
+            for position, task in enumerate(tasks):
+                task_id = task["id"]
+                seen.add(task_id)
+                digest = task_hash(task)
+                previous, previous_position = known.get(task_id, (None, None))
+                if previous == digest:
+                    if previous_position != position:
+                        moved.append((position, scope, task_id))
+                    continue
+                if previous is None:
+                    stats.added += 1
+                else:
+                    stats.changed += 1
+                rows.append(
+                    (
+                        scope,
+                        task_id,
+                        position,
+                        task.get("projectId") or (task.get("project") or {}).get("id"),
+                        task.get("updatedTime"),
+                        digest,
+                        json.dumps(task),
+                    )
+                )
+            deleted = [(scope, task_id) for task_id in known if task_id not in seen]
+            stats.deleted = len(deleted)
+
+            self._db.executemany(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._db.executemany(
+                "UPDATE tasks SET position = ? WHERE scope = ? AND id = ?", moved
+            )
+            self._db.executemany(
+                "DELETE FROM tasks WHERE scope = ? AND id = ?", deleted
+            )
+            self._db.execute(
+                """
+                INSERT INTO sync_state VALUES (?, ?, 0, 1, ?, ?, ?, ?)
+                ON CONFLICT(scope) DO UPDATE SET
+                    last_sync = excluded.last_sync,
+                    stale = 0,
+                    syncs = syncs + 1,
+                    fetched = fetched + excluded.fetched,
+                    added = added + excluded.added,
+                    changed = changed + excluded.changed,
+                    deleted = deleted + excluded.deleted
+                """,
+                (
+                    scope,
+                    started,
+                    stats.fetched,
+                    stats.added,
+                    stats.changed,
+                    stats.deleted,
+                ),
+            )
+            self._db.commit()
+        stats.duration = self.clock() - started
+        return stats
+
+    def mark_stale(self, task_ids=None):
+        """Force a resync of every scope containing one of `task_ids` (all scopes if None)"""
+        with self._lock:
+            if task_ids is None:
+                self._db.execute("UPDATE sync_state SET stale = 1")
+            else:
+                self._db.executemany(
+                    """
+                    UPDATE sync_state SET stale = 1
+                    WHERE scope IN (SELECT scope FROM tasks WHERE id = ?)
+                    """,
+                    [(task_id,) for task_id in task_ids],
+                )
+            self._db.commit()
+
+    def metrics(self):
+        """Return staleness and change counters per scope
+
+        Returns:
+            dict: scope -> {"age", "stale", "tasks", "syncs", "fetched", "added",
+                "changed", "deleted"}
+        """
+        now = self.clock()
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT s.scope, s.last_sync, s.stale, s.syncs, s.fetched,
+                       s.added, s.changed, s.deleted,
+                       (SELECT COUNT(*) FROM tasks t WHERE t.scope = s.scope)
+                FROM sync_state s
+                """
+            ).fetchall()
+        return {
+            scope: {
+                "age": now - last_sync,
+                "stale": bool(stale),
+                "tasks": count,
+                "syncs": syncs,
+                "fetched": fetched,
+                "added": added,
+                "changed": changed,
+                "deleted": deleted,
+            }
+            for scope, last_sync, stale, syncs, fetched, added, changed, deleted, count in rows
+        }
@@ -0,0 +1,285 @@
+import atexit
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds in seconds, the last bucket catches everything slower
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_ID_SEGMENT = re.compile(r"^(?!v\d+$)[^/]*\d[^/]*$")
+
+
+def endpoint_template(path):
+    """Replace ids in a URL path so requests group per endpoint
+
+    e.g. "https://internal.usemotion.com/v2/tasks/tk_1a2b" -> "/v2/tasks/{id}"
+    """
+    path = re.sub(r"^https?://[^/]+", "", path).split("?")[0]
+    return "/".join(
+        "{id}" if _ID_SEGMENT.match(segment) else segment
+        for segment in path.split("/")
+    )
+
+
+class Histogram:
+    """Counts of observed values in fixed buckets, plus count/sum/min/max"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket containing it"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else None,
+            "min": round(self.min, 6) if self.count else None,
+            "max": round(self.max, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                str(bound): count
+                for bound, count in zip(self.buckets + ("inf",), self.counts)
+                if count
+            },
+        }
+
+
+class Span:
+    """A timed operation, handed to the telemetry hooks once it has finished"""
+
+    def __init__(self, name, attributes=None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.duration = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "error": repr(self.error) if self.error is not None else None,
+            "attributes": self.attributes,
+        }
+
+
+class OpenTelemetryHook:
+    """Hook that re-emits finished spans through an OpenTelemetry tracer
+
+    Usage:
+        telemetry.add_hook(OpenTelemetryHook(trace.get_tracer("motion-tools")))
+    """
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def __call__(self, span):
+        start_ns = int(span.start_time * 1e9)
+        otel_span = self.tracer.start_span(
+            span.name,
+            start_time=start_ns,
+            attributes={
+                key: value
+                for key, value in span.attributes.items()
+                if isinstance(value, (str, bool, int, float))
+            },
+        )
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+        otel_span.end(end_time=start_ns + int(span.duration * 1e9))
+
+
+class Telemetry:
+    """Collects request latencies, transfer sizes, waits and cache hit rates.
+
+    One instance can be shared by MotionAPI, AsyncMotionAPI and
+    GoogleCalendarAPI. summary() returns everything as a JSON-serializable
+    dict, hooks are called with every finished Span.
+    """
+
+    def __init__(self, hooks=None, clock=time.perf_counter):
+        """
+        Parameters:
+            hooks (list): Callables receiving each finished Span
+            clock (callable): Measures durations in seconds
+        """
+        self.hooks = list(hooks or [])
+        self.clock = clock
+        self.started = clock()
+        self._requests = {}
+        self._spans = defaultdict(Histogram)
+        self._waits = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+        self._counters = defaultdict(lambda: defaultdict(int))
+        self._caches = {}
+        self._lock = threading.Lock()
+        self._exit_path = None
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def register_cache(self, name, cache):
+        """Report the hits and misses counters of `cache` in the summary"""
+        self._caches[name] = cache
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed block, grouped by name and endpoint attribute"""
+        span = Span(name, attributes)
+        started = self.clock()
+        try:
+            yield span
+        except BaseException as error:
+            span.error = error
+            raise
+        finally:
+            span.duration = self.clock() - started
+            endpoint = span.attributes.get("endpoint")
+            key = f"{name} {endpoint_template(endpoint)}" if endpoint else name
+            with self._lock:
+                self._spans[key].observe(span.duration)
+            self._emit(span)
+
+    @contextmanager
+    def request(self, api, method, url):
+        """Time one HTTP request attempt
+
+        Set "status_code", "bytes_sent" and "bytes_received" on the yielded
+        span; they are aggregated per api, method and endpoint.
+        """
+        span = Span(
+            "http.request",
+            {"api": api, "method": method, "endpoint": endpoint_template(url)},
+        )
+        started = self.clock()
+        try:
+            yield span
+        except BaseException as error:
+            span.error = error
+            raise
+        finally:
+            span.duration = self.clock() - started
+            self._record_request(span)
+            self._emit(span)
+
+    def _record_request(self, span):
+        attributes = span.attributes
+        key = f"{attributes['api']} {attributes['method']} {attributes['endpoint']}"
+        status_code = attributes.get("status_code")
+        with self._lock:
+            stats = self._requests.get(key)
+            if stats is None:
+                stats = self._requests[key] = {
+                    "count": 0,
+                    "errors": 0,
+                    "statuses": defaultdict(int),
+                    "bytes_sent": 0,
+                    "bytes_received": 0,
+                    "latency": Histogram(),
+                }
+            stats["count"] += 1
+            if span.error is not None or status_code is None or status_code >= 400:
+                stats["errors"] += 1
+            stats["statuses"][str(status_code or "error")] += 1
+            stats["bytes_sent"] += attributes.get("bytes_sent") or 0
+            stats["bytes_received"] += attributes.get("bytes_received") or 0
+            stats["latency"].observe(span.duration)
+
+    def _emit(self, span):
+        for hook in self.hooks:
+            try:
+                hook(span)
+            except Exception as e:
+                print(f"Telemetry hook failed: {e}")
+
+    def record_wait(self, kind, seconds):
+        """Record time spent waiting, e.g. "throttle", "retry" or "circuit" """
+        if seconds <= 0:
+            return
+        with self._lock:
+            wait = self._waits[kind]
+            wait["count"] += 1
+            wait["seconds"] += seconds
+
+    def increment(self, counter, key, amount=1):
+        """Count an event, e.g. increment("pages", "public /tasks")"""
+        with self._lock:
+            self._counters[counter][key] += amount
+
+    def summary(self):
+        """Return all collected metrics as a JSON-serializable dict"""
+        with self._lock:
+            requests = {
+                key: {
+                    **{k: v for k, v in stats.items() if k != "latency"},
+                    "statuses": dict(stats["statuses"]),
+                    "latency": stats["latency"].to_dict(),
+                }
+                for key, stats in sorted(self._requests.items())
+            }
+            spans = {key: hist.to_dict() for key, hist in sorted(self._spans.items())}
+            waits = {
+                kind: {"count": wait["count"], "seconds": round(wait["seconds"], 6)}
+                for kind, wait in self._waits.items()
+            }
+            counters = {name: dict(values) for name, values in self._counters.items()}
+
+        caches = {}
+        for name, cache in self._caches.items():
+            lookups = cache.hits + cache.misses
+            caches[name] = {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_rate": round(cache.hits / lookups, 4) if lookups else None,
+            }
+
+        return {
+            "elapsed": round(self.clock() - self.started, 6),
+            "requests": requests,
+            "spans": spans,
+            "waits": waits,
+            "counters": counters,
+            "caches": caches,
+        }
+
+    def write_summary(self, path):
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+    def write_summary_at_exit(self, path):
+        """Write the summary to `path` when the interpreter exits"""
+        if self._exit_path is None:
+            atexit.register(lambda: self.write_summary(self._exit_path))
+        self._exit_path = path
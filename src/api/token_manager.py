@@ -0,0 +1,220 @@
+import logging
+import os
+import threading
+import time
+
+import jwt
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # Everything but Windows
+    msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """Exclusive lock on a file, held across processes while in the with block"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def token_expiry(token):
+    """Return the unix time a JWT expires at
+
+    Returns:
+        float: The "exp" claim, inf if the token has none, 0 if it is no JWT
+    """
+    try:
+        # Decode without verification - we're not checking the signature here
+        payload = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return 0.0
+    return float(payload.get("exp", float("inf")))
+
+
+class TokenManager:
+    """Keeps a valid internal API token, shared with other processes via a file.
+
+    The expiry is decoded once per token. A token close to expiry is
+    refreshed in a background thread while the old one is still used, and
+    concurrent refreshes (threads, and processes via a lock file) result in a
+    single fetch from the token URL.
+    """
+
+    def __init__(
+        self,
+        token_url=None,
+        token_key=None,
+        path="token.txt",
+        refresh_margin=300,
+        fetch=None,
+        clock=time.time,
+    ):
+        """
+        Parameters:
+            token_url (str): URL returning {"access_token": ...}
+            token_key (str): Sent as the "key" parameter to the token URL
+            path (str): Token file shared by all processes, None to keep it in memory
+            refresh_margin (float): Seconds before expiry a background refresh starts
+            fetch (callable): Returns a new token, defaults to requesting token_url
+            clock (callable): Returns the current unix time
+        """
+        self.token_url = token_url
+        self.token_key = token_key
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.fetch = fetch or self._fetch_from_url
+        self.clock = clock
+        self.token = None
+        self.expires_at = 0.0
+        self.fetches = 0
+        self._refresh_lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._background = None
+
+    def set_token(self, token):
+        """Use `token` from now on, e.g. one read from elsewhere"""
+        self.token = token or None
+        self.expires_at = token_expiry(token) if token else 0.0
+
+    def is_valid(self, margin=0):
+        """Return True if the token is valid for at least `margin` more seconds"""
+        return self.token is not None and self.clock() < self.expires_at - margin
+
+    def get_token(self):
+        """Return a valid token
+
+        Only blocks if there is no valid token at all. A token that expires
+        within refresh_margin is returned while a new one is fetched in the
+        background.
+        """
+        if self.token is None:
+            self._load_file()
+        if self.is_valid(self.refresh_margin):
+            return self.token
+        if self.is_valid():
+            self.refresh_in_background()
+            return self.token
+        return self.refresh()
+
+    def prefetch(self):
+        """Load or fetch the token in the background, the first request won't wait"""
+        if self.token is None:
+            self._load_file()
+        if not self.is_valid(self.refresh_margin):
+            self.refresh_in_background()
+
+    def refresh(self, stale_token=None):
+        """Replace the token, fetching a new one only if nobody else did already
+
+        Parameters:
+            stale_token (str): A token the server rejected; it is replaced even
+                if it has not expired yet
+
+        Returns:
+            str: The new token
+        """
+        with self._refresh_lock:
+            # Another thread may have refreshed while we were waiting
+            if self._is_usable(self.token, self.expires_at, stale_token):
+                return self.token
+            if self.path is None:
+                self._fetch()
+                return self.token
+            with FileLock(f"{self.path}.lock"):
+                # ... or another process
+                token = self._read_file()
+                if token and self._is_usable(token, token_expiry(token), stale_token):
+                    self.set_token(token)
+                else:
+                    self._fetch()
+                    self._write_file(self.token)
+            return self.token
+
+    def invalidate(self, token):
+        """Refresh after the server rejected `token`, return the new token"""
+        return self.refresh(stale_token=token)
+
+    def refresh_in_background(self):
+        """Start refreshing the token in a daemon thread, unless one is running"""
+        with self._background_lock:
+            if self._background is not None and self._background.is_alive():
+                return
+            self._background = threading.Thread(
+                target=self._refresh_quietly, name="motion-token-refresh", daemon=True
+            )
+            self._background.start()
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception:
+            # The current token stays in use until the next attempt
+            logger.warning("Background token refresh failed", exc_info=True)
+
+    def _is_usable(self, token, expires_at, stale_token):
+        if token is None or token == stale_token:
+            return False
+        margin = 0 if stale_token is not None else self.refresh_margin
+        return self.clock() < expires_at - margin
+
+    def _fetch(self):
+        token = self.fetch()
+        self.fetches += 1
+        if not token:
+            raise ValueError("The token URL returned no access token")
+        self.set_token(token)
+
+    def _fetch_from_url(self):
+        if not self.token_url:
+            raise ValueError("No token URL to fetch the internal API token from")
+        response = requests.get(self.token_url, params={"key": self.token_key})
+        response.raise_for_status()
+        return response.json().get("access_token", "")
+
+    def _load_file(self):
+        # Written atomically, so reading needs no lock
+        if self.path is not None:
+            self.set_token(self._read_file())
+
+    def _read_file(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r") as file:
+            return file.read().strip() or None
+
+    def _write_file(self, token):
+        # Readers without the lock must never see a half written token
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(token)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,82 @@
+"""Benchmark for the pandas time-allocation analytics on synthetic data
+
+Loads tens of thousands of tasks, chunks and events into the columnar frame
+and times each table, with a year of working hours for the utilization.
+Run from the src directory:
+    python -m benchmarks.analytics
+"""
+
+import gc
+import time
+from datetime import date
+
+from api.models import build_scheduled_entities
+from benchmarks.overview import PALETTE, make_events
+from benchmarks.scheduled_entities import make_scheduled_entities_payload
+from overview import analytics
+
+WORK_HOURS = {
+    "name": "Work hours",
+    "timezone": "Europe/Berlin",
+    "schedule": {
+        day: [{"start": "09:00", "end": "12:30"}, {"start": "13:30", "end": "17:00"}]
+        for day in ("monday", "tuesday", "wednesday", "thursday", "friday")
+    },
+}
+YEAR = (date(2025, 1, 1), date(2025, 12, 31))
+
+
+def _best(function, repeat):
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return best, result
+
+
+def run(sizes=(10_000, 50_000), repeat=3):
+    """Time building the frame and every analytics table for each number of tasks
+
+    Returns:
+        dict: "<stage>/<n_tasks>" -> best seconds
+    """
+    results = {}
+    print(f"{'stage':<12} {'tasks':>8} {'entries':>8} {'best (s)':>10}")
+    for n_tasks in sizes:
+        scheduled = build_scheduled_entities(make_scheduled_entities_payload(n_tasks))
+        events = make_events(n_tasks // 4)
+        workspace_names = {f"workspace-{i}": f"Workspace {i}" for i in range(3)}
+        seconds, frame = _best(
+            lambda: analytics.entries_frame(
+                scheduled, events, workspace_names, PALETTE
+            ),
+            repeat,
+        )
+        stages = {
+            "frame": seconds,
+            "allocation": _best(
+                lambda: [
+                    analytics.allocation(frame, by)
+                    for by in ("workspace", "project", "color")
+                ],
+                repeat,
+            )[0],
+            "daily": _best(lambda: analytics.daily_allocation(frame), repeat)[0],
+            "utilization": _best(
+                lambda: analytics.utilization(frame, WORK_HOURS, *YEAR), repeat
+            )[0],
+            "overlaps": _best(lambda: analytics.overlap_stats(frame), repeat)[0],
+        }
+        for stage, seconds in stages.items():
+            results[f"{stage}/{n_tasks}"] = seconds
+            print(f"{stage:<12} {n_tasks:>8} {len(frame):>8} {seconds:>10.4f}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,192 @@
+"""Throughput of MotionAPI hot paths against the local stub server
+
+Measures a full task sync, bulk updates through both APIs, skipping repeated
+updates and get_tasks_by_date_range on synthetic workspaces. Each run is appended to a
+JSON lines file together with the current commit, and compared with the
+previous run. Run from the src directory:
+    python -m benchmarks.motion_api
+    python -m benchmarks.motion_api --sizes 1000 10000 100000 --latency 0.02
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+from api.motion_api import MotionAPI
+from api.token_manager import TokenManager
+from benchmarks.stub_server import StubMotionServer
+
+# The synthetic schedule spans four weeks from this date
+SCHEDULE_START = datetime(2025, 1, 6, tzinfo=timezone.utc)
+
+
+def make_api(server, workdir, **kwargs):
+    """A MotionAPI talking to `server`, without rate limits or persistent caches"""
+    return MotionAPI(
+        "stub-key",
+        max_calls_per_minute=10**9,
+        cache_path=os.path.join(workdir, "cache.json"),
+        task_store_path=None,
+        base_url=server.base_url,
+        internal_base_url=server.internal_base_url,
+        token_manager=TokenManager(path=None, fetch=lambda: server.token),
+        **kwargs,
+    )
+
+
+def _timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def bench_sync(api, n_updates):
+    stats, seconds = _timed(lambda: api.sync())
+    return {"seconds": seconds, "items": stats.fetched}
+
+
+def bench_bulk_update(api, n_updates, internal=False):
+    tasks = api.get_tasks(limit=(n_updates + 49) // 50)[:n_updates]
+    updates = [
+        {"id": task["id"], "duration": task["duration"] + 15} for task in tasks
+    ]
+    result, seconds = _timed(
+        lambda: api.update_tasks_bulk(updates, internal, max_workers=8)
+    )
+    return {"seconds": seconds, "items": len(result.succeeded)}
+
+
+def bench_bulk_unchanged(api, n_updates):
+    """Reschedule tasks twice; the second run must skip every patch"""
+    tasks = api.get_tasks(limit=(n_updates + 49) // 50, max_age=0)[:n_updates]
+    start = SCHEDULE_START.replace(tzinfo=None)
+    updates = [
+        {
+            "id": task["id"],
+            "startDate": (start + timedelta(days=i % 7)).isoformat(),
+            "dueDate": (SCHEDULE_START + timedelta(days=14)).isoformat(),
+        }
+        for i, task in enumerate(tasks)
+    ]
+    api.update_tasks_bulk(updates, True, max_workers=8)
+    current = api.get_tasks(limit=(n_updates + 49) // 50, max_age=0)[:n_updates]
+    result, seconds = _timed(
+        lambda: api.update_tasks_bulk(updates, True, current, max_workers=8)
+    )
+    # Otherwise the no-op detection doesn't line up with the v1 tasks
+    assert len(result.skipped) == len(updates), result.summary()
+    return {"seconds": seconds, "items": len(result.skipped)}
+
+
+def bench_date_range(api, n_updates):
+    organized, seconds = _timed(
+        lambda: api.get_tasks_by_date_range(
+            SCHEDULE_START, SCHEDULE_START + timedelta(days=28), use_cache=False
+        )
+    )
+    return {"seconds": seconds, "items": len(organized["all_scheduled_entities"])}
+
+
+BENCHMARKS = (
+    ("sync", bench_sync),
+    ("bulk_update", partial(bench_bulk_update, internal=False)),
+    ("bulk_update_internal", partial(bench_bulk_update, internal=True)),
+    ("bulk_unchanged", bench_bulk_unchanged),
+    ("date_range", bench_date_range),
+)
+
+
+def run(sizes=(1_000, 10_000, 100_000), latency=0.0, max_updates=500):
+    """Run every benchmark for each workspace size
+
+    Returns:
+        dict: "<benchmark>/<size>" -> {"seconds", "items", "items_per_second"}
+    """
+    results = {}
+    print(f"{'benchmark':<28} {'items':>8} {'seconds':>9} {'items/s':>10}")
+    for n_tasks in sizes:
+        n_updates = min(n_tasks, max_updates)
+        with StubMotionServer(n_tasks=n_tasks, latency=latency) as server:
+            with tempfile.TemporaryDirectory() as workdir:
+                api = make_api(server, workdir)
+                try:
+                    for name, benchmark in BENCHMARKS:
+                        key = f"{name}/{n_tasks}"
+                        results[key] = _report(key, benchmark(api, n_updates))
+                finally:
+                    api.close()
+    return results
+
+
+def _report(key, result):
+    result["items_per_second"] = result["items"] / result["seconds"]
+    print(
+        f"{key:<28} {result['items']:>8} {result['seconds']:>9.3f} "
+        f"{result['items_per_second']:>10.0f}"
+    )
+    return result
+
+
+def _current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record(results, path, latency):
+    """Append the results to `path` and print the change against the last run"""
+    previous = None
+    if os.path.exists(path):
+        with open(path, "r") as file:
+            lines = [line for line in file if line.strip()]
+        if lines:
+            previous = json.loads(lines[-1])
+
+    entry = {
+        "commit": _current_commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "latency": latency,
+        "results": results,
+    }
+    with open(path, "a") as file:
+        file.write(json.dumps(entry) + "\n")
+
+    if previous is None:
+        return
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('date')}):")
+    for key, result in results.items():
+        before = previous["results"].get(key)
+        if before:
+            change = result["items_per_second"] / before["items_per_second"] - 1
+            print(f"{key:<28} {change:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--max-updates", type=int, default=500)
+    parser.add_argument("--output", default="benchmark_results.jsonl")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.latency, args.max_updates)
+    record(results, args.output, args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark for the overview's aggregation and renderers on synthetic data
+
+Aggregates the four weeks of make_scheduled_entities_payload plus synthetic
+calendar events, without any network access. Run from the src directory:
+    python -m benchmarks.overview
+"""
+
+import gc
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from api.color_palette import ColorPalette
+from api.models import build_scheduled_entities
+from benchmarks.scheduled_entities import make_scheduled_entities_payload
+from overview.aggregate import aggregate_week
+from overview.render import RENDERERS
+
+START = datetime(2025, 1, 6, tzinfo=timezone.utc)
+END = START + timedelta(days=27, hours=23, minutes=59)
+
+PALETTE = ColorPalette.from_api(
+    {
+        str(color_id): {"background": background, "foreground": "#1d1d1d"}
+        for color_id, background in zip(
+            range(1, 12),
+            (
+                "#7986cb",
+                "#33b679",
+                "#8e24aa",
+                "#e67c73",
+                "#f6bf26",
+                "#f4511e",
+                "#039be5",
+                "#e1e1e1",
+                "#3f51b5",
+                "#0b8043",
+                "#d50000",
+            ),
+        )
+    }
+)
+
+
+def make_events(n_events, seed=0):
+    """Google Calendar events as returned by get_events_by_date_range"""
+    rng = random.Random(seed)
+    events = []
+    for i in range(n_events):
+        start = START + timedelta(minutes=rng.randrange(60 * 24 * 28))
+        duration = rng.choice([30, 60, 90])
+        events.append(
+            {
+                "id": f"event-{i}",
+                "summary": f"Event {i}",
+                "colorId": str(rng.randrange(12)),
+                "start": {"dateTime": start.isoformat()},
+                "end": {"dateTime": (start + timedelta(minutes=duration)).isoformat()},
+                "duration": duration,
+            }
+        )
+    return events
+
+
+def _best(function, repeat):
+    best = float("inf")
+    # Like timeit, keep the garbage collector out of the measurement
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return best, result
+
+
+def run(sizes=(1_000, 10_000, 50_000), repeat=3):
+    """Time aggregate_week and every renderer for each number of tasks
+
+    Returns:
+        dict: "<stage>/<n_tasks>" -> best seconds
+    """
+    results = {}
+    print(f"{'stage':<12} {'tasks':>8} {'best (s)':>10}")
+    for n_tasks in sizes:
+        scheduled = build_scheduled_entities(make_scheduled_entities_payload(n_tasks))
+        events = make_events(n_tasks // 4)
+        workspace_names = {f"workspace-{i}": f"Workspace {i}" for i in range(3)}
+        seconds, overview = _best(
+            lambda: aggregate_week(
+                scheduled, events, workspace_names, PALETTE, START, END
+            ),
+            repeat,
+        )
+        stages = [("aggregate", seconds)]
+        for name, renderer in RENDERERS.items():
+            seconds, _ = _best(lambda: renderer().render(overview), repeat)
+            stages.append((name, seconds))
+        for stage, seconds in stages:
+            results[f"{stage}/{n_tasks}"] = seconds
+            print(f"{stage:<12} {n_tasks:>8} {seconds:>10.4f}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,112 @@
+"""Micro-benchmark for resolving the Google color of Motion projects
+
+Compares resolving every task's color from scratch (a regex over the project
+description and a scan over the palette, as the overview used to) with
+ProjectColors, which resolves each project once. Run from the src directory:
+    python -m benchmarks.project_colors
+"""
+
+import gc
+import re
+import time
+
+from api.models import build_scheduled_entities
+from benchmarks.overview import PALETTE
+from benchmarks.scheduled_entities import make_scheduled_entities_payload
+from overview.aggregate import DEFAULT_COLOR, ProjectColors, Workspace
+
+
+def resolve_per_task(project, palette):
+    """The color of a task's project, resolved without any memoization"""
+    description = project.description if project else ""
+    tag = re.search(r"\[GoogleColor=(.*?)\]", description)
+    name = tag.group(1) if tag else "Calendar Color"
+    hex_code = next(
+        (
+            color["background"]
+            for color in palette.values()
+            if color["name"].lower() == name.lower()
+        ),
+        DEFAULT_COLOR,
+    )
+    color_id = next(
+        (
+            color_id
+            for color_id, color in palette.items()
+            if color["background"].lower() == hex_code.lower()
+        ),
+        None,
+    )
+    return hex_code, color_id
+
+
+def _best(function, repeat):
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return best
+
+
+def run(n_tasks=10_000, n_projects=200, repeat=5):
+    """Time color resolution for n_tasks tasks spread over n_projects projects
+
+    Returns:
+        dict: Stage -> best seconds
+    """
+    scheduled = build_scheduled_entities(
+        make_scheduled_entities_payload(n_tasks, n_projects=n_projects)
+    )
+    tasks = [item.task for item in scheduled.regular_tasks] + scheduled.chunked_tasks
+    palette = PALETTE
+
+    def per_task():
+        for task in tasks:
+            resolve_per_task(task.project, palette)
+
+    def memoized():
+        project_colors = ProjectColors(palette)
+        for task in tasks:
+            project = task.project
+            project_colors.resolve(project.id, project.description)
+
+    def add_tasks():
+        project_colors = ProjectColors(palette)
+        workspaces = {}
+        for task in tasks:
+            workspace = workspaces.get(task.workspace_id)
+            if workspace is None:
+                workspace = workspaces[task.workspace_id] = Workspace(
+                    task.workspace_id, task.workspace_id, project_colors=project_colors
+                )
+            workspace.add_task(task)
+
+    # Both ways must agree before their timings mean anything
+    project_colors = ProjectColors(palette)
+    for task in tasks:
+        project = task.project
+        expected = resolve_per_task(project, palette)
+        assert project_colors.resolve(project.id, project.description) == expected
+
+    results = {
+        "per task": _best(per_task, repeat),
+        "memoized": _best(memoized, repeat),
+        "add_task": _best(add_tasks, repeat),
+    }
+    print(f"{len(tasks)} tasks across {n_projects} projects")
+    print(f"{'stage':<10} {'best (s)':>10} {'us/task':>9}")
+    for stage, seconds in results.items():
+        print(f"{stage:<10} {seconds:>10.4f} {seconds / len(tasks) * 1e6:>9.2f}")
+    print(
+        f"memoized: {project_colors.misses} resolutions, {project_colors.hits} hits"
+    )
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,192 @@
+"""Benchmark for MotionAPI.organize_scheduled_entities on synthetic payloads
+
+Run from the src directory:
+    python -m benchmarks.scheduled_entities
+"""
+
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from api.models import build_scheduled_entities
+from api.motion_api import MotionAPI
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def make_scheduled_entities_payload(
+    n_tasks, chunked_share=0.3, chunks_per_task=4, n_events=None, n_projects=50, seed=0
+):
+    """Build a /v2/scheduled-entities response shaped like the real one
+
+    Parameters:
+        n_tasks (int): Number of tasks
+        chunked_share (float): Share of tasks that are split into chunks
+        chunks_per_task (int): Chunks per chunked task
+        n_events (int): Number of calendar events, defaults to n_tasks // 4
+        n_projects (int): Number of projects tasks are spread over
+        seed (int): Random seed
+
+    Returns:
+        dict: The payload
+    """
+    rng = random.Random(seed)
+    n_events = n_tasks // 4 if n_events is None else n_events
+    start = datetime(2025, 1, 6, 8, tzinfo=timezone.utc)
+
+    projects = {
+        f"project-{i}": {
+            "id": f"project-{i}",
+            "name": f"Project {i}",
+            "description": f"[GoogleColor={rng.choice(['Sage', 'Basil', 'Grape'])}]",
+            "workspaceId": f"workspace-{i % 3}",
+        }
+        for i in range(n_projects)
+    }
+    tasks = {}
+    chunks = {}
+    events = {}
+    scheduled_entities = {}
+
+    def schedule(offset_minutes, duration):
+        begin = start + timedelta(minutes=offset_minutes)
+        return {"start": _iso(begin), "end": _iso(begin + timedelta(minutes=duration))}
+
+    for i in range(n_tasks):
+        task_id = f"task-{i}"
+        duration = rng.choice([30, 45, 60, 90, 120])
+        task = {
+            "id": task_id,
+            "name": f"Task {i}",
+            "duration": duration,
+            "projectId": f"project-{rng.randrange(n_projects)}",
+            "workspaceId": f"workspace-{i % 3}",
+            "chunkIds": [],
+            # Remaining fields of a real task model, see api/scheduled_entities_response.json
+            "createdTime": "2025-01-01T10:00:00.000Z",
+            "updatedTime": "2025-01-02T10:00:00.000Z",
+            "lastInteractedTime": "2025-01-02T10:00:00.000Z",
+            "deadlineType": "SOFT",
+            "description": "",
+            "priorityLevel": "MEDIUM",
+            "statusId": "status-1",
+            "dueDate": "2025-02-01T00:00:00.000Z",
+            "isAutoScheduled": True,
+            "isBusy": False,
+            "isFixedTimeTask": False,
+            "needsReschedule": False,
+            "scheduleId": "work",
+            "startDate": "2025-01-06",
+            "type": "NORMAL",
+            "minimumDuration": 30,
+            "completedDuration": 0,
+            "scheduledStatus": "ON_TRACK",
+            "deadlineStatus": "on-track",
+            "blockingTaskIds": [],
+            "blockedByTaskIds": [],
+            "labelIds": [],
+            "customFieldValues": {},
+        }
+        offset = rng.randrange(60 * 24 * 28)
+        if rng.random() < chunked_share:
+            for c in range(chunks_per_task):
+                chunk_id = f"chunk-{i}-{c}"
+                task["chunkIds"].append(chunk_id)
+                chunks[chunk_id] = {"id": chunk_id, "parentTaskId": task_id}
+                scheduled_entities[chunk_id] = {
+                    "id": chunk_id,
+                    "type": "CHUNK",
+                    "schedule": schedule(offset + c * 60, duration // chunks_per_task),
+                }
+        else:
+            scheduled_entities[task_id] = {
+                "id": task_id,
+                "type": "TASK",
+                "schedule": schedule(offset, duration),
+            }
+        tasks[task_id] = task
+
+    for i in range(n_events):
+        event_id = f"event-{i}"
+        events[event_id] = {"id": event_id, "title": f"Event {i}"}
+        scheduled_entities[event_id] = {
+            "id": event_id,
+            "type": "EVENT",
+            "schedule": schedule(rng.randrange(60 * 24 * 28), 60),
+        }
+
+    # The API does not group entities by type
+    items = list(scheduled_entities.items())
+    rng.shuffle(items)
+
+    return {
+        "models": {
+            "scheduledEntities": dict(items),
+            "tasks": tasks,
+            "chunks": chunks,
+            "calendarEvents": events,
+            "projects": projects,
+        }
+    }
+
+
+def run(sizes=(1_000, 5_000, 10_000, 20_000, 40_000), repeat=3):
+    """Time the normalization for each size and print the time per entity
+
+    Returns:
+        list: (n_tasks, n_entities, best seconds) per size
+    """
+    results = []
+    print(f"{'tasks':>8} {'entities':>9} {'best (s)':>10} {'us/entity':>10}")
+    for n_tasks in sizes:
+        payload = make_scheduled_entities_payload(n_tasks)
+        n_entities = len(payload["models"]["scheduledEntities"])
+        best = float("inf")
+        # Like timeit, keep the garbage collector out of the measurement
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                MotionAPI.organize_scheduled_entities(payload)
+                best = min(best, time.perf_counter() - started)
+        finally:
+            gc.enable()
+        results.append((n_tasks, n_entities, best))
+        print(
+            f"{n_tasks:>8} {n_entities:>9} {best:>10.4f} {best / n_entities * 1e6:>10.2f}"
+        )
+    return results
+
+
+def compare_memory(n_tasks=10_000):
+    """Print the memory allocated by the dict normalization and by the models
+
+    Returns:
+        dict: Bytes kept alive by each representation
+    """
+    payload = make_scheduled_entities_payload(n_tasks)
+    results = {}
+    for name, build in (
+        ("dicts", MotionAPI.organize_scheduled_entities),
+        ("models", build_scheduled_entities),
+    ):
+        gc.collect()
+        tracemalloc.start()
+        organized = build(payload)
+        results[name] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del organized
+    print(
+        f"\nMemory on top of the payload for {n_tasks} tasks: "
+        + ", ".join(f"{name} {size / 2**20:.1f} MiB" for name, size in results.items())
+    )
+    return results
+
+
+if __name__ == "__main__":
+    run()
+    compare_memory()
@@ -0,0 +1,94 @@
+"""Peak memory and time of decoding a large /v2/scheduled-entities response
+
+Compares reading the whole body and decoding it (json, and orjson when
+installed) with streaming the "models" sections through ijson. Run from the
+src directory:
+    python -m benchmarks.streaming
+"""
+
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from api import streaming
+from api.models import build_scheduled_entities
+from benchmarks.scheduled_entities import make_scheduled_entities_payload
+
+
+def _measure(load, path):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    organized = build_scheduled_entities(load(path))
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del organized
+    return elapsed, peak
+
+
+def _load_json(path):
+    with open(path, "rb") as file:
+        content = file.read()
+    return json.loads(content)
+
+
+def _load_orjson(path):
+    with open(path, "rb") as file:
+        content = file.read()
+    return streaming.orjson.loads(content)
+
+
+def _load_streaming(path):
+    with open(path, "rb") as file:
+        return streaming.load_models(file)
+
+
+def run(n_tasks=20_000):
+    """Print time and peak memory of each decoding strategy
+
+    Returns:
+        dict: strategy -> (seconds, peak bytes)
+    """
+    payload = make_scheduled_entities_payload(n_tasks)
+    # Sections the normalization never reads, as in real responses
+    payload["models"]["recurringTasks"] = dict(payload["models"]["tasks"])
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+        json.dump(payload, file)
+        path = file.name
+    del payload
+
+    strategies = {"json": _load_json}
+    skipped = []
+    if streaming.orjson is not None:
+        strategies["orjson"] = _load_orjson
+    else:
+        skipped.append("orjson")
+    if streaming.ijson is not None:
+        strategies["ijson stream"] = _load_streaming
+    else:
+        skipped.append("ijson stream")
+
+    results = {}
+    try:
+        print(f"Response size: {os.path.getsize(path) / 2**20:.1f} MiB")
+        print(f"{'strategy':<14} {'time (s)':>9} {'peak (MiB)':>11}")
+        for name, load in strategies.items():
+            elapsed, peak = _measure(load, path)
+            results[name] = (elapsed, peak)
+            print(f"{name:<14} {elapsed:>9.2f} {peak / 2**20:>11.1f}")
+    finally:
+        os.remove(path)
+    for name in skipped:
+        print(
+            f"{name:<14} SKIPPED: {name.split()[0]} is not installed, "
+            "see requirements-optional.txt"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    run()
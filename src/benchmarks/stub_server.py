@@ -0,0 +1,427 @@
+"""Local stand-in for the Motion public and internal APIs
+
+Serves a synthetic workspace built by make_scheduled_entities_payload, so
+MotionAPI can be benchmarked and exercised offline. Run from the src directory:
+    python -m benchmarks.stub_server --tasks 10000 --latency 0.05
+
+Then point MotionAPI at it:
+    MotionAPI(key, base_url="http://127.0.0.1:8765/v1",
+              internal_base_url="http://127.0.0.1:8765")
+"""
+
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from api.models import parse_timestamp
+from benchmarks.scheduled_entities import make_scheduled_entities_payload
+
+# /v1/tasks filters the stub understands, all others are ignored
+TASK_FILTERS = ("workspaceId", "projectId", "name")
+
+
+def make_token(expires_in=365 * 24 * 3600):
+    """Return an unsigned JWT the client accepts as a valid internal API token"""
+
+    def encode(part):
+        raw = json.dumps(part, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    header = encode({"alg": "HS256", "typ": "JWT"})
+    payload = encode({"sub": "stub", "exp": int(time.time() + expires_in)})
+    return f"{header}.{payload}.stub"
+
+
+def _iso_now():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class StubMotionState:
+    """The data and behaviour of the stub server"""
+
+    def __init__(
+        self,
+        n_tasks=1_000,
+        n_projects=50,
+        page_size=50,
+        latency=0.0,
+        rate_limit=None,
+        rate_period=60.0,
+        retry_after=1,
+        error_rate=0.0,
+        seed=0,
+    ):
+        """
+        Parameters:
+            n_tasks (int): Number of synthetic tasks
+            n_projects (int): Number of projects the tasks are spread over
+            page_size (int): Items per /v1 page
+            latency (float): Seconds every response is delayed
+            rate_limit (int): Requests per rate_period and API before a 429,
+                None for no limit
+            rate_period (float): Length of the rate limit window in seconds
+            retry_after (int): Retry-After header of a 429, None to omit it
+            error_rate (float): Share of requests answered with a 503
+            seed (int): Random seed of the data and the errors
+        """
+        self.page_size = page_size
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.token = make_token()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.throttled = 0
+        self._windows = {}
+        self._idempotency_keys = {}
+        self._filtered = {}
+
+        models = make_scheduled_entities_payload(
+            n_tasks, n_projects=n_projects, seed=seed
+        )["models"]
+        self.models = models
+        self.workspaces = [
+            {"id": f"workspace-{i}", "name": f"Workspace {i}", "type": "INDIVIDUAL"}
+            for i in range(3)
+        ]
+        self.projects = list(models["projects"].values())
+        self.schedules = [
+            {
+                "name": "Work hours",
+                "isDefaultTimezone": True,
+                "timezone": "Europe/Berlin",
+                "schedule": {
+                    day: [{"start": "09:00", "end": "17:00"}]
+                    for day in ("monday", "tuesday", "wednesday", "thursday", "friday")
+                },
+            }
+        ]
+        # Public API view of every task, kept in sync with the internal models
+        self.tasks = {
+            task_id: self._public_task(task)
+            for task_id, task in models["tasks"].items()
+        }
+
+    def _public_task(self, task):
+        project = self.models["projects"].get(task.get("projectId"))
+        if project is not None:
+            project = {"id": project["id"], "name": project["name"]}
+        # The v1 names of the internal fields update_tasks_bulk compares
+        return {
+            **task,
+            "completed": False,
+            "startOn": (task.get("startDate") or "")[:10] or None,
+            "priority": task.get("priorityLevel"),
+            "workspace": {"id": task.get("workspaceId")},
+            "project": project,
+        }
+
+    def admit(self, api):
+        """Count a request and return (status, headers) if it is refused"""
+        with self.lock:
+            now = time.monotonic()
+            window_start, count = self._windows.get(api, (now, 0))
+            if now - window_start >= self.rate_period:
+                window_start, count = now, 0
+            count += 1
+            self._windows[api] = (window_start, count)
+            if self.rate_limit is not None and count > self.rate_limit:
+                self.throttled += 1
+                headers = {}
+                if self.retry_after is not None:
+                    headers["Retry-After"] = str(self.retry_after)
+                return 429, headers
+            if self.error_rate and self.rng.random() < self.error_rate:
+                return 503, {}
+        return None
+
+    def count(self, route):
+        with self.lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def page(self, items, query):
+        offset = int(query.get("cursor", 0))
+        end = offset + self.page_size
+        meta = {"pageSize": self.page_size}
+        if end < len(items):
+            meta["nextCursor"] = str(end)
+        return items[offset:end], meta
+
+    def filtered_task_ids(self, query):
+        """Task ids matching the query, cached until the next write"""
+        key = tuple(query.get(name) for name in TASK_FILTERS)
+        with self.lock:
+            ids = self._filtered.get(key)
+            if ids is None:
+                workspace_id, project_id, name = key
+                ids = self._filtered[key] = [
+                    task_id
+                    for task_id, task in self.tasks.items()
+                    if (workspace_id is None or task["workspaceId"] == workspace_id)
+                    and (project_id is None or task["projectId"] == project_id)
+                    and (name is None or name.lower() in task["name"].lower())
+                ]
+            return ids
+
+    def create_task(self, data, idempotency_key=None):
+        with self.lock:
+            if idempotency_key and idempotency_key in self._idempotency_keys:
+                return self.tasks[self._idempotency_keys[idempotency_key]]
+            task_id = f"task-{uuid.uuid4().hex[:12]}"
+            now = _iso_now()
+            task = {
+                "id": task_id,
+                "duration": 30,
+                "chunkIds": [],
+                **data,
+                "createdTime": now,
+                "updatedTime": now,
+            }
+            self.models["tasks"][task_id] = task
+            self.tasks[task_id] = self._public_task(task)
+            if idempotency_key:
+                self._idempotency_keys[idempotency_key] = task_id
+            self._filtered.clear()
+            return self.tasks[task_id]
+
+    def update_task(self, task_id, data):
+        with self.lock:
+            task = self.models["tasks"].get(task_id)
+            if task is None:
+                return None
+            task.update({k: v for k, v in data.items() if k != "id"})
+            task["updatedTime"] = _iso_now()
+            self.tasks[task_id] = self._public_task(task)
+            self._filtered.clear()
+            return self.tasks[task_id]
+
+    def scheduled_entities(self, filters):
+        """Answer a /v2/scheduled-entities query from the synthetic schedule"""
+        scheduled = (filters or {}).get("scheduled") or {}
+        start, _ = parse_timestamp(scheduled.get("from"))
+        end, _ = parse_timestamp(scheduled.get("to"))
+        models = self.models
+        result = {
+            "scheduledEntities": {},
+            "tasks": {},
+            "chunks": {},
+            "calendarEvents": {},
+            "projects": {},
+        }
+        with self.lock:
+            for entity_id, entity in models["scheduledEntities"].items():
+                entity_start, _ = parse_timestamp(entity["schedule"]["start"])
+                if (start and entity_start < start) or (end and entity_start > end):
+                    continue
+                result["scheduledEntities"][entity_id] = entity
+                task_id = None
+                if entity["type"] == "TASK":
+                    task_id = entity_id
+                elif entity["type"] == "CHUNK":
+                    chunk = models["chunks"][entity_id]
+                    result["chunks"][entity_id] = chunk
+                    task_id = chunk["parentTaskId"]
+                elif entity["type"] == "EVENT":
+                    result["calendarEvents"][entity_id] = models["calendarEvents"][
+                        entity_id
+                    ]
+                if task_id is not None:
+                    task = models["tasks"][task_id]
+                    result["tasks"][task_id] = task
+                    project_id = task.get("projectId")
+                    if project_id in models["projects"]:
+                        result["projects"][project_id] = models["projects"][project_id]
+        return {"models": result}
+
+
+class StubMotionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+    def _send_json(self, status, body=None, headers=None):
+        content = json.dumps(body if body is not None else {}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _handle(self, method):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        body = self._read_json() if method in ("POST", "PATCH") else {}
+
+        internal = path.startswith("/v2/")
+        if internal:
+            if self.headers.get("Authorization") != f"Bearer {self.state.token}":
+                return self._send_json(401, {"message": "Unauthorized"})
+        elif not self.headers.get("X-API-Key"):
+            return self._send_json(401, {"message": "Missing API key"})
+
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        refused = self.state.admit("internal" if internal else "public")
+        if refused is not None:
+            status, headers = refused
+            return self._send_json(status, {"message": "Stub refused"}, headers)
+
+        route, response = self._route(method, path, query, body)
+        self.state.count(route)
+        if response is None:
+            return self._send_json(404, {"message": f"Not found: {method} {path}"})
+        return self._send_json(200, response)
+
+    def _route(self, method, path, query, body):
+        state = self.state
+        segments = path.strip("/").split("/")
+
+        if method == "GET" and path == "/v1/workspaces":
+            return "GET /v1/workspaces", {"workspaces": state.workspaces, "meta": {}}
+        if method == "GET" and path == "/v1/projects":
+            projects = [
+                project
+                for project in state.projects
+                if project.get("workspaceId") == query.get("workspaceId")
+            ]
+            items, meta = state.page(projects, query)
+            return "GET /v1/projects", {"projects": items, "meta": meta}
+        if method == "GET" and path == "/v1/schedules":
+            return "GET /v1/schedules", state.schedules
+        if method == "GET" and path == "/v1/tasks":
+            task_ids, meta = state.page(state.filtered_task_ids(query), query)
+            return "GET /v1/tasks", {
+                "tasks": [state.tasks[task_id] for task_id in task_ids],
+                "meta": meta,
+            }
+        if method == "POST" and path == "/v1/tasks":
+            task = state.create_task(body, self.headers.get("Idempotency-Key"))
+            return "POST /v1/tasks", task
+        if method == "PATCH" and segments[:2] == ["v1", "tasks"] and len(segments) == 3:
+            return "PATCH /v1/tasks/{id}", state.update_task(segments[2], body)
+        if method == "POST" and path == "/v2/scheduled-entities":
+            filters = (body.get("data") or {}).get("filters")
+            return "POST /v2/scheduled-entities", state.scheduled_entities(filters)
+        if method == "PATCH" and segments[:2] == ["v2", "tasks"] and len(segments) == 3:
+            data = body.get("data") or {}
+            return "PATCH /v2/tasks/{id}", state.update_task(segments[2], data)
+        return f"{method} {path}", None
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+
+class StubMotionServer:
+    """Runs the stub in a background thread
+
+    Usage:
+        with StubMotionServer(n_tasks=10_000) as server:
+            api = MotionAPI(key, base_url=server.base_url,
+                            internal_base_url=server.internal_base_url)
+    """
+
+    def __init__(self, state=None, host="127.0.0.1", port=0, **state_kwargs):
+        """
+        Parameters:
+            state (StubMotionState): The served data, built from state_kwargs if None
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 picks a free one
+            **state_kwargs: Passed on to StubMotionState
+        """
+        self.state = state or StubMotionState(**state_kwargs)
+        self.httpd = ThreadingHTTPServer((host, port), StubMotionHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self._thread = None
+
+    @property
+    def internal_base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        return f"{self.internal_base_url}/v1"
+
+    @property
+    def token(self):
+        return self.state.token
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tasks", type=int, default=1_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubMotionServer(
+        port=args.port,
+        n_tasks=args.tasks,
+        page_size=args.page_size,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+    )
+    print(f"Serving {args.tasks} tasks on {server.base_url}")
+    print(f"Internal API token: {server.token}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -14,3 +14,7 @@ NEW_MOTION_TOKEN_KEY = os.environ.get(
     "NEW_MOTION_TOKEN_KEY",
     "",
 )
+# Set to a positive number to run Motion requests concurrently (requires httpx)
+MOTION_MAX_CONCURRENCY = int(os.environ.get("MOTION_MAX_CONCURRENCY", "0"))
+# Write request latencies, waits and cache hit rates as JSON to this file at exit
+TELEMETRY_SUMMARY_PATH = os.environ.get("TELEMETRY_SUMMARY_PATH", "")
@@ -1,4 +1,5 @@
 import json
+import logging
 import os
 from datetime import datetime, timedelta
 
@@ -6,8 +7,14 @@ import natsort
 import pytz
 from api.motion_api import MotionAPI
 from pdf_parser.pdf_extractor import FileExtractor
-from overview.overview import get_upcoming_week_tasks
+from overview.aggregate import GRANULARITIES
+from overview.overview import (
+    get_range_overview,
+    get_time_analytics,
+    get_upcoming_week_tasks,
+)
 from api.google_api import GoogleCalendarAPI
+from api.telemetry import Telemetry
 from prettify import colorize
 from task_generator.task_generator import TaskGenerator
 import constants
@@ -94,56 +101,69 @@ def task_generator(api: MotionAPI, file_ending="pdf", config_from_file=True):
     if input("Do you want to add a file ending? defaults to pdf (y/n): ") == "y":
         file_ending = input("Enter the file ending: ")
 
-    for filename in sorted_files:
-        if filename.endswith("." + file_ending):
-            week_pattern = r"exercise_(\d+)"
-            name_pattern = r"(.+)\." + file_ending
-            week_number, pdf_name = FileExtractor.extract_week_number_and_name(
-                filename, number_pattern=week_pattern, name_pattern=name_pattern
-            )
-            week_number = week_number + 1
-            if week_number:
-                if blocking_name:
-                    blocking_ids = [
-                        task["id"]
-                        for task in tasks_in_project
-                        if (
-                            blocking_name in task["name"]
-                            and f"W{week_number}:" in task["name"]
-                        )
-                    ]
-                else:
-                    blocking_ids = None
-                name = (
-                    task_name.strip()
-                    # + " "
-                    # + pdf_name.replace("_", " ").replace("-", " ")
-                )
-                task = task_generator.generate_task_for_week(
-                    week_number,
-                    name,
-                    task_duration,
-                    workspace_id,
-                    project_id,
-                    shorthand,
-                )
+    block_updates = []
 
-                print(f"Week {week_number} Task:")
-                print(task)
-
-                if input("Do you want to push these tasks to Motion? (y/n): ") == "y":
-                    entered_task = api.create_task(task)
-                    if blocking_ids:
-                        blockingTasks = []
-                        block_task = {
-                            "type": "NORMAL",
-                            "id": entered_task["id"],
-                        }
-                        for blockingTaskId in blocking_ids:
-                            blockingTasks.append(blockingTaskId)
-                        block_task["blockedByTaskIds"] = blockingTasks
-                        api.update_task(block_task, True)
-                        print("Blocking task added")
+    try:
+        for filename in sorted_files:
+            if filename.endswith("." + file_ending):
+                week_pattern = r"exercise_(\d+)"
+                name_pattern = r"(.+)\." + file_ending
+                week_number, pdf_name = FileExtractor.extract_week_number_and_name(
+                    filename, number_pattern=week_pattern, name_pattern=name_pattern
+                )
+                week_number = week_number + 1
+                if week_number:
+                    if blocking_name:
+                        blocking_ids = [
+                            task["id"]
+                            for task in tasks_in_project
+                            if (
+                                blocking_name in task["name"]
+                                and f"W{week_number}:" in task["name"]
+                            )
+                        ]
+                    else:
+                        blocking_ids = None
+                    name = (
+                        task_name.strip()
+                        # + " "
+                        # + pdf_name.replace("_", " ").replace("-", " ")
+                    )
+                    task = task_generator.generate_task_for_week(
+                        week_number,
+                        name,
+                        task_duration,
+                        workspace_id,
+                        project_id,
+                        shorthand,
+                    )
+
+                    print(f"Week {week_number} Task:")
+                    print(task)
+
+                    if (
+                        input("Do you want to push these tasks to Motion? (y/n): ")
+                        == "y"
+                    ):
+                        entered_task = api.create_task(task)
+                        if blocking_ids:
+                            blockingTasks = []
+                            block_task = {
+                                "type": "NORMAL",
+                                "id": entered_task["id"],
+                            }
+                            for blockingTaskId in blocking_ids:
+                                blockingTasks.append(blockingTaskId)
+                            block_task["blockedByTaskIds"] = blockingTasks
+                            block_updates.append(block_task)
+    finally:
+        # Also when aborted halfway, the tasks created so far get their blockers
+        if block_updates:
+            result = api.update_tasks_bulk(block_updates, True)
+            for task_id in result.succeeded:
+                print(f"Blocking task added to {task_id}")
+            for task_id, error in result.failed.items():
+                print(f"Failed to add blocking task to {task_id}: {error}")
 
     api.update_tasks_if_duration_exceeds(workspace_name, project_name, 45)
 
@@ -224,12 +244,32 @@ def reshedule_tasks(api: MotionAPI):
     )
 
 
+def create_motion_api(telemetry=None):
+    if constants.MOTION_MAX_CONCURRENCY > 0:
+        from api.async_motion_api import ConcurrentMotionAPI
+
+        return ConcurrentMotionAPI(
+            constants.MOTION_API_KEY,
+            max_concurrency=constants.MOTION_MAX_CONCURRENCY,
+            telemetry=telemetry,
+        )
+    return MotionAPI(constants.MOTION_API_KEY, telemetry=telemetry)
+
+
 def main():
-    motion_api = MotionAPI(constants.MOTION_API_KEY)
-    google_api = GoogleCalendarAPI("google_client_secret.json", "google_token.pickle")
+    # Warnings of background work, e.g. a failed token refresh, go to stderr
+    logging.basicConfig(format="%(levelname)s %(name)s: %(message)s")
+    telemetry = Telemetry()
+    if constants.TELEMETRY_SUMMARY_PATH:
+        telemetry.write_summary_at_exit(constants.TELEMETRY_SUMMARY_PATH)
+    motion_api = create_motion_api(telemetry)
+    google_api = GoogleCalendarAPI(
+        "google_client_secret.json", "google_token.json", telemetry=telemetry
+    )
 
     action = input(
-        "What do you want to do? (task_generator[tg]/overview/google/chunk[c]/reshedule): "
+        "What do you want to do? "
+        "(task_generator[tg]/overview/range/analytics/google/chunk[c]/reshedule): "
     )
     if action == "task_generator" or action == "tg" or action == "task_generator":
         task_generator(motion_api)
@@ -242,6 +282,27 @@ def main():
     elif action == "overview":
         weeks_offset = int(input("Enter the number of weeks to offset: "))
         get_upcoming_week_tasks(motion_api, google_api, weeks_offset=weeks_offset)
+    elif action == "range":
+        start_date = datetime.strptime(
+            input("Enter the start date (YYYY-MM-DD): "), "%Y-%m-%d"
+        )
+        end_date = datetime.strptime(
+            input("Enter the end date (YYYY-MM-DD): "), "%Y-%m-%d"
+        )
+        granularity = input("Group by day, week or month? (default: week): ") or "week"
+        while granularity not in GRANULARITIES:
+            print(f"Invalid granularity. Choose one of {', '.join(GRANULARITIES)}.")
+            granularity = input("Group by day, week or month? (default: week): ")
+            granularity = granularity or "week"
+        get_range_overview(motion_api, google_api, start_date, end_date, granularity)
+    elif action == "analytics":
+        start_date = datetime.strptime(
+            input("Enter the start date (YYYY-MM-DD): "), "%Y-%m-%d"
+        )
+        end_date = datetime.strptime(
+            input("Enter the end date (YYYY-MM-DD): "), "%Y-%m-%d"
+        )
+        get_time_analytics(motion_api, google_api, start_date, end_date)
     elif action == "google":
         print(get_upcoming_week_events(google_api))
     elif action == "chunk" or action == "c":
@@ -0,0 +1,706 @@
+import bisect
+import re
+from dataclasses import asdict, dataclass, replace
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from api.color_palette import ColorPalette
+from api.models import ScheduledEntities, Task
+
+DEFAULT_COLOR = "#616161"
+GRANULARITIES = ("day", "week", "month")
+GOOGLE_COLOR_TAG = re.compile(r"\[GoogleColor=(.*?)\]")
+# Counted in the totals, but not listed task by task
+HIDDEN_TASKS = ("04 Modernize",)
+
+
+class ProjectColors:
+    """Resolves the Google color of Motion projects, once per project.
+
+    A project's color is named by a [GoogleColor=<name>] tag in its
+    description. Results are memoized by project id and a hash of the
+    description, so an edited description is resolved again. Share one
+    instance between all workspaces of a run.
+    """
+
+    def __init__(self, palette=None):
+        # Plain dicts are indexed once, so colors are looked up by name in O(1)
+        if not isinstance(palette, ColorPalette):
+            palette = ColorPalette(palette)
+        self.palette = palette
+        self.hits = 0
+        self.misses = 0
+        self._colors = {}
+
+    def resolve(self, project_id, description, default_name="Calendar Color"):
+        """Return (hex code, color id) of a project
+
+        Parameters:
+            project_id (str): The project, "No project" for tasks without one
+            description (str): The project description
+            default_name (str): Color name used when there is no tag
+        """
+        key = (project_id, hash(description), default_name)
+        color = self._colors.get(key)
+        if color is not None:
+            self.hits += 1
+            return color
+        self.misses += 1
+        tag = GOOGLE_COLOR_TAG.search(description)
+        hex_code = self.palette.hex_for_name(
+            tag.group(1) if tag else default_name, DEFAULT_COLOR
+        )
+        color = self._colors[key] = (hex_code, self.palette.id_for_hex(hex_code))
+        return color
+
+
+def default_color_name(workspace_name, project_name):
+    """Color of a project without a [GoogleColor=...] tag"""
+    if workspace_name == "Private Projects" and project_name == "No project":
+        # Tasks without a project in the private workspace are Tangerine
+        return "Tangerine"
+    return "Calendar Color"
+
+
+class Workspace:
+    def __init__(self, id, name, color_mapping=None, project_colors=None):
+        self.id = id
+        self.name = name
+        self.projects = {}
+        self.total_duration = 0
+        self.project_colors = project_colors or ProjectColors(color_mapping)
+        self.color_mapping = self.project_colors.palette
+        self.processed_chunk_ids = set()  # Track processed chunks to avoid duplicates
+
+    def add_task(self, task, is_chunk=False):
+        # Skip if this is a chunk we've already processed
+        if is_chunk and task.id in self.processed_chunk_ids:
+            return
+
+        if is_chunk:
+            self.processed_chunk_ids.add(task.id)
+
+        project = task.project
+        project_id = project.id if project else "No project"
+        project_name = project.name if project else "No project"
+        project_description = project.description if project else ""
+
+        # Get color based on the description's tag, resolved once per project
+        project_color, project_color_id = self.project_colors.resolve(
+            project_id,
+            project_description,
+            default_color_name(self.name, project_name),
+        )
+
+        # Scheduled time if available, otherwise the task duration
+        duration = task.scheduled_duration
+
+        self.projects.setdefault(
+            project_id,
+            Project(
+                project_id,
+                project_name,
+                project_description,
+                project_color,
+                project_color_id,
+            ),
+        ).add_task(task, duration)
+
+        # Only add to total duration if not a chunk (parent tasks will include chunk durations)
+        if not is_chunk:
+            self.total_duration += duration
+
+
+class Project:
+    def __init__(self, id, name, description="", color=DEFAULT_COLOR, color_id=None):
+        self.id = id
+        self.name = name
+        self.tasks = []
+        self.total_duration = 0
+        self.description = description
+        self.color = color
+        self.color_id = color_id
+
+    def add_task(self, task, duration):
+        self.tasks.append((task, duration))
+        self.total_duration += duration
+
+
+@dataclass(frozen=True, slots=True)
+class Entry:
+    """A task, chunk or calendar event as listed in the overview"""
+
+    name: str
+    duration: float
+    scheduled_start: datetime = None
+    all_day: bool = False
+    chunks: tuple = ()  # Entries of a chunked task's chunks, by start time
+
+
+@dataclass(frozen=True, slots=True)
+class ProjectTotal:
+    id: str
+    name: str
+    color: str
+    duration: float
+    entries: tuple = ()
+    color_id: str = None
+
+
+@dataclass(frozen=True, slots=True)
+class WorkspaceTotal:
+    id: str
+    name: str
+    duration: float
+    projects: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class ColorTotal:
+    """Calendar events of one Google color"""
+
+    id: str
+    name: str
+    color: str
+    duration: float
+    events: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class AllocationItem:
+    kind: str  # "project" or "events"
+    name: str
+    duration: float
+
+
+@dataclass(frozen=True, slots=True)
+class ColorAllocation:
+    """Motion projects and calendar events sharing a color"""
+
+    id: str
+    name: str
+    color: str
+    duration: float
+    items: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class DayTotal:
+    date: date
+    tasks: float = 0
+    events: float = 0
+
+    @property
+    def duration(self):
+        return self.tasks + self.events
+
+
+@dataclass(frozen=True, slots=True)
+class SourceStatus:
+    """How fetching one data source went"""
+
+    name: str
+    seconds: float = None
+    error: str = None
+
+
+@dataclass(frozen=True, slots=True)
+class WeekOverview:
+    """Everything the overview shows, computed once and shared by all renderers"""
+
+    start: datetime
+    end: datetime
+    label: str  # e.g. "this week" or "2 weeks ago"
+    total_duration: float
+    workspaces: tuple = ()
+    colors: tuple = ()
+    allocation: tuple = ()
+    days: tuple = ()
+    sources: tuple = ()
+
+    def share(self, duration):
+        """Percentage of the total planned time"""
+        return duration / self.total_duration * 100 if self.total_duration > 0 else 0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _event_start(event):
+    """Return (start, all_day) of a Google Calendar event"""
+    start = event.get("start") or {}
+    try:
+        if start.get("dateTime"):
+            value = start["dateTime"].replace("Z", "+00:00")
+            return datetime.fromisoformat(value), False
+        if start.get("date"):
+            return datetime.fromisoformat(f"{start['date']}T00:00:00+00:00"), True
+    except (ValueError, TypeError):
+        pass
+    return None, False
+
+
+def _is_hidden(task):
+    return any(hidden in (task.name or "") for hidden in HIDDEN_TASKS)
+
+
+def _start_sort_key(item):
+    start = item.scheduled_start
+    return start.timestamp() if start else 0
+
+
+def _task_entry(task, duration):
+    if isinstance(task, Task) and task.chunks:
+        chunks = tuple(
+            Entry(
+                chunk.name,
+                chunk.scheduled_duration,
+                chunk.scheduled_start,
+                chunk.all_day,
+            )
+            for chunk in sorted(task.chunks, key=_start_sort_key)
+        )
+        return Entry(task.name, duration, task.scheduled_start, task.all_day, chunks)
+
+    task_name = task.name or "Unnamed Task"
+    # If no name but we have a parent task, try to get name from there
+    parent = getattr(task, "parent", None)
+    if not task.name and parent is not None:
+        task_name = f"{parent.name or 'Unnamed Parent Task'} (chunk)"
+    return Entry(task_name, duration, task.scheduled_start, task.all_day)
+
+
+class _DayBuckets:
+    """Minutes per local day of the overview's range"""
+
+    def __init__(self, start, end, timezone):
+        self.timezone = pytz.timezone(timezone)
+        self.tasks = {}
+        self.events = {}
+        day = start.date()
+        while day <= end.date():
+            self.tasks[day] = 0
+            self.events[day] = 0
+            day += timedelta(days=1)
+
+    def add(self, bucket, start, all_day, minutes):
+        if start is None:
+            return
+        # Dates without a time component are on their own date everywhere
+        day = start.date() if all_day else start.astimezone(self.timezone).date()
+        if day in bucket:
+            bucket[day] += minutes
+
+    def totals(self):
+        return tuple(
+            DayTotal(day, self.tasks[day], self.events[day]) for day in self.tasks
+        )
+
+
+def aggregate_week(
+    scheduled_data,
+    events,
+    workspace_names,
+    colors,
+    start,
+    end,
+    label="",
+    sources=(),
+    timezone="Europe/Berlin",
+    project_colors=None,
+):
+    """Compute the overview of a date range, without any I/O
+
+    Parameters:
+        scheduled_data (ScheduledEntities): The Motion schedule of the range
+        events (list): Google Calendar events with "colorId" and "duration"
+        workspace_names (dict): Motion workspace id -> name
+        colors (ColorPalette): The Google color palette
+        start (datetime): First day of the range
+        end (datetime): Last day of the range
+        label (str): Describes the range, e.g. "this week"
+        sources (tuple): SourceStatus of each fetched source
+        timezone (str): Timezone the days are counted in
+        project_colors (ProjectColors): Memoized project colors to reuse
+
+    Returns:
+        WeekOverview: The immutable result
+    """
+    project_colors = project_colors or ProjectColors(colors)
+    colors = project_colors.palette
+    days = _DayBuckets(start, end, timezone)
+
+    # Chunks are listed under their parent task, not on their own
+    chunk_ids = {
+        chunk.id for task in scheduled_data.chunked_tasks for chunk in task.chunks
+    }
+
+    workspaces = {}
+
+    def workspace_for(task):
+        workspace_id = task.workspace_id
+        workspace = workspaces.get(workspace_id)
+        if workspace is None:
+            name = workspace_names.get(workspace_id, "Unknown")
+            workspace = workspaces[workspace_id] = Workspace(
+                workspace_id, name, project_colors=project_colors
+            )
+        return workspace
+
+    # Regular tasks (which don't have chunks)
+    for task in scheduled_data.regular_tasks:
+        if task.workspace_id:
+            workspace_for(task).add_task(task)
+            days.add(
+                days.tasks, task.scheduled_start, task.all_day, task.scheduled_duration
+            )
+
+    # Chunked tasks - the parent task's scheduled duration is the sum of its chunks
+    for task in scheduled_data.chunked_tasks:
+        if task.workspace_id:
+            workspace = workspace_for(task)
+            workspace.add_task(task)
+            for chunk in task.chunks:
+                workspace.processed_chunk_ids.add(chunk.id)
+                days.add(
+                    days.tasks,
+                    chunk.scheduled_start,
+                    chunk.all_day,
+                    chunk.scheduled_duration,
+                )
+
+    workspace_totals = tuple(
+        WorkspaceTotal(
+            workspace.id,
+            workspace.name,
+            workspace.total_duration,
+            tuple(
+                ProjectTotal(
+                    project.id,
+                    project.name,
+                    project.color,
+                    project.total_duration,
+                    tuple(
+                        _task_entry(task, duration)
+                        for task, duration in project.tasks
+                        if task.id not in chunk_ids and not _is_hidden(task)
+                    ),
+                    project.color_id,
+                )
+                for project in workspace.projects.values()
+            ),
+        )
+        for workspace in workspaces.values()
+    )
+
+    # Calendar events per color
+    events_by_color = {}
+    for event in events:
+        color_id = event.get("colorId", "0")  # Default to color 0 if not specified
+        events_by_color.setdefault(color_id, []).append(event)
+    color_totals = []
+    for color_id, color_events in events_by_color.items():
+        entries = []
+        # Sort events by start time
+        for event in sorted(
+            color_events,
+            key=lambda e: e.get("start", {}).get(
+                "dateTime", e.get("start", {}).get("date", "")
+            ),
+        ):
+            event_start, all_day = _event_start(event)
+            entries.append(
+                Entry(
+                    event.get("summary", "Unnamed Event"),
+                    event["duration"],
+                    event_start,
+                    all_day,
+                )
+            )
+            days.add(days.events, event_start, all_day, event["duration"])
+        color_totals.append(
+            ColorTotal(
+                color_id,
+                colors.name(color_id, "Default"),
+                colors.hex(color_id, DEFAULT_COLOR),
+                sum(event["duration"] for event in color_events),
+                tuple(entries),
+            )
+        )
+
+    total_duration = sum(w.duration for w in workspace_totals) + sum(
+        c.duration for c in color_totals
+    )
+
+    return WeekOverview(
+        start=start,
+        end=end,
+        label=label,
+        total_duration=total_duration,
+        workspaces=workspace_totals,
+        colors=tuple(color_totals),
+        allocation=_combined_allocation(workspace_totals, color_totals, colors),
+        days=days.totals(),
+        sources=tuple(sources),
+    )
+
+
+def _combined_allocation(workspace_totals, color_totals, colors):
+    """Motion projects and calendar events grouped by their color"""
+    by_color = {}
+
+    def color_group(color_id, color):
+        group = by_color.get(color_id)
+        if group is None:
+            group = by_color[color_id] = {
+                "name": colors.name(color_id, "Default"),
+                "color": color,
+                "items": [],
+            }
+        return group
+
+    for workspace in workspace_totals:
+        for project in workspace.projects:
+            # Resolved together with the project's color
+            color_id = project.color_id
+            if color_id:
+                color_group(color_id, project.color)["items"].append(
+                    AllocationItem(
+                        "project",
+                        f"{workspace.name} - {project.name}",
+                        project.duration,
+                    )
+                )
+
+    for color in color_totals:
+        color_group(color.id, color.color)["items"].append(
+            AllocationItem(
+                "events", f"Calendar Events ({len(color.events)})", color.duration
+            )
+        )
+
+    return tuple(
+        ColorAllocation(
+            color_id,
+            group["name"],
+            group["color"],
+            sum(item.duration for item in group["items"]),
+            tuple(group["items"]),
+        )
+        for color_id, group in by_color.items()
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class Trend:
+    """Minutes of one workspace, project or color in each period"""
+
+    kind: str  # "workspace", "project" or "color"
+    name: str
+    color: str
+    durations: tuple = ()
+
+    @property
+    def total(self):
+        return sum(self.durations)
+
+    @property
+    def change(self):
+        """Minutes more (or fewer) in the last period than in the first"""
+        return self.durations[-1] - self.durations[0] if self.durations else 0
+
+    @property
+    def slope(self):
+        """Least squares change in minutes per period"""
+        n = len(self.durations)
+        if n < 2:
+            return 0
+        mean_x = (n - 1) / 2
+        mean_y = self.total / n
+        covariance = sum(
+            (x - mean_x) * (y - mean_y) for x, y in enumerate(self.durations)
+        )
+        return covariance / sum((x - mean_x) ** 2 for x in range(n))
+
+
+@dataclass(frozen=True, slots=True)
+class RangeOverview:
+    """A date range split into days, weeks or months, each a WeekOverview"""
+
+    start: datetime
+    end: datetime
+    granularity: str
+    periods: tuple = ()
+    trends: tuple = ()
+    sources: tuple = ()
+
+    @property
+    def total_duration(self):
+        return sum(period.total_duration for period in self.periods)
+
+    def share(self, duration):
+        """Percentage of the total planned time of the whole range"""
+        total = self.total_duration
+        return duration / total * 100 if total > 0 else 0
+
+    def to_dict(self):
+        data = asdict(self)
+        data["total_duration"] = self.total_duration
+        return data
+
+
+def period_ranges(start, end, granularity="week"):
+    """Split the days from start to end into calendar days, weeks or months
+
+    Weeks start on Monday. The first and last period are cut to the range.
+
+    Returns:
+        list: (period_start, period_end, label) tuples
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(
+            f"Unknown granularity {granularity!r}, use one of {GRANULARITIES}"
+        )
+    midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    periods = []
+    period_start = start
+    while period_start <= end:
+        day = midnight.date()
+        if granularity == "day":
+            next_start = midnight + timedelta(days=1)
+            label = day.strftime("%a %d.%m.%Y")
+        elif granularity == "week":
+            next_start = midnight + timedelta(days=7 - day.weekday())
+            year, week, _ = day.isocalendar()
+            label = f"week {week} of {year}"
+        else:
+            next_start = (midnight + timedelta(days=32 - day.day)).replace(day=1)
+            label = day.strftime("%B %Y")
+        period_end = min(next_start - timedelta(microseconds=1), end)
+        periods.append((period_start, period_end, label))
+        period_start = midnight = next_start
+    return periods
+
+
+class _PeriodIndex:
+    """Finds the period of a start time by bisecting the periods' first days"""
+
+    def __init__(self, periods, timezone):
+        self.timezone = pytz.timezone(timezone)
+        self.first_days = [period_start.date() for period_start, _, _ in periods]
+
+    def __call__(self, start, all_day=False):
+        # Undated items and ones starting before the range count towards the
+        # first period, so the periods add up to the whole range
+        if start is None:
+            return 0
+        day = start.date() if all_day else start.astimezone(self.timezone).date()
+        return max(bisect.bisect_right(self.first_days, day) - 1, 0)
+
+
+def aggregate_range(
+    scheduled_data,
+    events,
+    workspace_names,
+    colors,
+    start,
+    end,
+    granularity="week",
+    sources=(),
+    timezone="Europe/Berlin",
+):
+    """Compute the overview of each day, week or month of a range, without any I/O
+
+    Every task, chunk and event is put into its period in a single sweep,
+    then each period is aggregated like a week by aggregate_week.
+
+    Parameters:
+        scheduled_data (ScheduledEntities): The Motion schedule of the whole range
+        events (list): Google Calendar events of the whole range
+        workspace_names (dict): Motion workspace id -> name
+        colors (ColorPalette): The Google color palette
+        start (datetime): First day of the range
+        end (datetime): Last day of the range
+        granularity (str): "day", "week" or "month"
+        sources (tuple): SourceStatus of each fetched source
+        timezone (str): Timezone the periods are counted in
+
+    Returns:
+        RangeOverview: The immutable result
+    """
+    # Every period shares the palette index and the memoized project colors
+    project_colors = ProjectColors(colors)
+    periods = period_ranges(start, end, granularity)
+    period_of = _PeriodIndex(periods, timezone)
+    schedules = [ScheduledEntities() for _ in periods]
+    period_events = [[] for _ in periods]
+
+    for task in scheduled_data.regular_tasks:
+        index = period_of(task.scheduled_start, task.all_day)
+        schedules[index].regular_tasks.append(task)
+
+    # A chunked task shows up in every period one of its chunks is in, with
+    # just those chunks
+    for task in scheduled_data.chunked_tasks:
+        chunks_by_period = {}
+        for chunk in task.chunks:
+            index = period_of(chunk.scheduled_start, chunk.all_day)
+            chunks_by_period.setdefault(index, []).append(chunk)
+        for index, chunks in chunks_by_period.items():
+            schedules[index].chunked_tasks.append(replace(task, chunks=chunks))
+
+    for event in events:
+        event_start, all_day = _event_start(event)
+        period_events[period_of(event_start, all_day)].append(event)
+
+    overviews = tuple(
+        aggregate_week(
+            schedule,
+            period_events[index],
+            workspace_names,
+            colors,
+            period_start,
+            period_end,
+            label=label,
+            timezone=timezone,
+            project_colors=project_colors,
+        )
+        for index, (schedule, (period_start, period_end, label)) in enumerate(
+            zip(schedules, periods)
+        )
+    )
+    return RangeOverview(
+        start=start,
+        end=end,
+        granularity=granularity,
+        periods=overviews,
+        trends=_trends(overviews),
+        sources=tuple(sources),
+    )
+
+
+def _trends(overviews):
+    """Series of minutes per period for every workspace, project and color"""
+    series = {"workspace": {}, "project": {}, "color": {}}
+
+    def add(index, kind, name, color, duration):
+        of_kind = series[kind]
+        if name not in of_kind:
+            of_kind[name] = (color, [0] * len(overviews))
+        of_kind[name][1][index] += duration
+
+    for index, overview in enumerate(overviews):
+        for workspace in overview.workspaces:
+            add(index, "workspace", workspace.name, None, workspace.duration)
+            for project in workspace.projects:
+                name = f"{workspace.name} - {project.name}"
+                add(index, "project", name, project.color, project.duration)
+        for color in overview.colors:
+            add(index, "color", color.name, color.color, color.duration)
+
+    return tuple(
+        Trend(kind, name, color, tuple(durations))
+        for kind, of_kind in series.items()
+        for name, (color, durations) in of_kind.items()
+    )
@@ -0,0 +1,350 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from api.event_store import event_time
+from overview.aggregate import ProjectColors, default_color_name
+
+# One row per scheduled task, chunk or calendar event
+COLUMNS = (
+    "start",
+    "end",
+    "duration",
+    "all_day",
+    "workspace",
+    "project",
+    "color",
+    "type",
+)
+CATEGORIES = ("workspace", "project", "color", "type")
+
+
+def _timestamp(value):
+    return value.timestamp() if value is not None else np.nan
+
+
+def entries_frame(scheduled_data, events, workspace_names, colors, project_colors=None):
+    """Load the Motion schedule and calendar events into one columnar frame
+
+    Parameters:
+        scheduled_data (ScheduledEntities): The Motion schedule
+        events (list): Google Calendar events with "colorId" and "duration"
+        workspace_names (dict): Motion workspace id -> name
+        colors (ColorPalette): The Google color palette
+        project_colors (ProjectColors): Memoized project colors to reuse
+
+    Returns:
+        DataFrame: COLUMNS, with start and end in UTC, duration in minutes and
+        the labels as categoricals
+    """
+    project_colors = project_colors or ProjectColors(colors)
+    palette = project_colors.palette
+    columns = {name: [] for name in COLUMNS}
+    starts = columns["start"]
+    ends = columns["end"]
+    durations = columns["duration"]
+    all_days = columns["all_day"]
+    workspaces = columns["workspace"]
+    projects = columns["project"]
+    color_names = columns["color"]
+    types = columns["type"]
+
+    def add_task(item, kind, task):
+        workspace = workspace_names.get(task.workspace_id, "Unknown")
+        project = task.project
+        project_name = project.name if project else "No project"
+        _, color_id = project_colors.resolve(
+            project.id if project else "No project",
+            project.description if project else "",
+            default_color_name(workspace, project_name),
+        )
+        starts.append(_timestamp(item.start))
+        ends.append(_timestamp(item.end))
+        durations.append(item.scheduled_duration)
+        all_days.append(item.all_day)
+        workspaces.append(workspace)
+        projects.append(f"{workspace} - {project_name}")
+        color_names.append(palette.name(color_id, "Default"))
+        types.append(kind)
+
+    # Like the overview, tasks outside of a workspace are left out
+    for item in scheduled_data.regular_tasks:
+        if item.workspace_id:
+            add_task(item, "task", item.task)
+    for task in scheduled_data.chunked_tasks:
+        if task.workspace_id:
+            for chunk in task.chunks:
+                add_task(chunk, "chunk", task)
+
+    for event in events:
+        try:
+            start = event_time(event, "start")
+            end = event_time(event, "end")
+        except (KeyError, TypeError, ValueError):
+            start = end = None
+        starts.append(_timestamp(start))
+        ends.append(_timestamp(end))
+        durations.append(event.get("duration", 0))
+        all_days.append("date" in event.get("start", {}))
+        workspaces.append("Calendar")
+        projects.append("Calendar Events")
+        color_names.append(palette.name(event.get("colorId", "0"), "Default"))
+        types.append("event")
+
+    frame = pd.DataFrame(
+        {
+            "start": pd.to_datetime(np.array(starts, dtype=float), unit="s", utc=True),
+            "end": pd.to_datetime(np.array(ends, dtype=float), unit="s", utc=True),
+            "duration": np.array(durations, dtype=float),
+            "all_day": np.array(all_days, dtype=bool),
+            **{name: pd.Categorical(columns[name]) for name in CATEGORIES},
+        }
+    )
+    # Whole seconds are enough and keep the float round trip exact
+    frame["start"] = frame["start"].dt.round("s")
+    frame["end"] = frame["end"].dt.round("s")
+    return frame
+
+
+def local_days(times, timezone="Europe/Berlin"):
+    """The local midnight of each timestamp, the key the per-day tables use"""
+    return times.dt.tz_convert(timezone).dt.normalize().rename("day")
+
+
+def allocation(frame, by="workspace"):
+    """Minutes and share of the total per workspace, project, color or type
+
+    Parameters:
+        frame (DataFrame): As returned by entries_frame
+        by (str or list): Column(s) to group by
+
+    Returns:
+        DataFrame: "minutes" and "share" (percent), largest first
+    """
+    minutes = (
+        frame.groupby(by, observed=True)["duration"]
+        .sum()
+        .sort_values(ascending=False)
+        .to_frame("minutes")
+    )
+    total = frame["duration"].sum()
+    minutes["share"] = minutes["minutes"] / total * 100 if total > 0 else 0.0
+    return minutes
+
+
+def daily_allocation(frame, by="workspace", timezone="Europe/Berlin"):
+    """Minutes per local day, with a column per workspace, project, color or type
+
+    Entries without a start are left out. With `by=None` the result is the
+    total per day.
+    """
+    days = local_days(frame["start"], timezone)
+    if by is None:
+        return frame["duration"].groupby(days).sum()
+    return (
+        frame.groupby([days, frame[by]], observed=True)["duration"]
+        .sum()
+        .unstack(fill_value=0)
+    )
+
+
+def working_hours(schedule, start, end, timezone="Europe/Berlin"):
+    """The working intervals of a Motion schedule between two dates
+
+    Parameters:
+        schedule (dict): A schedule of get_schedules, with "schedule" mapping
+            lowercase weekdays to [{"start": "09:00", "end": "17:00"}, ...]
+        start (datetime or date): First day
+        end (datetime or date): Last day, included
+
+    Returns:
+        DataFrame: "start" and "end" in UTC, sorted and without overlaps
+    """
+    timezone = schedule.get("timezone") or timezone
+    weekly = {day.lower(): slots for day, slots in schedule["schedule"].items()}
+    first = start.date() if isinstance(start, datetime) else start
+    last = end.date() if isinstance(end, datetime) else end
+
+    local_starts = []
+    local_ends = []
+    day = first
+    while day <= last:
+        for slot in weekly.get(day.strftime("%A").lower(), ()):
+            local_starts.append(f"{day} {slot['start']}")
+            local_ends.append(f"{day} {slot['end']}")
+        day += timedelta(days=1)
+
+    def to_utc(values):
+        local = pd.to_datetime(pd.Series(values, dtype=object), format="%Y-%m-%d %H:%M")
+        return local.dt.tz_localize(
+            timezone, ambiguous="NaT", nonexistent="shift_forward"
+        ).dt.tz_convert("UTC")
+
+    intervals = pd.DataFrame({"start": to_utc(local_starts), "end": to_utc(local_ends)})
+    intervals = intervals.dropna().sort_values("start", ignore_index=True)
+    # Overlapping slots of a day count once
+    previous_end = intervals["end"].cummax().shift()
+    intervals["start"] = intervals["start"].where(
+        previous_end.isna() | (intervals["start"] > previous_end), previous_end
+    )
+    return intervals[intervals["end"] > intervals["start"]].reset_index(drop=True)
+
+
+def _minutes(durations):
+    return durations.dt.total_seconds() / 60
+
+
+def _epoch_ns(times):
+    """Nanoseconds since the epoch of UTC timestamps, as a NumPy array"""
+    return times.values.astype("datetime64[ns]").astype("int64")
+
+
+def _cumulative_minutes(intervals, times):
+    """Working minutes from the first interval up to each of `times`"""
+    starts = _epoch_ns(intervals["start"])
+    ends = _epoch_ns(intervals["end"])
+    before = np.concatenate(([0], np.cumsum(ends - starts)))
+    times = _epoch_ns(times)
+    index = np.searchsorted(starts, times, side="right") - 1
+    inside = np.clip(times - starts[np.maximum(index, 0)], 0, None)
+    inside = np.minimum(inside, (ends - starts)[np.maximum(index, 0)])
+    worked = np.where(index >= 0, before[np.maximum(index, 0)] + inside, 0)
+    return worked / 60e9
+
+
+def utilization(frame, schedule, start, end, timezone="Europe/Berlin"):
+    """How much of each day's working hours is planned
+
+    Working minutes inside an entry are the difference of the cumulative
+    working time at its end and at its start, so every entry is matched
+    against all working intervals at once.
+
+    Parameters:
+        frame (DataFrame): As returned by entries_frame
+        schedule (dict): The Motion schedule of the working hours
+        start (datetime or date): First day
+        end (datetime or date): Last day, included
+
+    Returns:
+        DataFrame: Per local day "available", "planned", "in_hours" and
+        "outside_hours" minutes and "utilization" (in_hours / available)
+    """
+    timezone = schedule.get("timezone") or timezone
+    intervals = working_hours(schedule, start, end, timezone)
+    available = _minutes(intervals["end"] - intervals["start"]).groupby(
+        local_days(intervals["start"], timezone)
+    ).sum()
+
+    timed = frame[~frame["all_day"] & frame["start"].notna() & frame["end"].notna()]
+    if intervals.empty:
+        in_hours = np.zeros(len(timed))
+    else:
+        in_hours = _cumulative_minutes(intervals, timed["end"]) - _cumulative_minutes(
+            intervals, timed["start"]
+        )
+    planned = (
+        pd.DataFrame(
+            {
+                "planned": timed["duration"],
+                "in_hours": in_hours,
+                "day": local_days(timed["start"], timezone),
+            }
+        )
+        .groupby("day")[["planned", "in_hours"]]
+        .sum()
+    )
+
+    result = planned.join(available.rename("available"), how="outer").fillna(0)
+    result.index.name = "day"
+    result["outside_hours"] = (result["planned"] - result["in_hours"]).clip(lower=0)
+    result["utilization"] = np.where(
+        result["available"] > 0,
+        result["in_hours"] / result["available"].where(result["available"] > 0, 1),
+        np.nan,
+    )
+    return result[["available", "planned", "in_hours", "outside_hours", "utilization"]]
+
+
+def overlaps(frame):
+    """Minutes of every timed entry that overlap entries starting before it
+
+    Sorting by start and comparing with the running maximum of the previous
+    ends counts each double booked minute once.
+
+    Returns:
+        DataFrame: The timed entries by start, with "overlap" minutes
+    """
+    timed = frame[~frame["all_day"] & frame["start"].notna() & frame["end"].notna()]
+    timed = timed.sort_values("start", kind="stable")
+    starts = _epoch_ns(timed["start"])
+    ends = _epoch_ns(timed["end"])
+    # The first entry is compared with its own start, so it overlaps nothing
+    previous_end = np.maximum.accumulate(np.concatenate((starts[:1], ends[:-1])))
+    overlap = np.clip(np.minimum(ends, previous_end) - starts, 0, None)
+    return timed.assign(overlap=overlap / 60e9)
+
+
+def overlap_stats(frame, by=None, timezone="Europe/Berlin"):
+    """Overlap statistics of the timed entries
+
+    Parameters:
+        frame (DataFrame): As returned by entries_frame
+        by (str): Also split by "type", "workspace", ... besides the day
+
+    Returns:
+        DataFrame: Per local day (and group) the number of "entries", how many
+        are "overlapping", their "overlap" minutes, the "busy" minutes (the
+        union of all entries) and the "overlap_share" of the scheduled time
+    """
+    timed = overlaps(frame)
+    minutes = _minutes(timed["end"] - timed["start"])
+    timed = timed.assign(
+        day=local_days(timed["start"], timezone),
+        minutes=minutes,
+        busy=minutes - timed["overlap"],
+        overlapping=timed["overlap"] > 0,
+    )
+    keys = ["day"] if by is None else ["day", by]
+    stats = timed.groupby(keys, observed=True).agg(
+        entries=("minutes", "size"),
+        overlapping=("overlapping", "sum"),
+        minutes=("minutes", "sum"),
+        overlap=("overlap", "sum"),
+        busy=("busy", "sum"),
+    )
+    stats["overlap_share"] = np.where(
+        stats["minutes"] > 0,
+        stats["overlap"] / stats["minutes"].where(stats["minutes"] > 0, 1) * 100,
+        0.0,
+    )
+    return stats.drop(columns="minutes")
+
+
+TABLE_TITLES = {
+    "workspace": "Time per workspace",
+    "project": "Time per project",
+    "color": "Time per color",
+    "type": "Time per type",
+    "day": "Minutes per day and workspace",
+    "overlaps": "Overlapping entries per day",
+    "utilization": "Utilization of the working hours per day",
+}
+
+
+def summarize(frame, schedule=None, start=None, end=None, timezone="Europe/Berlin"):
+    """All tables of the analytics, keyed by name
+
+    Utilization is only included when a schedule and the dates are given.
+    """
+    tables = {
+        "workspace": allocation(frame, "workspace"),
+        "project": allocation(frame, "project"),
+        "color": allocation(frame, "color"),
+        "type": allocation(frame, "type"),
+        "day": daily_allocation(frame, "workspace", timezone),
+        "overlaps": overlap_stats(frame, timezone=timezone),
+    }
+    if schedule is not None and start is not None and end is not None:
+        tables["utilization"] = utilization(frame, schedule, start, end, timezone)
+    return tables
@@ -0,0 +1,477 @@
+import csv
+import html
+import io
+import json
+import sys
+from datetime import date, datetime
+
+import pytz
+
+from overview.aggregate import RangeOverview
+from prettify import colorize
+
+
+def minutes_to_hours_str(minutes):
+    # Convert minutes to hours and minutes string
+    hours = minutes // 60
+    minutes = minutes % 60
+    if hours == 0:
+        return f"{int(minutes)}m"
+    else:
+        if minutes == 0:
+            return f"{int(hours)}h"
+        else:
+            return f"{int(hours)}h {int(minutes)}m"
+
+
+def format_scheduled_time(
+    scheduled_item, time_format="%d.%m.%y", timezone="Europe/Berlin"
+):
+    """Format the scheduled time of a task, chunk or scheduled entity for display
+
+    Args:
+        scheduled_item: The model (or overview Entry) to format time for
+        time_format: The time format to use (default: German format "%d.%m.%y")
+        timezone: The timezone to convert times to (default: "Europe/Berlin")
+    """
+    start_time = scheduled_item.scheduled_start
+    if start_time is None:
+        return ""
+
+    # Dates without a time component are shown as they are
+    if scheduled_item.all_day:
+        return f"({start_time.strftime(time_format)})"
+
+    # Convert to the specified timezone
+    start_time = start_time.astimezone(pytz.timezone(timezone))
+    return f"({start_time.strftime(f'{time_format} %H:%M')})"
+
+
+def signed_hours_str(minutes):
+    sign = "-" if minutes < 0 else "+"
+    return sign + minutes_to_hours_str(abs(minutes))
+
+
+def _range_title(overview):
+    return (
+        f"Overview by {overview.granularity} "
+        f"({overview.start.strftime('%d.%m.%Y')} to "
+        f"{overview.end.strftime('%d.%m.%Y')})"
+    )
+
+
+def _period_title(period):
+    return (
+        f"{period.label} ({period.start.strftime('%d.%m.%Y')} to "
+        f"{period.end.strftime('%d.%m.%Y')})"
+    )
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class AnsiRenderer:
+    """The colored terminal report"""
+
+    def __init__(self, timezone="Europe/Berlin"):
+        self.timezone = timezone
+
+    def render(self, overview):
+        lines = []
+        add = lines.append
+        share = overview.share
+
+        add(
+            f"Tasks for {overview.label} ({overview.start.strftime('%d.%m.%Y')} "
+            f"to {overview.end.strftime('%d.%m.%Y')})\n"
+        )
+        lines.extend(self._source_lines(overview.sources))
+
+        total = minutes_to_hours_str(overview.total_duration)
+        add(f"Total time planned: {colorize(total, '#0b8043')} \n")
+
+        # Percentage time used per workspace and project
+        add("Percentage time used per workspace:")
+        for workspace in overview.workspaces:
+            add(
+                f"{workspace.name}: {minutes_to_hours_str(workspace.duration)} "
+                f"({share(workspace.duration):.2f}%)"
+            )
+            for project in workspace.projects:
+                add(
+                    colorize(
+                        f"    {project.name}: "
+                        f"{minutes_to_hours_str(project.duration)} "
+                        f"({share(project.duration):.2f}%)",
+                        project.color,
+                    )
+                )
+                for entry in project.entries:
+                    lines.extend(self._entry_lines(entry))
+
+        add("\nPercentage time used per color:")
+        for color in overview.colors:
+            add(
+                colorize(
+                    f"{color.name}: {minutes_to_hours_str(color.duration)} "
+                    f"({share(color.duration):.2f}%)",
+                    color.color,
+                )
+            )
+            for event in color.events:
+                add(
+                    f"    {minutes_to_hours_str(event.duration).ljust(7)}"
+                    f"{event.name} {self._time(event)}"
+                )
+
+        # Combined times (Motion tasks + Calendar events)
+        add("\nCombined time allocation:")
+        for group in overview.allocation:
+            add(
+                colorize(
+                    f"{group.name}: {minutes_to_hours_str(group.duration)} "
+                    f"({share(group.duration):.2f}%)",
+                    group.color,
+                )
+            )
+            for item in group.items:
+                add(
+                    f"    {item.name}: {minutes_to_hours_str(item.duration)} "
+                    f"({share(item.duration):.2f}%)"
+                )
+        return "\n".join(lines) + "\n"
+
+    def render_range(self, overview):
+        lines = [_range_title(overview) + "\n"]
+        add = lines.append
+        share = overview.share
+        lines.extend(self._source_lines(overview.sources))
+
+        total = minutes_to_hours_str(overview.total_duration)
+        add(f"Total time planned: {colorize(total, '#0b8043')} \n")
+
+        for period in overview.periods:
+            add(
+                f"{_period_title(period)}: "
+                f"{minutes_to_hours_str(period.total_duration)} "
+                f"({share(period.total_duration):.2f}%)"
+            )
+            for workspace in period.workspaces:
+                add(f"    {workspace.name}: {minutes_to_hours_str(workspace.duration)}")
+                for project in workspace.projects:
+                    add(
+                        colorize(
+                            f"        {project.name}: "
+                            f"{minutes_to_hours_str(project.duration)}",
+                            project.color,
+                        )
+                    )
+            for color in period.colors:
+                add(
+                    colorize(
+                        f"    {color.name} events: "
+                        f"{minutes_to_hours_str(color.duration)}",
+                        color.color,
+                    )
+                )
+            add("")
+
+        if len(overview.periods) > 1:
+            add(f"Trends per {overview.granularity} (change first to last):")
+            for trend in overview.trends:
+                series = " | ".join(
+                    minutes_to_hours_str(duration) for duration in trend.durations
+                )
+                line = f"{trend.name}: {series} ({signed_hours_str(trend.change)})"
+                add(colorize(line, trend.color) if trend.color else line)
+        return "\n".join(lines) + "\n"
+
+    def _time(self, entry):
+        return format_scheduled_time(entry, timezone=self.timezone)
+
+    def _entry_lines(self, entry):
+        if not entry.chunks:
+            return [
+                f"      {minutes_to_hours_str(entry.duration).ljust(7)}"
+                f"{entry.name} {self._time(entry)}"
+            ]
+        lines = [f"      [CHUNKED] {entry.name} {self._time(entry)}"]
+        for chunk in entry.chunks:
+            chunk_time = self._time(chunk)
+            # For chunks, display the scheduled time instead of "Unnamed Chunk"
+            if chunk.name:
+                display_name = f"{chunk.name} {chunk_time}"
+            else:
+                display_name = chunk_time.strip("()")
+            lines.append(
+                f"        {minutes_to_hours_str(chunk.duration).ljust(7)}{display_name}"
+            )
+        return lines
+
+    @staticmethod
+    def _source_lines(sources):
+        if not sources:
+            return []
+        lines = []
+        timings = [
+            f"{source.name} in {source.seconds:.2f}s"
+            for source in sources
+            if source.error is None
+        ]
+        if timings:
+            lines.append("Fetched " + ", ".join(timings))
+        for source in sources:
+            if source.error is not None:
+                lines.append(
+                    colorize(
+                        f"{source.name} unavailable ({source.error}), showing the rest",
+                        "#d50000",
+                    )
+                )
+        lines.append("")
+        return lines
+
+
+class JsonRenderer:
+    """The whole overview as one JSON document"""
+
+    def __init__(self, indent=2):
+        self.indent = indent
+
+    def render(self, overview):
+        data = overview.to_dict()
+        data["days"] = [
+            {**day, "duration": day["tasks"] + day["events"]} for day in data["days"]
+        ]
+        return json.dumps(data, indent=self.indent, default=_json_default) + "\n"
+
+    def render_range(self, overview):
+        data = overview.to_dict()
+        for trend, trend_data in zip(overview.trends, data["trends"]):
+            trend_data["change"] = trend.change
+            trend_data["slope"] = trend.slope
+        return json.dumps(data, indent=self.indent, default=_json_default) + "\n"
+
+
+class CsvRenderer:
+    """One row per workspace, project, color, allocation item and day"""
+
+    HEADER = (
+        "section",
+        "workspace",
+        "project",
+        "color",
+        "name",
+        "date",
+        "minutes",
+        "percent",
+    )
+
+    def render(self, overview):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(self.HEADER)
+
+        def row(section, name, minutes, workspace="", project="", color="", day=""):
+            writer.writerow(
+                (section, workspace, project, color, name, day)
+                + (round(minutes, 2), round(overview.share(minutes), 2))
+            )
+
+        for workspace in overview.workspaces:
+            row("workspace", workspace.name, workspace.duration, workspace.name)
+            for project in workspace.projects:
+                row(
+                    "project",
+                    project.name,
+                    project.duration,
+                    workspace.name,
+                    project.name,
+                    project.color,
+                )
+        for color in overview.colors:
+            row("color", color.name, color.duration, color=color.color)
+        for group in overview.allocation:
+            for item in group.items:
+                section = f"allocation:{item.kind}"
+                row(section, item.name, item.duration, color=group.color)
+        for day in overview.days:
+            row("day", "tasks", day.tasks, day=day.date.isoformat())
+            row("day", "events", day.events, day=day.date.isoformat())
+        return buffer.getvalue()
+
+    def render_range(self, overview):
+        """One row per period and workspace, project or color"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(("period", "start", "end") + self.HEADER[:5] + ("minutes",))
+
+        for period in overview.periods:
+            prefix = (period.label, period.start.date(), period.end.date())
+
+            def row(section, name, minutes, workspace="", project="", color=""):
+                writer.writerow(
+                    prefix
+                    + (section, workspace, project, color, name, round(minutes, 2))
+                )
+
+            for workspace in period.workspaces:
+                row("workspace", workspace.name, workspace.duration, workspace.name)
+                for project in workspace.projects:
+                    row(
+                        "project",
+                        project.name,
+                        project.duration,
+                        workspace.name,
+                        project.name,
+                        project.color,
+                    )
+            for color in period.colors:
+                row("color", color.name, color.duration, color=color.color)
+        return buffer.getvalue()
+
+
+class HtmlRenderer:
+    """A standalone HTML page with one table per section"""
+
+    def __init__(self, timezone="Europe/Berlin"):
+        self.timezone = timezone
+
+    def render(self, overview):
+        esc = html.escape
+        share = overview.share
+        title = (
+            f"Tasks for {overview.label} ({overview.start.strftime('%d.%m.%Y')} "
+            f"to {overview.end.strftime('%d.%m.%Y')})"
+        )
+        parts = [
+            "<!DOCTYPE html>",
+            '<html><head><meta charset="utf-8">',
+            f"<title>{esc(title)}</title>",
+            "<style>body{font-family:sans-serif}td{padding:0 .8em}"
+            ".num{text-align:right}</style>",
+            "</head><body>",
+            f"<h1>{esc(title)}</h1>",
+        ]
+        for source in overview.sources:
+            if source.error is not None:
+                parts.append(
+                    f"<p><strong>{esc(source.name)} unavailable:</strong> "
+                    f"{esc(source.error)}</p>"
+                )
+        parts.append(
+            f"<p>Total time planned: "
+            f"<strong>{minutes_to_hours_str(overview.total_duration)}</strong></p>"
+        )
+
+        def cells(name, minutes, color=None, indent=0):
+            style = f' style="color:{esc(color)}"' if color else ""
+            pad = f' style="padding-left:{indent}em"' if indent else ""
+            return (
+                f"<tr{style}><td{pad}>{esc(name)}</td>"
+                f'<td class="num">{minutes_to_hours_str(minutes)}</td>'
+                f'<td class="num">{share(minutes):.2f}%</td></tr>'
+            )
+
+        parts.append("<h2>Time per workspace</h2><table>")
+        for workspace in overview.workspaces:
+            parts.append(cells(workspace.name, workspace.duration))
+            for project in workspace.projects:
+                parts.append(cells(project.name, project.duration, project.color, 2))
+                for entry in project.entries:
+                    time = format_scheduled_time(entry, timezone=self.timezone)
+                    name = f"{entry.name} {time}"
+                    parts.append(cells(name, entry.duration, indent=4))
+        parts.append("</table><h2>Time per color</h2><table>")
+        for color in overview.colors:
+            parts.append(cells(color.name, color.duration, color.color))
+            for event in color.events:
+                time = format_scheduled_time(event, timezone=self.timezone)
+                parts.append(cells(f"{event.name} {time}", event.duration, indent=2))
+        parts.append("</table><h2>Combined time allocation</h2><table>")
+        for group in overview.allocation:
+            parts.append(cells(group.name, group.duration, group.color))
+            for item in group.items:
+                parts.append(cells(item.name, item.duration, indent=2))
+        parts.append("</table><h2>Time per day</h2><table>")
+        for day in overview.days:
+            parts.append(cells(day.date.strftime("%a %d.%m.%Y"), day.duration))
+        parts.append("</table></body></html>")
+        return "\n".join(parts) + "\n"
+
+    def render_range(self, overview):
+        """A table with a column per period and a row per workspace, project or color"""
+        esc = html.escape
+        title = _range_title(overview)
+        parts = [
+            "<!DOCTYPE html>",
+            '<html><head><meta charset="utf-8">',
+            f"<title>{esc(title)}</title>",
+            "<style>body{font-family:sans-serif}td,th{padding:0 .8em}"
+            ".num{text-align:right}</style>",
+            "</head><body>",
+            f"<h1>{esc(title)}</h1>",
+        ]
+        for source in overview.sources:
+            if source.error is not None:
+                parts.append(
+                    f"<p><strong>{esc(source.name)} unavailable:</strong> "
+                    f"{esc(source.error)}</p>"
+                )
+        parts.append(
+            f"<p>Total time planned: "
+            f"<strong>{minutes_to_hours_str(overview.total_duration)}</strong></p>"
+        )
+        header = "".join(f"<th>{esc(period.label)}</th>" for period in overview.periods)
+        parts.append(f"<table><tr><th></th>{header}<th>Change</th></tr>")
+        totals = [period.total_duration for period in overview.periods]
+        parts.append(
+            "<tr><th>Total</th>"
+            + "".join(f'<td class="num">{minutes_to_hours_str(m)}</td>' for m in totals)
+            + "<td></td></tr>"
+        )
+        for trend in overview.trends:
+            style = f' style="color:{esc(trend.color)}"' if trend.color else ""
+            pad = ' style="padding-left:2em"' if trend.kind == "project" else ""
+            durations = "".join(
+                f'<td class="num">{minutes_to_hours_str(duration)}</td>'
+                for duration in trend.durations
+            )
+            parts.append(
+                f"<tr{style}><td{pad}>{esc(trend.name)}</td>{durations}"
+                f'<td class="num">{signed_hours_str(trend.change)}</td></tr>'
+            )
+        parts.append("</table></body></html>")
+        return "\n".join(parts) + "\n"
+
+
+# Output formats of the overview; add a class with render(overview) -> str
+# and render_range(range_overview) -> str
+RENDERERS = {
+    "ansi": AnsiRenderer,
+    "json": JsonRenderer,
+    "csv": CsvRenderer,
+    "html": HtmlRenderer,
+}
+
+
+def write_overview(overview, renderer="ansi", file=None):
+    """Render the overview and write it with a single write
+
+    Parameters:
+        overview (WeekOverview or RangeOverview): The aggregated overview
+        renderer (str or object): A key of RENDERERS or a renderer instance
+        file: Writable text file, defaults to stdout
+    """
+    if isinstance(renderer, str):
+        renderer = RENDERERS[renderer]()
+    if isinstance(overview, RangeOverview):
+        text = renderer.render_range(overview)
+    else:
+        text = renderer.render(overview)
+    file = file or sys.stdout
+    file.write(text)
+    file.flush()